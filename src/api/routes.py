@@ -2,23 +2,36 @@
 API 路由定义
 """
 
+import json
 import uuid
 from datetime import datetime
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 
-from src.db.connection import get_db
+from src.db.connection import get_db, get_session_local
 from src.models.database import (
-    Competitor, Source, ChangeEvent, Insight,
+    Competitor, Source, Snapshot, ChangeEvent, Insight,
     Battlecard, Subscription, Feedback
 )
+from src.services.batch_diff import batch_diff
 from src.services.battlecard import BattlecardGenerator
+from src.services.block_diff import split_blocks
+from src.services.diff_cache import get_diff_cache
+from src.services.noise_filter import get_noise_filter
 from src.services.notification import NotificationService, send_change_notifications
-from src.services.fetcher import fetch_source
+from src.services.fetcher import fetch_source, fetch_sources
+from src.services.fingerprint import find_similar
+from src.services.resilience import get_circuit_breaker
+from src.services.retention import delete_snapshots
 from src.services.scheduler import get_scheduler
+from src.utils.blob_store import get_blob_store
+from src.utils.http_client import connection_stats
+from src.services.text_store import load_snapshot_text
+from src.services.volatile_mask import get_volatile_masker
 
 router = APIRouter()
 
@@ -102,6 +115,14 @@ def create_source(
     fetch_mode: str = "http",
     schedule: str = "0 8 * * *",
     sensitivity: str = "medium",
+    block_resource_types: Optional[List[str]] = Query(default=None),
+    block_domains: Optional[List[str]] = Query(default=None),
+    wait_until: Optional[str] = None,
+    wait_selector: Optional[str] = None,
+    extract_engine: Optional[str] = None,
+    include_selectors: Optional[List[str]] = Query(default=None),
+    exclude_selectors: Optional[List[str]] = Query(default=None),
+    diff_mode: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """创建监控源"""
@@ -111,7 +132,15 @@ def create_source(
         source_type=source_type,
         fetch_mode=fetch_mode,
         schedule=schedule,
-        sensitivity=sensitivity
+        sensitivity=sensitivity,
+        block_resource_types=block_resource_types,
+        block_domains=block_domains,
+        wait_until=wait_until,
+        wait_selector=wait_selector,
+        extract_engine=extract_engine,
+        include_selectors=include_selectors,
+        exclude_selectors=exclude_selectors,
+        diff_mode=diff_mode
     )
     db.add(source)
     db.commit()
@@ -124,6 +153,24 @@ def create_source(
     return source
 
 
+@router.get("/sources/{source_id}/masks")
+def get_source_masks(source_id: str, db: Session = Depends(get_db)):
+    """获取源的易变区域屏蔽统计"""
+    source = db.query(Source).filter(Source.id == source_id).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    return get_volatile_masker().stats(source)
+
+
+@router.get("/sources/{source_id}/noise-model")
+def get_source_noise_model(source_id: str, db: Session = Depends(get_db)):
+    """获取源的噪声模型状态"""
+    source = db.query(Source).filter(Source.id == source_id).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    return get_noise_filter().stats(source)
+
+
 @router.post("/sources/{source_id}/test")
 def test_source(source_id: str, db: Session = Depends(get_db)):
     """测试抓取单个源"""
@@ -140,6 +187,135 @@ def test_source(source_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/sources/test-batch")
+def test_sources(source_ids: List[str] = Query(...), db: Session = Depends(get_db)):
+    """并发测试抓取多个源"""
+    try:
+        snapshots = fetch_sources(source_ids, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return [
+        {
+            "source_id": source_id,
+            "status": "success",
+            "snapshot_id": str(snapshot.id),
+            "content_hash": snapshot.content_hash
+        } if snapshot else {
+            "source_id": source_id,
+            "status": "error",
+            "message": "Failed to fetch"
+        }
+        for source_id, snapshot in zip(source_ids, snapshots)
+    ]
+
+
+@router.post("/sources/run-batch")
+def run_sources(source_ids: List[str] = Query(...)):
+    """立即在后台并发抓取多个源并检测变更"""
+    get_scheduler().run_batch_now(source_ids)
+    return {"status": "scheduled", "source_count": len(source_ids)}
+
+
+# ============== 快照 ==============
+
+@router.get("/snapshots/{snapshot_id}")
+def get_snapshot(snapshot_id: str, db: Session = Depends(get_db)):
+    """获取快照详情（含还原后的正文）"""
+    snapshot = db.query(Snapshot).filter(
+        Snapshot.id == snapshot_id
+    ).first()
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return {
+        "id": str(snapshot.id),
+        "source_id": str(snapshot.source_id),
+        "fetched_at": snapshot.fetched_at,
+        "content_hash": snapshot.content_hash,
+        "price_data": snapshot.price_data,
+        "text_content": load_snapshot_text(db, snapshot)
+    }
+
+
+@router.delete("/snapshots/{snapshot_id}")
+def delete_snapshot(snapshot_id: str, db: Session = Depends(get_db)):
+    """删除快照（释放 HTML 存储引用，相关变更事件保留）"""
+    snapshot = db.query(Snapshot).filter(
+        Snapshot.id == snapshot_id
+    ).first()
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    delete_snapshots(db, [snapshot])
+    db.commit()
+    return {"status": "deleted"}
+
+
+@router.get("/snapshots/{snapshot_id}/similar")
+def get_similar_snapshots(
+    snapshot_id: str,
+    max_distance: int = Query(default=3, ge=0, le=3),
+    same_source: bool = True,
+    limit: int = Query(default=20, le=100),
+    db: Session = Depends(get_db)
+):
+    """按 simhash 查找近似快照"""
+    snapshot = db.query(Snapshot).filter(Snapshot.id == snapshot_id).first()
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    if snapshot.simhash is None:
+        return []
+    
+    similar = find_similar(
+        db, snapshot.simhash, max_distance,
+        source_id=snapshot.source_id if same_source else None,
+        limit=limit + 1
+    )
+    return [
+        {
+            "id": str(item.id),
+            "source_id": str(item.source_id),
+            "fetched_at": item.fetched_at,
+            "content_hash": item.content_hash
+        }
+        for item in similar if item.id != snapshot.id
+    ][:limit]
+
+
+@router.post("/snapshots/diff-batch")
+def diff_snapshots_batch(
+    pairs: Optional[List[str]] = Query(default=None),
+    source_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sensitivity: Optional[str] = None
+):
+    """
+    批量 diff 快照对，按顺序以 NDJSON 流式返回
+    
+    pairs 为 "旧快照ID:新快照ID" 列表；或指定 source_id（及时间范围）比较相邻快照。
+    """
+    if source_id is None and not pairs:
+        raise HTTPException(status_code=400, detail="pairs or source_id is required")
+    try:
+        id_pairs = [tuple(pair.split(":", 1)) for pair in pairs or ()]
+        for pair in id_pairs:
+            uuid.UUID(pair[0]), uuid.UUID(pair[1])
+    except (ValueError, IndexError):
+        raise HTTPException(status_code=400, detail="pairs must be old_id:new_id")
+    
+    def stream():
+        # 响应流式输出期间使用独立会话
+        db = get_session_local()()
+        try:
+            for result in batch_diff(db, id_pairs, source_id, since, until, sensitivity):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        except ValueError as e:
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 # ============== 变更事件 ==============
 
 @router.get("/events")
@@ -147,11 +323,14 @@ def list_events(
     limit: int = Query(default=50, le=100),
     competitor_id: Optional[str] = None,
     is_processed: Optional[bool] = None,
+    include_suppressed: bool = False,
     db: Session = Depends(get_db)
 ):
-    """列出变更事件"""
+    """列出变更事件（默认不含疑似噪声的事件）"""
     query = db.query(ChangeEvent)
     
+    if not include_suppressed:
+        query = query.filter(ChangeEvent.is_suppressed.isnot(True))
     if competitor_id:
         query = query.filter(ChangeEvent.source.has(competitor_id=competitor_id))
     if is_processed is not None:
@@ -171,6 +350,67 @@ def get_event(event_id: str, db: Session = Depends(get_db)):
     return event
 
 
+def _diff_input_text(db: Session, source: Source, snapshot: Snapshot, block_mode: bool) -> str:
+    """还原 diff 时使用的文本：正文，或以换行连接的区块文本（按当前易变路径过滤）"""
+    if not block_mode:
+        return load_snapshot_text(db, snapshot)
+    blocks = get_volatile_masker().filter_blocks(
+        split_blocks(get_blob_store().read_text(snapshot.html_path), source.exclude_selectors),
+        source.volatile_masks
+    )
+    return "\n".join(block.text for block in blocks)
+
+
+@router.get("/events/{event_id}/chunks/{index}")
+def get_event_chunk(event_id: str, index: int, db: Session = Depends(get_db)):
+    """按偏移从快照读取差异块的完整新旧文本（事件中只保存摘录）"""
+    event = db.query(ChangeEvent).filter(
+        ChangeEvent.id == event_id
+    ).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    chunks = event.diff_chunks or []
+    if not 0 <= index < len(chunks):
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    chunk = chunks[index]
+    if chunk.get("old_range") is None or chunk.get("new_range") is None:
+        # 旧事件没有偏移，只有摘录
+        return chunk
+    
+    block_mode = chunk.get("css_path") is not None
+    if block_mode:
+        fingerprint = chunk.get("mask_fingerprint")
+        if fingerprint is None:
+            # 未记录易变路径摘要的旧事件无法确认偏移，只返回摘录
+            return chunk
+        if fingerprint != get_volatile_masker().fingerprint(event.source):
+            raise HTTPException(
+                status_code=409,
+                detail="Volatile masks or exclude selectors changed since the event was created"
+            )
+    
+    old_text = new_text = ""
+    if chunk["type"] != "add":
+        old_text = _chunk_text(db, event, event.from_snapshot, chunk["old_range"], block_mode)
+    if chunk["type"] != "remove":
+        new_text = _chunk_text(db, event, event.to_snapshot, chunk["new_range"], block_mode)
+    return {**chunk, "old_text": old_text, "new_text": new_text}
+
+
+def _chunk_text(
+    db: Session,
+    event: ChangeEvent,
+    snapshot: Optional[Snapshot],
+    text_range: List[int],
+    block_mode: bool
+) -> str:
+    """按偏移读取差异块一侧的完整文本（快照已被保留策略删除时返回 410）"""
+    if snapshot is None:
+        raise HTTPException(status_code=410, detail="Snapshot no longer available")
+    start, end = text_range
+    return _diff_input_text(db, event.source, snapshot, block_mode)[start:end]
+
+
 @router.post("/events/{event_id}/feedback")
 def feedback_event(
     event_id: str,
@@ -179,12 +419,17 @@ def feedback_event(
     db: Session = Depends(get_db)
 ):
     """反馈变更事件是否有用（用于去噪）"""
+    event = db.query(ChangeEvent).filter(ChangeEvent.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
     feedback = Feedback(
         change_event_id=event_id,
         user_id=user_id,
         is_useful=is_useful
     )
     db.add(feedback)
+    # 逐条在线更新该源的噪声模型
+    get_noise_filter().learn(db, event, is_useful)
     db.commit()
     return {"status": "submitted"}
 
@@ -352,3 +597,21 @@ def update_llm_settings(
     save_config(settings)
     
     return {"status": "updated"}
+
+
+@router.get("/system/hosts")
+def get_host_status():
+    """获取抓取失败的主机及熔断状态"""
+    return get_circuit_breaker().status()
+
+
+@router.get("/system/http")
+def get_http_stats():
+    """获取 HTTP 连接复用统计"""
+    return connection_stats()
+
+
+@router.get("/system/diff-cache")
+def get_diff_cache_stats():
+    """获取 diff 结果缓存命中统计"""
+    return get_diff_cache().stats()
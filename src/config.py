@@ -4,7 +4,7 @@
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
@@ -24,11 +24,20 @@ class DatabaseConfig(BaseModel):
 class StorageConfig(BaseModel):
     type: str = "local"
     base_path: str = "./data"
+    blob_compression: str = "gzip"  # gzip/zstd
+    text_storage: str = "full"  # full/delta
+    text_keyframe_interval: int = 20  # delta 模式下每隔多少版本存一次完整正文
+    snapshot_retention_days: int = 0  # 快照保留天数（0 为永久保留；每个源的最新快照始终保留）
+    maintenance_schedule: str = "30 3 * * *"  # 过期快照清理与 blob 回收的 cron
     
     @property
     def snapshots_path(self) -> Path:
         return Path(self.base_path) / "snapshots"
     
+    @property
+    def blobs_path(self) -> Path:
+        return Path(self.base_path) / "blobs"
+    
     @property
     def screenshots_path(self) -> Path:
         return Path(self.base_path) / "screenshots"
@@ -46,10 +55,74 @@ class LLMConfig(BaseModel):
 class ScrapingConfig(BaseModel):
     timeout: int = 30
     retry_times: int = 3
-    retry_delay: int = 5
+    retry_delay: int = 5  # 首次重试等待秒数，之后指数退避
+    retry_max_delay: int = 60
+    circuit_failure_threshold: int = 5  # 主机连续失败多少次后熔断
+    circuit_cooldown: int = 600  # 熔断冷却秒数
     user_agent: str = "CompetitorIntel/1.0"
+    max_body_bytes: int = 10 * 1024 * 1024  # 响应体大小上限
     respect_robots_txt: bool = True
+    robots_cache_ttl: int = 3600  # robots.txt 缓存秒数
+    domain_rate: float = 1.0  # 每个域名每秒请求数（robots.txt 的 Crawl-delay 更严格时以其为准）
+    domain_burst: int = 3  # 每个域名允许的突发请求数
     headless_timeout: int = 60
+    max_concurrency: int = 20
+    per_host_concurrency: int = 2
+    extract_engine: str = "readability"  # readability/lxml（源可单独覆盖）
+    extract_workers: int = 2  # 正文提取进程数，0 表示在当前线程内提取
+    extract_queue_size: int = 100  # 下载与提取之间的队列容量
+    browser_pool_size: int = 2
+    browser_context_max_pages: int = 50
+    # 无头模式拦截的资源类型与域名（源可单独覆盖）
+    blocked_resource_types: List[str] = Field(
+        default_factory=lambda: ["image", "font", "media"]
+    )
+    blocked_domains: List[str] = Field(default_factory=lambda: [
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+        "facebook.net", "hotjar.com", "segment.io", "mixpanel.com",
+        "hm.baidu.com", "cnzz.com"
+    ])
+    # 无头模式等待策略：load/domcontentloaded/networkidle，可选等待某个选择器出现
+    headless_wait_until: str = "domcontentloaded"
+    headless_wait_selector: Optional[str] = None
+
+
+class HttpConfig(BaseModel):
+    pool_connections: int = 100  # 缓存连接池的主机数
+    pool_maxsize: int = 20  # 每个主机保持的最大连接数
+    keepalive_expiry: int = 30  # 空闲长连接保持秒数（httpx）
+    dns_cache_ttl: int = 60  # DNS 缓存秒数（不大于站点记录 TTL），0 表示关闭
+    dns_cache_size: int = 1024  # DNS 缓存最大主机数
+    http2: bool = False  # LLM 客户端启用 HTTP/2（需安装 h2）
+
+
+class DiffConfig(BaseModel):
+    char_diff_max_chars: int = 500  # 新旧文本合计不超过该字符数时按字符 diff
+    max_operations: int = 2_000_000  # 行级 diff 的比较次数预算，超出部分整段视为替换
+    timeout: float = 2.0  # 单次 diff 的时间预算（秒）
+    mode: str = "text"  # text（正文按行） / block（DOM 区块），源未配置 diff_mode 时使用
+    cache_size: int = 256  # 内存中缓存的 diff 结果数（LRU），0 表示关闭
+    cache_persistent: bool = False  # 同时将 diff 结果写入 diff_results 表
+    batch_workers: int = 2  # 批量 diff 的进程数，0 表示在当前线程执行
+    batch_window: int = 32  # 批量 diff 同时在途的快照对数（限制内存）
+    excerpt_chars: int = 200  # 差异块只保留的摘录长度，完整内容按偏移从快照读取
+    max_chunks: int = 200  # 每个变更事件最多保留的差异块数
+    simhash_threshold: int = 3  # simhash 海明距离不超过该值的快照对视为近似重复，事件为低优先级
+
+
+class MaskingConfig(BaseModel):
+    enabled: bool = True  # 哈希与 diff 前屏蔽易变区域
+    min_observations: int = 5  # 区块至少被检查多少次后才可能判定为易变
+    volatile_ratio: float = 0.8  # 区块在检查中变化的比例达到该值即判定为易变
+    max_paths: int = 2000  # 每个源跟踪的区块路径上限
+
+
+class NoiseConfig(BaseModel):
+    enabled: bool = True  # 按反馈训练的模型屏蔽疑似噪声的变更事件
+    min_samples: int = 20  # 源至少有多少条反馈后才开始屏蔽
+    suppress_threshold: float = 0.9  # 噪声概率达到该值的事件不做分析与通知
+    learning_rate: float = 0.1
+    l2: float = 0.001
 
 
 class SchedulerConfig(BaseModel):
@@ -68,6 +141,10 @@ class Settings(BaseModel):
     storage: StorageConfig = Field(default_factory=StorageConfig)
     llm: LLMConfig = Field(default_factory=LLMConfig)
     scraping: ScrapingConfig = Field(default_factory=ScrapingConfig)
+    http: HttpConfig = Field(default_factory=HttpConfig)
+    diff: DiffConfig = Field(default_factory=DiffConfig)
+    masking: MaskingConfig = Field(default_factory=MaskingConfig)
+    noise: NoiseConfig = Field(default_factory=NoiseConfig)
     scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
     notification: NotificationConfig = Field(default_factory=NotificationConfig)
 
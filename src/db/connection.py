@@ -2,10 +2,15 @@
 数据库连接管理
 """
 
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import MetaData, create_engine, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from src.models.database import Base
 
+logger = logging.getLogger(__name__)
+
 # 引擎创建（延迟导入以避免循环引用）
 _engine = None
 _SessionLocal = None
@@ -41,6 +46,48 @@ def get_db():
 
 
 def init_db():
-    """初始化所有表"""
+    """初始化所有表，并为已有表补齐新增的列与索引"""
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+
+def upgrade_schema(engine: Engine, metadata: MetaData = Base.metadata):
+    """
+    为已存在的表补齐模型中新增的列与索引
+
+    create_all 只创建缺失的表，不会修改已有表；升级后旧库缺少新列会导致查询失败。
+    新增列均可为空（默认值由应用写入），因此直接 ADD COLUMN 即可。
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = (
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                )
+                for fk in column.foreign_keys:
+                    ddl += (
+                        f" REFERENCES {preparer.format_table(fk.column.table)}"
+                        f" ({preparer.format_column(fk.column)})"
+                    )
+                conn.exec_driver_sql(ddl)
+                logger.info(f"Added column {table.name}.{column.name}")
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+if __name__ == "__main__":
+    init_db()
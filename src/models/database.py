@@ -5,7 +5,7 @@
 import uuid
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import Column, String, Text, Boolean, DateTime, Integer, ForeignKey, JSON, Date
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Integer, BigInteger, Float, ForeignKey, JSON, Date, Index
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -46,6 +46,25 @@ class Source(Base):
     schedule = Column(String(100), default="0 8 * * *")  # Cron
     sensitivity = Column(String(20), default="medium")  # low/medium/high
     is_active = Column(Boolean, default=True)
+    # HTTP 条件请求校验器（ETag / Last-Modified）
+    etag = Column(String(500))
+    last_modified = Column(String(100))
+    body_hash = Column(String(64))  # 上次响应体的 SHA-256，一致时跳过提取
+    # 无头模式覆盖配置（为空时使用全局配置）
+    block_resource_types = Column(ARRAY(String))
+    block_domains = Column(ARRAY(String))
+    wait_until = Column(String(20))  # load/domcontentloaded/networkidle
+    wait_selector = Column(String(255))
+    # 正文提取覆盖配置（lxml 引擎使用 include/exclude 选择器）
+    extract_engine = Column(String(20))  # readability/lxml
+    include_selectors = Column(ARRAY(String))
+    exclude_selectors = Column(ARRAY(String))
+    diff_mode = Column(String(20))  # text/block，为空时使用全局配置
+    # 易变区域学习状态（按 DOM 路径统计变化次数，见 services/volatile_mask.py）
+    volatile_masks = Column(JSON)
+    noise_model = Column(JSON)  # 按反馈训练的噪声模型 {weights, bias, samples}
+    # 最近一次成功检查时间（内容未变化时只更新该字段，不写快照）
+    last_checked_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # 关系
@@ -60,28 +79,80 @@ class Source(Base):
 class Snapshot(Base):
     """快照表"""
     __tablename__ = "snapshots"
+    __table_args__ = (
+        Index("ix_snapshots_source_fetched", "source_id", "fetched_at"),
+        # simhash 分段索引（近似快照查找，见 services/fingerprint.py）
+        Index("ix_snapshots_simhash_b0", "simhash_b0"),
+        Index("ix_snapshots_simhash_b1", "simhash_b1"),
+        Index("ix_snapshots_simhash_b2", "simhash_b2"),
+        Index("ix_snapshots_simhash_b3", "simhash_b3"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     source_id = Column(UUID(as_uuid=True), ForeignKey("sources.id"), nullable=False)
     fetched_at = Column(DateTime, default=datetime.utcnow)
-    content_hash = Column(String(64))
-    text_content = Column(Text)
-    html_path = Column(String(500))
+    content_hash = Column(String(64))  # 精确哈希（blake2b；旧快照为 MD5）
+    normalized_hash = Column(String(64))  # 归一化正文（NFKC、折叠空白）的哈希
+    simhash = Column(BigInteger)  # 64 位 simhash（有符号存储）
+    simhash_b0 = Column(Integer)  # simhash 按 16 位分段
+    simhash_b1 = Column(Integer)
+    simhash_b2 = Column(Integer)
+    simhash_b3 = Column(Integer)
+    text_content = Column(Text)  # 关键帧存完整正文，增量快照为空
+    text_delta = Column(JSON)  # 相对 delta_base_id 快照的行级增量
+    delta_base_id = Column(UUID(as_uuid=True), ForeignKey("snapshots.id"))
+    delta_depth = Column(Integer, default=0)  # 距最近关键帧的版本数
+    html_path = Column(String(500))  # 指向 blobs 存储中的文件
+    price_data = Column(JSON)  # 定价页的结构化价格 [{amount, currency, period, plan, text}]
+    structured_fields = Column(JSON)  # 正文中的结构化字段 {version/price/email/date: [...]}
     screenshot_path = Column(String(500))
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # 关系
     source = relationship("Source", back_populates="snapshots")
     
+    delta_base = relationship("Snapshot", remote_side=[id])
+    
     # 作为变更的"前"快照
-    from_events = relationship("ChangeEvent", foreign_keys="ChangeEvent.from_snapshot_id")
+    from_events = relationship(
+        "ChangeEvent", foreign_keys="ChangeEvent.from_snapshot_id", back_populates="from_snapshot"
+    )
     # 作为变更的"后"快照
-    to_events = relationship("ChangeEvent", foreign_keys="ChangeEvent.to_snapshot_id")
+    to_events = relationship(
+        "ChangeEvent", foreign_keys="ChangeEvent.to_snapshot_id", back_populates="to_snapshot"
+    )
     
     def __repr__(self):
         return f"<Snapshot(id={self.id}, source_id={self.source_id})>"
 
 
+class Blob(Base):
+    """快照内容存储表（内容寻址，引用计数）"""
+    __tablename__ = "blobs"
+    
+    digest = Column(String(64), primary_key=True)  # SHA-256
+    path = Column(String(500), nullable=False, unique=True)
+    size = Column(Integer)  # 原始字节数
+    stored_size = Column(Integer)  # 压缩后字节数
+    ref_count = Column(Integer, default=0, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Blob(digest={self.digest}, ref_count={self.ref_count})>"
+
+
+class DiffResult(Base):
+    """diff 结果缓存表（按新旧内容哈希与敏感度索引）"""
+    __tablename__ = "diff_results"
+    
+    key = Column(String(64), primary_key=True)  # 缓存键的摘要
+    result = Column(JSON)  # 变更事件，无显著变化时为空
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<DiffResult(key={self.key})>"
+
+
 class ChangeEvent(Base):
     """变更事件表"""
     __tablename__ = "change_events"
@@ -92,11 +163,18 @@ class ChangeEvent(Base):
     to_snapshot_id = Column(UUID(as_uuid=True), ForeignKey("snapshots.id"))
     diff_summary = Column(Text)
     diff_chunks = Column(JSON)
+    structural_changes = Column(JSON)  # [{field, added, removed, type}]
+    noise_features = Column(JSON)  # 噪声模型的输入特征，反馈时用于训练
+    noise_score = Column(Float)  # 噪声概率
+    is_suppressed = Column(Boolean, default=False)  # 疑似噪声，不做分析与通知
+    priority = Column(String(10), default="normal")  # normal/low（simhash 近似重复）
     is_processed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # 关系
     source = relationship("Source", back_populates="change_events")
+    from_snapshot = relationship("Snapshot", foreign_keys=[from_snapshot_id], back_populates="from_events")
+    to_snapshot = relationship("Snapshot", foreign_keys=[to_snapshot_id], back_populates="to_events")
     insights = relationship("Insight", back_populates="change_event")
     feedbacks = relationship("Feedback", back_populates="change_event")
     
@@ -0,0 +1,213 @@
+"""
+批量 diff 模块（调整敏感度或回填历史时重算大量快照对）
+"""
+
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.models.database import Snapshot, Source
+from src.services.block_diff import split_blocks
+from src.services.diff_engine import DiffEngine, StructuralDiffEngine
+from src.services.text_store import load_snapshot_text
+from src.services.volatile_mask import get_volatile_masker
+from src.utils.blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+SnapshotPair = Tuple[Snapshot, Snapshot]
+
+
+def diff_pair(
+    old_content: str,
+    new_content: str,
+    sensitivity: str,
+    mode: str = "text",
+    exclude_selectors: Optional[List[str]] = None,
+    volatile_masks: Optional[dict] = None
+) -> Optional[dict]:
+    """
+    计算一对快照的差异（在工作进程中执行）
+
+    Args:
+        old_content / new_content: text 模式为正文，block 模式为 HTML
+        volatile_masks: block 模式下源的易变区域状态
+
+    Returns:
+        dict: DiffEngine.to_json 的结果，无显著变化返回 None
+    """
+    engine = DiffEngine(sensitivity)
+    if mode == "block":
+        masker = get_volatile_masker()
+        event = engine.compute_block_diff(
+            masker.filter_blocks(split_blocks(old_content, exclude_selectors), volatile_masks),
+            masker.filter_blocks(split_blocks(new_content, exclude_selectors), volatile_masks)
+        )
+    else:
+        event = engine.compute_diff(old_content, new_content)
+    return engine.to_json(event) if event is not None else None
+
+
+def source_snapshot_pairs(
+    db: Session,
+    source_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Iterator[SnapshotPair]:
+    """按抓取时间顺序返回源在时间范围内的相邻快照对"""
+    query = db.query(Snapshot).filter(Snapshot.source_id == source_id)
+    if since is not None:
+        query = query.filter(Snapshot.fetched_at >= since)
+    if until is not None:
+        query = query.filter(Snapshot.fetched_at <= until)
+
+    previous = None
+    for snapshot in query.order_by(Snapshot.fetched_at).yield_per(100):
+        if previous is not None:
+            yield previous, snapshot
+        previous = snapshot
+
+
+def snapshot_pairs(db: Session, pairs: Iterable[Tuple[str, str]]) -> Iterator[SnapshotPair]:
+    """按 ID 对加载快照，不存在的 ID 抛出 ValueError"""
+    for old_id, new_id in pairs:
+        old_snapshot = db.query(Snapshot).filter(Snapshot.id == old_id).first()
+        new_snapshot = db.query(Snapshot).filter(Snapshot.id == new_id).first()
+        if old_snapshot is None or new_snapshot is None:
+            raise ValueError(f"Snapshot not found: {old_id if old_snapshot is None else new_id}")
+        yield old_snapshot, new_snapshot
+
+
+class BatchDiffer:
+    """
+    批量 diff
+
+    快照内容在当前进程中读取，diff 在进程池中执行；
+    同时在途的快照对不超过 window 个，结果按输入顺序逐个返回。
+    workers 为 0 时在当前线程内执行。
+    """
+
+    def __init__(self, workers: Optional[int] = None, window: Optional[int] = None):
+        self.workers = settings.diff.batch_workers if workers is None else workers
+        self.window = max(1, settings.diff.batch_window if window is None else window)
+        self.structural_engine = StructuralDiffEngine()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        db: Session,
+        pairs: Iterable[SnapshotPair],
+        sensitivity: Optional[str] = None
+    ) -> Iterator[dict]:
+        """
+        逐对计算差异
+
+        Args:
+            sensitivity: 覆盖源的敏感度（为空时使用各源自身的配置）
+
+        Yields:
+            dict: {from_snapshot_id, to_snapshot_id, text_diff}
+        """
+        sources = {}
+        pending: deque = deque()
+
+        for old_snapshot, new_snapshot in pairs:
+            source = sources.get(new_snapshot.source_id)
+            if source is None:
+                source = db.query(Source).filter(Source.id == new_snapshot.source_id).first()
+                sources[new_snapshot.source_id] = source
+            pending.append((old_snapshot, new_snapshot, self._submit(
+                db, source, old_snapshot, new_snapshot, sensitivity or source.sensitivity or "medium"
+            )))
+            if len(pending) >= self.window:
+                yield self._result(*pending.popleft())
+
+        while pending:
+            yield self._result(*pending.popleft())
+
+    def _submit(
+        self,
+        db: Session,
+        source: Source,
+        old_snapshot: Snapshot,
+        new_snapshot: Snapshot,
+        sensitivity: str
+    ) -> Future:
+        if (source.diff_mode or settings.diff.mode) == "block" \
+                and old_snapshot.html_path and new_snapshot.html_path:
+            store = get_blob_store()
+            args = (
+                store.read_text(old_snapshot.html_path), store.read_text(new_snapshot.html_path),
+                sensitivity, "block", source.exclude_selectors, source.volatile_masks
+            )
+        else:
+            args = (load_snapshot_text(db, old_snapshot), load_snapshot_text(db, new_snapshot), sensitivity)
+
+        if self.workers <= 0:
+            future: Future = Future()
+            try:
+                future.set_result(diff_pair(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        return self._get_executor().submit(diff_pair, *args)
+
+    def _result(self, old_snapshot: Snapshot, new_snapshot: Snapshot, future: Future) -> dict:
+        text_diff = future.result()
+        if text_diff is not None \
+                and old_snapshot.structured_fields is not None and new_snapshot.structured_fields is not None:
+            text_diff["structural_changes"] = self.structural_engine.compare_fields(
+                old_snapshot.structured_fields, new_snapshot.structured_fields
+            )
+        return {
+            "from_snapshot_id": str(old_snapshot.id),
+            "to_snapshot_id": str(new_snapshot.id),
+            "text_diff": text_diff
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn：调用方进程中有多个线程，fork 可能继承被占用的锁
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def close(self):
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+def batch_diff(
+    db: Session,
+    pairs: Sequence[Tuple[str, str]] = (),
+    source_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sensitivity: Optional[str] = None
+) -> Iterator[dict]:
+    """便捷函数：按快照 ID 对或源与时间范围批量 diff，结果按顺序逐个返回"""
+    if source_id is not None:
+        snapshot_iter = source_snapshot_pairs(db, source_id, since, until)
+    else:
+        snapshot_iter = snapshot_pairs(db, pairs)
+
+    differ = BatchDiffer()
+    try:
+        yield from differ.run(db, snapshot_iter, sensitivity)
+    finally:
+        differ.close()
@@ -70,9 +70,10 @@ class BattlecardGenerator:
         if not competitor:
             raise ValueError(f"Competitor {competitor_id} not found")
         
-        # 获取最近变更
+        # 获取最近变更（不含判定为噪声的事件）
         recent_events = db.query(ChangeEvent)\
             .filter(ChangeEvent.source.has(competitor_id=competitor_id))\
+            .filter(ChangeEvent.is_suppressed.isnot(True))\
             .order_by(desc(ChangeEvent.created_at))\
             .limit(10)\
             .all()
@@ -0,0 +1,197 @@
+"""
+DOM 区块切分（区块级 diff 的输入）
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import lxml.html
+from lxml import etree
+
+from src.services.diff_engine import IGNORE_SELECTORS, line_hash
+from src.services.extractor import BLOCK_TAGS, compile_selectors
+
+logger = logging.getLogger(__name__)
+
+# 整体作为一个区块的元素：标题、表格行、列表项及段落类元素
+ATOMIC_TAGS = frozenset([
+    "h1", "h2", "h3", "h4", "h5", "h6", "tr", "li", "p", "dt", "dd",
+    "pre", "blockquote", "caption", "figcaption", "summary"
+])
+HEADING_TAGS = frozenset(["h1", "h2", "h3", "h4", "h5", "h6"])
+
+
+@dataclass
+class Block:
+    """页面区块"""
+    css_path: str
+    section: Optional[str]  # 所在章节（最近的标题）
+    text: str
+    hash: str
+
+
+def _css_step(element, index: int) -> str:
+    """单层 CSS 选择器：有 id 用 id，否则 tag.class:nth-of-type(n)"""
+    element_id = element.get("id")
+    if element_id and " " not in element_id:
+        return f"{element.tag}#{element_id}"
+    step = element.tag
+    classes = (element.get("class") or "").split()
+    if classes:
+        step += f".{classes[0]}"
+    return f"{step}:nth-of-type({index})"
+
+
+def _atomic_text(element) -> str:
+    """区块文本：表格行按单元格以 " | " 连接，其余折叠空白"""
+    if element.tag == "tr":
+        cells = [
+            " ".join(cell.text_content().split())
+            for cell in element if cell.tag in ("td", "th")
+        ]
+        return " | ".join(cell for cell in cells if cell)
+    return " ".join(element.text_content().split())
+
+
+def _parse(html: str):
+    """解析 HTML 并去掉注释（空文档或解析失败时返回 None）"""
+    if not html or not html.strip():
+        return None
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError) as e:
+        logger.warning(f"lxml parse failed: {e}")
+        return None
+    etree.strip_elements(root, etree.Comment, etree.ProcessingInstruction, with_tail=False)
+    return root
+
+
+def _walk_blocks(root, exclude_selectors: Optional[List[str]] = None) -> Iterator[Tuple[Block, object, bool]]:
+    """
+    遍历区块
+
+    IGNORE_SELECTORS 与 exclude_selectors 命中的节点跳过（不计入 nth-of-type），但不修改文档树。
+
+    Yields:
+        (区块, 元素, 是否整体成块)：整体成块时元素为区块本身，否则为零散文本所在的元素
+    """
+    exclude = compile_selectors(tuple(IGNORE_SELECTORS) + tuple(exclude_selectors or ()))
+    # 集合持有元素引用，lxml 对同一节点返回同一代理对象
+    excluded = {element for element in exclude(root) if element.getparent() is not None}
+
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    section: Optional[str] = None
+    parts: List[str] = []
+    paths = [body.tag]
+    containers = [body]
+    # 每个父元素下各标签已出现的次数，用于 nth-of-type
+    seen: List[Dict[str, int]] = [{}]
+
+    def flush():
+        text = " ".join("".join(parts).split())
+        parts.clear()
+        if text:
+            return Block(" > ".join(paths), section, text, line_hash(text)), containers[-1], False
+        return None
+
+    walker = etree.iterwalk(body, events=("start", "end"))
+    for event, element in walker:
+        if element is body:
+            if event == "start" and element.text:
+                parts.append(element.text)
+            continue
+
+        if element in excluded:
+            if event == "start":
+                walker.skip_subtree()
+            elif element.tail:
+                parts.append(element.tail)
+            continue
+
+        if event == "start":
+            # 之前的零散文本属于父元素
+            if element.tag in BLOCK_TAGS or element.tag in ATOMIC_TAGS:
+                pending = flush()
+                if pending:
+                    yield pending
+            counts = seen[-1]
+            counts[element.tag] = counts.get(element.tag, 0) + 1
+            paths.append(_css_step(element, counts[element.tag]))
+            containers.append(element)
+            seen.append({})
+
+            if element.tag in ATOMIC_TAGS:
+                text = _atomic_text(element)
+                if element.tag in HEADING_TAGS and text:
+                    section = text[:200]
+                if text:
+                    yield Block(" > ".join(paths), section, text, line_hash(text)), element, True
+                walker.skip_subtree()
+                continue
+            if element.text:
+                parts.append(element.text)
+        else:
+            if element.tag in BLOCK_TAGS and element.tag not in ATOMIC_TAGS:
+                pending = flush()
+                if pending:
+                    yield pending
+            paths.pop()
+            containers.pop()
+            seen.pop()
+            if element.tail:
+                parts.append(element.tail)
+    pending = flush()
+    if pending:
+        yield pending
+
+
+def split_blocks(html: str, exclude_selectors: Optional[List[str]] = None) -> List[Block]:
+    """
+    将页面切分为区块序列
+
+    标题、表格行、列表项等整体成块，其余块级元素之间的零散文本按所在元素成块；
+    IGNORE_SELECTORS 与 exclude_selectors 命中的节点不计入。
+    """
+    root = _parse(html)
+    if root is None:
+        return []
+    return [block for block, _, _ in _walk_blocks(root, exclude_selectors)]
+
+
+def remove_blocks(
+    html: str,
+    css_paths: Iterable[str],
+    exclude_selectors: Optional[List[str]] = None
+) -> str:
+    """
+    从 HTML 中移除指定路径的区块（正文提取前屏蔽易变区域）
+
+    整体成块的元素直接删除；零散文本区块删除所在元素的直接文本与行内子元素，保留块级子元素。
+    """
+    css_paths = set(css_paths)
+    root = _parse(html)
+    if root is None or not css_paths:
+        return html
+
+    targets = {}
+    for block, element, atomic in _walk_blocks(root, exclude_selectors):
+        if block.css_path in css_paths:
+            targets[element] = atomic
+
+    for element, atomic in targets.items():
+        if atomic:
+            # drop_tree 保留元素后的文本
+            element.drop_tree()
+            continue
+        element.text = None
+        for child in list(element):
+            if child.tag in BLOCK_TAGS or child.tag in ATOMIC_TAGS:
+                child.tail = None
+            else:
+                child.tail = None
+                child.drop_tree()
+    return lxml.html.tostring(root, encoding="unicode")
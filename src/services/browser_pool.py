@@ -0,0 +1,267 @@
+"""
+无头浏览器池
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# page.goto 支持的 wait_until 取值
+WAIT_UNTIL_EVENTS = ("load", "domcontentloaded", "networkidle", "commit")
+
+
+class NavigationError(RuntimeError):
+    """页面导航失败（网络错误、超时、5xx/429、浏览器崩溃），按主机失败处理，可重试"""
+
+
+@dataclass
+class HeadlessOptions:
+    """无头渲染选项：资源拦截与等待策略"""
+    blocked_resource_types: List[str] = field(default_factory=list)
+    blocked_domains: List[str] = field(default_factory=list)
+    wait_until: str = "domcontentloaded"  # load/domcontentloaded/networkidle
+    wait_selector: Optional[str] = None
+
+    @classmethod
+    def from_source(cls, source=None) -> "HeadlessOptions":
+        """全局配置 + 源级覆盖（源字段为空时沿用全局配置）"""
+        scraping = settings.scraping
+
+        def pick(name: str, default):
+            value = getattr(source, name, None) if source is not None else None
+            return default if value is None else value
+
+        return cls(
+            blocked_resource_types=list(pick("block_resource_types", scraping.blocked_resource_types)),
+            blocked_domains=list(pick("block_domains", scraping.blocked_domains)),
+            wait_until=pick("wait_until", scraping.headless_wait_until),
+            wait_selector=pick("wait_selector", scraping.headless_wait_selector)
+        )
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """是否拦截该请求"""
+        if resource_type in self.blocked_resource_types:
+            return True
+
+        host = (urlparse(url).hostname or "").lower()
+        return any(
+            host == domain or host.endswith("." + domain)
+            for domain in self.blocked_domains
+        )
+
+
+class BrowserWorker(threading.Thread):
+    """
+    浏览器工作线程
+
+    Playwright 同步 API 只能在创建它的线程中使用，
+    因此每个工作线程独占一个浏览器进程，并复用其中的上下文。
+    """
+
+    def __init__(self, tasks: queue.Queue, max_pages_per_context: int, name: str):
+        super().__init__(name=name, daemon=True)
+        self.tasks = tasks
+        self.max_pages_per_context = max_pages_per_context
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pages_in_context = 0
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+
+            url, options, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(self._render(url, options))
+            except Exception as e:
+                future.set_exception(e)
+                self._recover()
+
+        self._shutdown()
+
+    def _render(self, url: str, options: HeadlessOptions) -> str:
+        """
+        在复用的上下文中打开页面并返回渲染后的 HTML
+
+        Raises:
+            ValueError: wait_until 取值非法
+            NavigationError: 导航失败；wait_selector 等待超时等其他错误原样抛出（不重试）
+        """
+        if options.wait_until not in WAIT_UNTIL_EVENTS:
+            raise ValueError(f"Invalid wait_until: {options.wait_until}")
+
+        context = self._ensure_context()
+        page = context.new_page()
+        timeout = settings.scraping.headless_timeout * 1000
+        try:
+            # 只需要 DOM 文本：拦截图片、字体、媒体与第三方追踪请求
+            if options.blocked_resource_types or options.blocked_domains:
+                page.route("**/*", lambda route: (
+                    route.abort()
+                    if options.should_block(route.request.resource_type, route.request.url)
+                    else route.continue_()
+                ))
+
+            try:
+                response = page.goto(url, wait_until=options.wait_until, timeout=timeout)
+            except Exception as e:
+                raise NavigationError(f"Navigation to {url} failed: {e}") from e
+            if response is not None and (response.status >= 500 or response.status == 429):
+                raise NavigationError(f"Navigation to {url} returned HTTP {response.status}")
+            # 等待超时多为选择器配置问题，不视为主机失败
+            if options.wait_selector:
+                page.wait_for_selector(options.wait_selector, timeout=timeout)
+            return page.content()
+        finally:
+            page.close()
+            self._pages_in_context += 1
+            if self._pages_in_context >= self.max_pages_per_context:
+                self._close_context()
+
+    def _ensure_context(self):
+        """确保浏览器存活且有可用上下文"""
+        if self._browser is None or not self._browser.is_connected():
+            self._restart_browser()
+
+        if self._context is None:
+            self._context = self._browser.new_context(
+                user_agent=settings.scraping.user_agent
+            )
+            self._pages_in_context = 0
+
+        return self._context
+
+    def _restart_browser(self):
+        """启动（或重启崩溃的）浏览器"""
+        if self._playwright is None:
+            from playwright.sync_api import sync_playwright
+            self._playwright = sync_playwright().start()
+
+        if self._browser is not None:
+            logger.warning(f"{self.name}: browser disconnected, restarting")
+            self._close_browser()
+
+        self._browser = self._playwright.chromium.launch(headless=True)
+
+    def _recover(self):
+        """失败后丢弃可能已损坏的上下文；浏览器崩溃时下次任务会自动重启"""
+        self._close_context()
+        if self._browser is not None and not self._browser.is_connected():
+            self._close_browser()
+
+    def _close_context(self):
+        if self._context is not None:
+            try:
+                self._context.close()
+            except Exception as e:
+                logger.debug(f"{self.name}: failed to close context: {e}")
+            self._context = None
+            self._pages_in_context = 0
+
+    def _close_browser(self):
+        self._close_context()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                logger.debug(f"{self.name}: failed to close browser: {e}")
+            self._browser = None
+
+    def _shutdown(self):
+        self._close_browser()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"{self.name}: failed to stop playwright: {e}")
+            self._playwright = None
+
+
+class BrowserPool:
+    """长驻浏览器池"""
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_pages_per_context: Optional[int] = None
+    ):
+        self.size = size or settings.scraping.browser_pool_size
+        self.max_pages_per_context = max_pages_per_context or settings.scraping.browser_context_max_pages
+        self._tasks: queue.Queue = queue.Queue()
+        self._workers: List[BrowserWorker] = []
+        self._lock = threading.Lock()
+
+    def render(self, url: str, options: Optional[HeadlessOptions] = None) -> str:
+        """
+        渲染页面
+
+        Args:
+            url: 页面地址
+            options: 渲染选项（默认使用全局配置）
+
+        Returns:
+            str: 渲染后的 HTML
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._tasks.put((url, options or HeadlessOptions.from_source(), future))
+        return future.result()
+
+    def _ensure_started(self):
+        """按需启动工作线程，并替换意外退出的线程"""
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            while len(self._workers) < self.size:
+                worker = BrowserWorker(
+                    self._tasks,
+                    self.max_pages_per_context,
+                    name=f"browser-worker-{len(self._workers)}"
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def close(self):
+        """关闭所有浏览器"""
+        with self._lock:
+            for _ in self._workers:
+                self._tasks.put(None)
+            for worker in self._workers:
+                worker.join(timeout=settings.scraping.headless_timeout)
+            self._workers = []
+
+
+# 全局浏览器池实例
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取全局浏览器池实例"""
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool()
+        return _browser_pool
+
+
+def close_browser_pool():
+    """关闭全局浏览器池"""
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is not None:
+            _browser_pool.close()
+            _browser_pool = None
@@ -0,0 +1,149 @@
+"""
+diff 结果缓存模块（按新旧内容哈希与敏感度缓存）
+"""
+
+import dataclasses
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.models.database import DiffResult
+from src.services.diff_engine import ChangeEvent, DiffChunk
+
+logger = logging.getLogger(__name__)
+
+# (旧内容哈希, 新内容哈希, 敏感度, diff 模式)
+DiffKey = Tuple[str, str, str, str]
+
+_MISSING = object()
+
+
+def _event_to_dict(event: Optional[ChangeEvent]) -> Optional[dict]:
+    return dataclasses.asdict(event) if event is not None else None
+
+
+def _event_from_dict(data: Optional[dict]) -> Optional[ChangeEvent]:
+    if data is None:
+        return None
+    return ChangeEvent(**{**data, "chunks": [DiffChunk(**chunk) for chunk in data["chunks"]]})
+
+
+def _copy(event: Optional[ChangeEvent]) -> Optional[ChangeEvent]:
+    """返回浅拷贝，调用方改写字段不影响缓存"""
+    return dataclasses.replace(event) if event is not None else None
+
+
+class DiffCache:
+    """
+    diff 结果缓存
+
+    内存中按 LRU 淘汰；开启持久化时未命中再查 diff_results 表。
+    无显著变化（compute_diff 返回 None）同样缓存。
+    """
+
+    def __init__(self, max_size: int = 256, persistent: bool = False):
+        self.max_size = max_size
+        self.persistent = persistent
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self,
+        db: Optional[Session],
+        key: DiffKey,
+        compute: Callable[[], Optional[ChangeEvent]]
+    ) -> Optional[ChangeEvent]:
+        """命中时返回缓存结果，否则调用 compute 计算并缓存"""
+        event = self._get_cached(key)
+        if event is _MISSING and self.persistent and db is not None:
+            event = self._load(db, key)
+            if event is not _MISSING:
+                self._put_cached(key, event)
+
+        with self._lock:
+            if event is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if event is not _MISSING:
+            return _copy(event)
+
+        event = compute()
+        self._put_cached(key, event)
+        if self.persistent and db is not None:
+            self._save(db, key, event)
+        return _copy(event)
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "max_size": self.max_size,
+                "persistent": self.persistent,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def clear(self):
+        """清空内存缓存与统计"""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def _digest(key: DiffKey) -> str:
+        return hashlib.sha256("\x00".join(key).encode("utf-8")).hexdigest()
+
+    def _load(self, db: Session, key: DiffKey):
+        row = db.query(DiffResult).filter(DiffResult.key == self._digest(key)).first()
+        if row is None:
+            return _MISSING
+        return _event_from_dict(row.result)
+
+    def _save(self, db: Session, key: DiffKey, event: Optional[ChangeEvent]):
+        try:
+            db.merge(DiffResult(key=self._digest(key), result=_event_to_dict(event)))
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Failed to persist diff result: {e}")
+
+    def _get_cached(self, key: DiffKey):
+        with self._lock:
+            if key not in self._cache:
+                return _MISSING
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _put_cached(self, key: DiffKey, event: Optional[ChangeEvent]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = event
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+
+# 全局实例
+_diff_cache = None
+
+
+def get_diff_cache() -> DiffCache:
+    """获取全局 diff 缓存实例"""
+    global _diff_cache
+    if _diff_cache is None:
+        _diff_cache = DiffCache(settings.diff.cache_size, settings.diff.cache_persistent)
+    return _diff_cache
@@ -5,9 +5,14 @@
 import hashlib
 import json
 import logging
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
 from dataclasses import dataclass, field
 from difflib import SequenceMatcher
-from typing import List, Optional, Tuple
+from itertools import accumulate, islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 from src.config import settings
 
@@ -16,11 +21,17 @@ logger = logging.getLogger(__name__)
 
 @dataclass
 class DiffChunk:
-    """差异块"""
+    """差异块（文本为摘录，完整内容按 old_range / new_range 从快照读取）"""
     type: str  # 'add' / 'remove' / 'replace'
     old_text: str
     new_text: str
     position: int
+    # 在旧 / 新文本中的字符区间 [start, end)
+    old_range: Optional[List[int]] = None
+    new_range: Optional[List[int]] = None
+    # 区块 diff 时附带所在区块的 CSS 路径与章节标题
+    css_path: Optional[str] = None
+    section: Optional[str] = None
 
 
 @dataclass
@@ -31,6 +42,16 @@ class ChangeEvent:
     change_ratio: float = 0.0
     added_lines: int = 0
     removed_lines: int = 0
+    # 新增 / 删除行的哈希（去重），供后续阶段复用
+    added_line_hashes: List[str] = field(default_factory=list)
+    removed_line_hashes: List[str] = field(default_factory=list)
+    # 结构化字段变化（见 StructuralDiffEngine.compare_fields）
+    structural_changes: List[dict] = field(default_factory=list)
+    # 噪声过滤结果（见 noise_filter.NoiseFilter.score）
+    noise_score: Optional[float] = None
+    is_suppressed: bool = False
+    # 超过 settings.diff.max_chunks 未保留的差异块数
+    omitted_chunks: int = 0
 
 
 # 默认忽略的 DOM 选择器
@@ -61,6 +82,226 @@ DIFF_SENSITIVITY = {
 }
 
 
+# 替换块新旧文本合计不超过该字符数时，在字符级细化以计算相似度；
+# 更大的替换块（长段落、压缩页面、readability 的单行输出）按词细化
+REFINE_MAX_CHARS = 4000
+
+# 词及其后的空白（拼接后与原文完全一致）
+_WORD_TOKEN = re.compile(r'\S+\s*|\s+')
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+class DiffBudget:
+    """diff 的比较次数与时间预算，用尽后剩余区间不再细分"""
+    
+    def __init__(self, max_operations: int, timeout: float):
+        self.remaining = max_operations
+        self.deadline = time.monotonic() + timeout
+        self.exhausted = False
+    
+    def spend(self, operations: int) -> bool:
+        """预扣 operations 次比较，预算不足返回 False"""
+        if self.exhausted or operations > self.remaining or time.monotonic() > self.deadline:
+            self.exhausted = True
+            return False
+        self.remaining -= operations
+        return True
+
+
+def line_hash(line: str) -> str:
+    """行哈希（64 位 blake2b）"""
+    return hashlib.blake2b(line.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@dataclass
+class LineChanges:
+    """按多重集合统计的行变化：重复行按出现次数计算"""
+    added: Counter
+    removed: Counter
+    
+    @classmethod
+    def between(cls, old_lines: Sequence[str], new_lines: Sequence[str]) -> "LineChanges":
+        old_counts = Counter(old_lines)
+        new_counts = Counter(new_lines)
+        return cls(added=new_counts - old_counts, removed=old_counts - new_counts)
+    
+    @property
+    def added_count(self) -> int:
+        return sum(self.added.values())
+    
+    @property
+    def removed_count(self) -> int:
+        return sum(self.removed.values())
+    
+    def added_hashes(self) -> List[str]:
+        return [line_hash(line) for line in self.added]
+    
+    def removed_hashes(self) -> List[str]:
+        return [line_hash(line) for line in self.removed]
+
+
+def _excerpt(segments: Sequence[str], start: int, end: int, separator: str, limit: int) -> str:
+    """segments[start:end] 以 separator 连接后的前 limit 个字符（只拼接所需的片段）"""
+    parts = []
+    size = 0
+    for index in range(start, end):
+        parts.append(segments[index])
+        size += len(segments[index]) + len(separator)
+        if size >= limit:
+            break
+    return separator.join(parts)[:limit]
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    """公共前缀长度（二分比较切片，比较在 C 层完成）"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def similarity_lower_bound(a: str, b: str) -> float:
+    """
+    相似度下界（与 ratio 同口径）：公共前缀与公共后缀必然能匹配
+    
+    长度之类的上界只能证明变化足够大，无法据此跳过 diff；
+    而下界足够高时可以直接判定变化低于阈值。
+    """
+    total = len(a) + len(b)
+    if total == 0:
+        return 1.0
+    prefix = _common_prefix_length(a, b)
+    suffix = _common_prefix_length(a[prefix:][::-1], b[prefix:][::-1])
+    return 2 * (prefix + suffix) / total
+
+
+def _token_matched_chars(old_block: str, new_block: str) -> int:
+    """按词 patience diff 两段文本，返回相同词的字符数（带比较次数与时间预算）"""
+    old_tokens = _WORD_TOKEN.findall(old_block)
+    new_tokens = _WORD_TOKEN.findall(new_block)
+    budget = DiffBudget(settings.diff.max_operations, settings.diff.timeout)
+    return sum(
+        sum(map(len, old_tokens[a0:a1]))
+        for opcode, a0, a1, _, _ in patience_opcodes(old_tokens, new_tokens, budget)
+        if opcode == 'equal'
+    )
+
+
+def _unique_lcs(
+    a: Sequence[str], a0: int, a1: int,
+    b: Sequence[str], b0: int, b1: int
+) -> List[Tuple[int, int]]:
+    """两侧各只出现一次的行中，按顺序能对齐的最长序列（patience sorting）"""
+    a_count = Counter(a[a0:a1])
+    b_count = Counter(b[b0:b1])
+    a_index = {a[i]: i for i in range(a0, a1)}
+    b_index = {b[j]: j for j in range(b0, b1)}
+    pairs = sorted(
+        (a_index[line], b_index[line]) for line, n in a_count.items()
+        if n == 1 and b_count.get(line) == 1
+    )
+    if not pairs:
+        return []
+
+    # 对 j 求最长递增子序列
+    tails: List[int] = []
+    tail_index: List[int] = []
+    back: List[int] = []
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pos] = j
+            tail_index[pos] = k
+        back.append(tail_index[pos - 1] if pos else -1)
+
+    result = []
+    k = tail_index[-1]
+    while k >= 0:
+        result.append(pairs[k])
+        k = back[k]
+    result.reverse()
+    return result
+
+
+def patience_opcodes(
+    a: Sequence[str],
+    b: Sequence[str],
+    budget: Optional[DiffBudget] = None
+) -> List[Opcode]:
+    """
+    行级 patience diff，返回与 SequenceMatcher.get_opcodes 相同格式的操作序列
+
+    以两侧都唯一的行为锚点切分，锚点之间递归处理；
+    没有唯一行的区间退回 SequenceMatcher（按行比较）。
+    预算用尽后，剩余未对齐的区间整段视为替换。
+    """
+    matches: List[Tuple[int, int]] = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a0, a1, b0, b1 = stack.pop()
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            matches.append((a0, b0))
+            a0 += 1
+            b0 += 1
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+            matches.append((a1, b1))
+        if a0 == a1 or b0 == b1:
+            continue
+
+        if budget is not None and not budget.spend(a1 - a0 + b1 - b0):
+            continue
+        anchors = _unique_lcs(a, a0, a1, b, b0, b1)
+        if not anchors:
+            if budget is not None and not budget.spend((a1 - a0) * (b1 - b0)):
+                continue
+            matcher = SequenceMatcher(None, a[a0:a1], b[b0:b1], autojunk=False)
+            for i, j, n in matcher.get_matching_blocks():
+                matches.extend((a0 + i + k, b0 + j + k) for k in range(n))
+            continue
+
+        prev_a, prev_b = a0, b0
+        for i, j in anchors:
+            stack.append((prev_a, i, prev_b, j))
+            matches.append((i, j))
+            prev_a, prev_b = i + 1, j + 1
+        stack.append((prev_a, a1, prev_b, b1))
+
+    matches.sort()
+    return _matches_to_opcodes(matches, len(a), len(b))
+
+
+def _matches_to_opcodes(matches: List[Tuple[int, int]], len_a: int, len_b: int) -> List[Opcode]:
+    """将有序的匹配行对转换为操作序列"""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for mi, mj in matches + [(len_a, len_b)]:
+        if i < mi and j < mj:
+            opcodes.append(("replace", i, mi, j, mj))
+        elif i < mi:
+            opcodes.append(("delete", i, mi, j, j))
+        elif j < mj:
+            opcodes.append(("insert", i, i, j, mj))
+        if mi == len_a and mj == len_b:
+            break
+        if opcodes and opcodes[-1][0] == "equal" and opcodes[-1][2] == mi:
+            _, e0, _, f0, _ = opcodes[-1]
+            opcodes[-1] = ("equal", e0, mi + 1, f0, mj + 1)
+        else:
+            opcodes.append(("equal", mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+
 class DiffEngine:
     """变更检测引擎"""
     
@@ -84,27 +325,52 @@ class DiffEngine:
             self.sensitivity = sensitivity
             self.config = DIFF_SENSITIVITY.get(sensitivity, DIFF_SENSITIVITY['medium'])
         
-        # 基本比较
-        ratio = SequenceMatcher(None, old_text, new_text).ratio()
-        change_ratio = 1 - ratio
+        if old_text == new_text:
+            return None
         
-        # 检查是否超过阈值
-        if change_ratio < self.config['min_change_ratio']:
-            logger.debug(f"Change ratio {change_ratio:.2%} below threshold {self.config['min_change_ratio']:.2%}")
+        # 廉价下界：公共前后缀已说明变化不可能超过阈值时，不做 diff
+        lower_bound = similarity_lower_bound(old_text, new_text)
+        if 1 - lower_bound < self.config['min_change_ratio']:
+            logger.debug(f"Change ratio at most {1 - lower_bound:.2%}, below threshold")
             return None
         
-        # 计算行变化
+        # 行变化计数是线性的，先于 diff 判断
         old_lines = old_text.split('\n')
         new_lines = new_text.split('\n')
-        added_lines = len([l for l in new_lines if l not in old_lines])
-        removed_lines = len([l for l in old_lines if l not in new_lines])
+        line_changes = LineChanges.between(old_lines, new_lines)
+        added_lines = line_changes.added_count
+        removed_lines = line_changes.removed_count
         
         if added_lines < self.config['min_line_changes'] and removed_lines < self.config['min_line_changes']:
             logger.debug(f"Line changes below threshold")
             return None
         
+        # diff 一次，相似度与差异块都由同一组操作序列得出：
+        # 短文本按字符比较，其余按行 patience diff（带比较次数与时间预算）
+        if len(old_text) + len(new_text) <= settings.diff.char_diff_max_chars:
+            old_segments, new_segments, separator = list(old_text), list(new_text), ''
+            matcher = SequenceMatcher(None, old_text, new_text, autojunk=False)
+            opcodes = matcher.get_opcodes()
+            ratio = matcher.ratio()
+        else:
+            old_segments, new_segments, separator = old_lines, new_lines, '\n'
+            budget = DiffBudget(settings.diff.max_operations, settings.diff.timeout)
+            opcodes = patience_opcodes(old_segments, new_segments, budget)
+            if budget.exhausted:
+                logger.warning(
+                    f"Diff budget exhausted ({len(old_segments)} -> {len(new_segments)} lines), "
+                    f"unaligned regions reported as replaced"
+                )
+            ratio = self._similarity(old_segments, new_segments, opcodes)
+        change_ratio = 1 - ratio
+        
+        # 检查是否超过阈值
+        if change_ratio < self.config['min_change_ratio']:
+            logger.debug(f"Change ratio {change_ratio:.2%} below threshold {self.config['min_change_ratio']:.2%}")
+            return None
+        
         # 生成差异块
-        chunks = self._generate_chunks(old_text, new_text)
+        chunks, omitted = self._collect_chunks(old_segments, new_segments, opcodes, separator)
         
         summary = self._generate_summary(chunks, change_ratio, added_lines, removed_lines)
         
@@ -113,28 +379,188 @@ class DiffEngine:
             chunks=chunks,
             change_ratio=change_ratio,
             added_lines=added_lines,
-            removed_lines=removed_lines
+            removed_lines=removed_lines,
+            added_line_hashes=line_changes.added_hashes(),
+            removed_line_hashes=line_changes.removed_hashes(),
+            omitted_chunks=omitted
         )
     
-    def _generate_chunks(self, old_text: str, new_text: str) -> List[DiffChunk]:
-        """生成差异块"""
-        matcher = SequenceMatcher(None, old_text, new_text)
-        chunks = []
+    def compute_block_diff(
+        self,
+        old_blocks: Sequence,
+        new_blocks: Sequence,
+        sensitivity: Optional[str] = None
+    ) -> Optional[ChangeEvent]:
+        """
+        计算区块差异（区块由 block_diff.split_blocks 生成）
         
-        for opcode, a0, a1, b0, b1 in matcher.get_opcodes():
-            old_segment = old_text[a0:a1]
-            new_segment = new_text[b0:b1]
-            
+        按区块哈希对齐，差异块附带 CSS 路径与章节标题；
+        position 为以换行连接的区块文本中的字符偏移。
+        """
+        if sensitivity:
+            self.sensitivity = sensitivity
+            self.config = DIFF_SENSITIVITY.get(sensitivity, DIFF_SENSITIVITY['medium'])
+        
+        old_hashes = [block.hash for block in old_blocks]
+        new_hashes = [block.hash for block in new_blocks]
+        if old_hashes == new_hashes:
+            return None
+        
+        old_texts = [block.text for block in old_blocks]
+        new_texts = [block.text for block in new_blocks]
+        lower_bound = similarity_lower_bound("\n".join(old_texts), "\n".join(new_texts))
+        if 1 - lower_bound < self.config['min_change_ratio']:
+            logger.debug(f"Change ratio at most {1 - lower_bound:.2%}, below threshold")
+            return None
+        
+        line_changes = LineChanges.between(old_texts, new_texts)
+        added_lines = line_changes.added_count
+        removed_lines = line_changes.removed_count
+        if added_lines < self.config['min_line_changes'] and removed_lines < self.config['min_line_changes']:
+            logger.debug(f"Block changes below threshold")
+            return None
+        
+        # 比较定长哈希而非区块文本
+        budget = DiffBudget(settings.diff.max_operations, settings.diff.timeout)
+        opcodes = patience_opcodes(old_hashes, new_hashes, budget)
+        if budget.exhausted:
+            logger.warning(
+                f"Diff budget exhausted ({len(old_hashes)} -> {len(new_hashes)} blocks), "
+                f"unaligned regions reported as replaced"
+            )
+        change_ratio = 1 - self._similarity(old_texts, new_texts, opcodes)
+        if change_ratio < self.config['min_change_ratio']:
+            logger.debug(f"Change ratio {change_ratio:.2%} below threshold {self.config['min_change_ratio']:.2%}")
+            return None
+        
+        chunks, omitted = self._collect_chunks(old_texts, new_texts, opcodes)
+        changed = [opcode for opcode in opcodes if opcode[0] != 'equal']
+        for chunk, (_, a0, _, b0, b1) in zip(chunks, changed):
+            block = new_blocks[b0] if b0 < b1 else old_blocks[a0]
+            chunk.css_path = block.css_path
+            chunk.section = block.section
+        
+        summary = self._generate_summary(chunks, change_ratio, added_lines, removed_lines)
+        
+        return ChangeEvent(
+            summary=summary,
+            chunks=chunks,
+            change_ratio=change_ratio,
+            added_lines=added_lines,
+            removed_lines=removed_lines,
+            added_line_hashes=line_changes.added_hashes(),
+            removed_line_hashes=line_changes.removed_hashes(),
+            omitted_chunks=omitted
+        )
+    
+    def _similarity(
+        self,
+        old_segments: List[str],
+        new_segments: List[str],
+        opcodes: List[Opcode]
+    ) -> float:
+        """
+        字符加权的相似度（与 SequenceMatcher.ratio 同口径：2 * 匹配字符数 / 总字符数）
+        
+        相同行整行计入；替换块在字符级（较小时）或词级（较大时）细化，
+        行内的小改动不会被算作整行变化。
+        """
+        # 每行长度计入换行符，使相同的空行也算作匹配
+        total = sum(map(len, old_segments)) + sum(map(len, new_segments)) + len(old_segments) + len(new_segments) - 2
+        if total <= 0:
+            return 1.0
+        
+        matched = 0
+        for opcode, a0, a1, b0, b1 in opcodes:
+            if opcode == 'equal':
+                matched += sum(map(len, old_segments[a0:a1])) + (a1 - a0) - (a1 == len(old_segments))
+            elif opcode == 'replace':
+                size = sum(map(len, old_segments[a0:a1])) + sum(map(len, new_segments[b0:b1]))
+                old_block = "\n".join(old_segments[a0:a1])
+                new_block = "\n".join(new_segments[b0:b1])
+                if size <= REFINE_MAX_CHARS:
+                    matcher = SequenceMatcher(None, old_block, new_block, autojunk=False)
+                    matched += sum(n for _, _, n in matcher.get_matching_blocks())
+                else:
+                    matched += _token_matched_chars(old_block, new_block)
+        return 2 * matched / total
+    
+    def _collect_chunks(
+        self,
+        old_segments: List[str],
+        new_segments: List[str],
+        opcodes: List[Opcode],
+        separator: str = '\n'
+    ) -> Tuple[List[DiffChunk], int]:
+        """
+        保留前 settings.diff.max_chunks 个差异块
+        
+        Returns:
+            (差异块, 未保留的差异块数)
+        """
+        changed = sum(1 for opcode in opcodes if opcode[0] != 'equal')
+        chunks = list(islice(
+            self.iter_chunks(old_segments, new_segments, opcodes, separator),
+            settings.diff.max_chunks
+        ))
+        return chunks, changed - len(chunks)
+    
+    def iter_chunks(
+        self,
+        old_segments: List[str],
+        new_segments: List[str],
+        opcodes: List[Opcode],
+        separator: str = '\n'
+    ) -> Iterator[DiffChunk]:
+        """
+        逐个生成差异块（position 为字符偏移）
+        
+        只拼接摘录所需的片段（settings.diff.excerpt_chars），不物化整段新旧文本；
+        超过 REFINE_MAX_CHARS 的替换块去掉公共前后缀，区间与摘录指向实际改动处。
+        """
+        step = len(separator)
+        old_offsets = [0, *accumulate(len(segment) + step for segment in old_segments)]
+        new_offsets = [0, *accumulate(len(segment) + step for segment in new_segments)]
+        limit = settings.diff.excerpt_chars
+        
+        for opcode, a0, a1, b0, b1 in opcodes:
             if opcode == 'equal':
                 continue
-            elif opcode == 'insert':
-                chunks.append(DiffChunk('add', '', new_segment, b0))
+            
+            old_pos = old_offsets[a0]
+            new_pos = new_offsets[b0]
+            old_range = [old_pos, old_offsets[a1] - step if a1 > a0 else old_pos]
+            new_range = [new_pos, new_offsets[b1] - step if b1 > b0 else new_pos]
+            if opcode == 'replace' \
+                    and old_range[1] - old_range[0] + new_range[1] - new_range[0] > REFINE_MAX_CHARS:
+                yield self._trimmed_chunk(
+                    separator.join(old_segments[a0:a1]), separator.join(new_segments[b0:b1]),
+                    old_pos, new_pos, limit
+                )
+                continue
+            old_excerpt = _excerpt(old_segments, a0, a1, separator, limit)
+            new_excerpt = _excerpt(new_segments, b0, b1, separator, limit)
+            
+            if opcode == 'insert':
+                yield DiffChunk('add', '', new_excerpt, new_pos, old_range, new_range)
             elif opcode == 'delete':
-                chunks.append(DiffChunk('remove', old_segment, '', a0))
+                yield DiffChunk('remove', old_excerpt, '', old_pos, old_range, new_range)
             elif opcode == 'replace':
-                chunks.append(DiffChunk('replace', old_segment, new_segment, max(a0, b0)))
-        
-        return chunks
+                yield DiffChunk('replace', old_excerpt, new_excerpt, max(old_pos, new_pos), old_range, new_range)
+    
+    @staticmethod
+    def _trimmed_chunk(old_block: str, new_block: str, old_pos: int, new_pos: int, limit: int) -> DiffChunk:
+        """去掉公共前后缀后的替换块"""
+        prefix = _common_prefix_length(old_block, new_block)
+        suffix = _common_prefix_length(old_block[prefix:][::-1], new_block[prefix:][::-1])
+        old_range = [old_pos + prefix, old_pos + len(old_block) - suffix]
+        new_range = [new_pos + prefix, new_pos + len(new_block) - suffix]
+        return DiffChunk(
+            'replace',
+            old_block[prefix:len(old_block) - suffix][:limit],
+            new_block[prefix:len(new_block) - suffix][:limit],
+            max(old_range[0], new_range[0]), old_range, new_range
+        )
     
     def _generate_summary(
         self,
@@ -162,12 +588,18 @@ class DiffEngine:
             "change_ratio": event.change_ratio,
             "added_lines": event.added_lines,
             "removed_lines": event.removed_lines,
+            "structural_changes": event.structural_changes,
+            "omitted_chunks": event.omitted_chunks,
             "chunks": [
                 {
                     "type": c.type,
-                    "old_text": c.old_text[:200] if c.old_text else "",
-                    "new_text": c.new_text[:200] if c.new_text else "",
-                    "position": c.position
+                    "old_text": c.old_text or "",
+                    "new_text": c.new_text or "",
+                    "position": c.position,
+                    "old_range": c.old_range,
+                    "new_range": c.new_range,
+                    "css_path": c.css_path,
+                    "section": c.section
                 }
                 for c in event.chunks
             ]
@@ -184,14 +616,32 @@ class StructuralDiffEngine:
         'email': r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',
         'date': r'\d{4}-\d{2}-\d{2}',
     }
+    _COMPILED = {
+        field_name: re.compile(pattern, re.IGNORECASE)
+        for field_name, pattern in FIELD_PATTERNS.items()
+    }
     
-    def detect_structural_changes(self, old_html: str, new_html: str) -> List[dict]:
-        """检测结构化字段变化"""
+    def extract_fields(self, content: str) -> Dict[str, List[str]]:
+        """
+        提取结构化字段（每个快照保存时执行一次，结果存入 Snapshot.structured_fields）
+        
+        Returns:
+            dict: {字段名: 去重排序后的取值列表}，未出现的字段不含在内
+        """
+        fields = {}
+        for field_name, pattern in self._COMPILED.items():
+            values = set(pattern.findall(content or ""))
+            if values:
+                fields[field_name] = sorted(values)
+        return fields
+    
+    def compare_fields(self, old_fields: Dict[str, List[str]], new_fields: Dict[str, List[str]]) -> List[dict]:
+        """比较两组已提取的字段（集合运算，无需重新扫描文档）"""
         changes = []
         
-        for field_name, pattern in self.FIELD_PATTERNS.items():
-            old_values = set(re.findall(pattern, old_html, re.IGNORECASE))
-            new_values = set(re.findall(pattern, new_html, re.IGNORECASE))
+        for field_name in self.FIELD_PATTERNS:
+            old_values = set(old_fields.get(field_name, ()))
+            new_values = set(new_fields.get(field_name, ()))
             
             added = new_values - old_values
             removed = old_values - new_values
@@ -199,12 +649,16 @@ class StructuralDiffEngine:
             if added or removed:
                 changes.append({
                     "field": field_name,
-                    "added": list(added),
-                    "removed": list(removed),
+                    "added": sorted(added),
+                    "removed": sorted(removed),
                     "type": "pricing" if field_name == "price" else "content"
                 })
         
         return changes
+    
+    def detect_structural_changes(self, old_html: str, new_html: str) -> List[dict]:
+        """检测结构化字段变化"""
+        return self.compare_fields(self.extract_fields(old_html), self.extract_fields(new_html))
 
 
 def detect_changes(
@@ -228,15 +682,13 @@ def detect_changes(
         "structural_changes": []
     }
     
+    if check_structural:
+        # 比较正文中的字段（与快照保存时的提取口径一致）
+        result["structural_changes"] = StructuralDiffEngine().detect_structural_changes(old_text, new_text)
+        if event:
+            event.structural_changes = result["structural_changes"]
+    
     if event:
         result["text_diff"] = diff_engine.to_json(event)
     
-    if check_structural:
-        # 需要 HTML 来检测结构化变化
-        # 简化处理：直接比较文本中的模式
-        struct_engine = StructuralDiffEngine()
-        # 注意：这里需要传入 HTML
-        # result["structural_changes"] = struct_engine.detect_structural_changes(old_html, new_html)
-        pass
-    
     return result
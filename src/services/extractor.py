@@ -0,0 +1,254 @@
+"""
+正文提取模块
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml import etree
+from lxml.cssselect import CSSSelector
+from readability import Document
+
+from src.config import settings
+from src.services.diff_engine import IGNORE_SELECTORS
+
+logger = logging.getLogger(__name__)
+
+# 块级标签：lxml 引擎在这些标签前后断行，每个块输出一行
+BLOCK_TAGS = frozenset([
+    "address", "article", "aside", "blockquote", "br", "caption", "dd", "details",
+    "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot",
+    "th", "thead", "tr", "ul"
+])
+
+
+@dataclass
+class ExtractOptions:
+    """正文提取选项"""
+    engine: str = "readability"  # readability/lxml
+    include_selectors: List[str] = field(default_factory=list)
+    exclude_selectors: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_source(cls, source=None) -> "ExtractOptions":
+        """全局配置 + 源级覆盖（源字段为空时沿用全局配置）"""
+        engine = getattr(source, "extract_engine", None) if source is not None else None
+        return cls(
+            engine=engine or settings.scraping.extract_engine,
+            include_selectors=list(getattr(source, "include_selectors", None) or []),
+            exclude_selectors=list(getattr(source, "exclude_selectors", None) or [])
+        )
+
+
+def extract_text(html: str, options: Optional[ExtractOptions] = None) -> str:
+    """按选项中的引擎提取正文（模块级函数，可在子进程中执行）"""
+    if options is not None and options.engine == "lxml":
+        return extract_text_lxml(html, options.include_selectors, options.exclude_selectors)
+    return extract_text_readability(html)
+
+
+def extract_text_readability(html: str) -> str:
+    """使用 Readability 提取正文"""
+    try:
+        doc = Document(html)
+        return doc.summary()
+    except Exception as e:
+        logger.warning(f"Readability extraction failed: {e}")
+        # Fallback: 使用 BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+        # 移除脚本和样式
+        for tag in soup(["script", "style", "nav", "footer"]):
+            tag.decompose()
+        return soup.get_text(separator="\n", strip=True)
+
+
+@lru_cache(maxsize=256)
+def compile_selectors(selectors: Tuple[str, ...]) -> Optional[CSSSelector]:
+    """将多个 CSS 选择器编译为一个（按选择器组合缓存）"""
+    if not selectors:
+        return None
+    return CSSSelector(", ".join(selectors))
+
+
+def extract_text_lxml(
+    html: str,
+    include_selectors: Optional[List[str]] = None,
+    exclude_selectors: Optional[List[str]] = None
+) -> str:
+    """
+    使用 lxml 提取正文
+
+    先移除 IGNORE_SELECTORS 与 exclude_selectors 命中的节点，
+    指定 include_selectors 时只保留命中的区域（按文档顺序）；
+    每个块级元素输出一行，行内空白折叠为单个空格，相同 HTML 输出完全一致。
+    """
+    if not html or not html.strip():
+        return ""
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError) as e:
+        logger.warning(f"lxml parse failed: {e}")
+        return ""
+
+    exclude = compile_selectors(tuple(IGNORE_SELECTORS) + tuple(exclude_selectors or ()))
+    for element in exclude(root):
+        # 祖先已被移除的节点不再处理
+        if element.getparent() is not None:
+            element.drop_tree()
+
+    include = compile_selectors(tuple(include_selectors or ()))
+    if include is not None:
+        regions = _outermost(include(root))
+    else:
+        body = root.find("body")
+        regions = [body if body is not None else root]
+
+    lines: List[str] = []
+    for region in regions:
+        lines.extend(_block_lines(region))
+    return "\n".join(lines)
+
+
+def _outermost(elements: list) -> list:
+    """去掉嵌套在其他命中节点内的节点，避免重复输出"""
+    selected = set(elements)
+    return [
+        element for element in elements
+        if not any(ancestor in selected for ancestor in element.iterancestors())
+    ]
+
+
+def _block_lines(root) -> List[str]:
+    return [text for _, text in iter_blocks(root)]
+
+
+def iter_blocks(root) -> Iterator[Tuple[etree._Element, str]]:
+    """
+    按块级元素切分文本，依次产出 (所属块元素, 折叠空白后的文本)
+
+    迭代遍历，深层嵌套页面不会触发递归上限。
+    """
+    parts: List[str] = []
+    open_blocks = [root]
+
+    def flush():
+        text = " ".join("".join(parts).split())
+        parts.clear()
+        return text
+
+    for event, element in etree.iterwalk(root, events=("start", "end")):
+        is_block = element.tag in BLOCK_TAGS and element is not root
+        if event == "start":
+            if is_block:
+                text = flush()
+                if text:
+                    yield open_blocks[-1], text
+                open_blocks.append(element)
+            # 注释与处理指令的 text 不是页面文本
+            if isinstance(element.tag, str) and element.text:
+                parts.append(element.text)
+        else:
+            if is_block:
+                text = flush()
+                if text:
+                    yield element, text
+                open_blocks.pop()
+            if element is not root and element.tail:
+                parts.append(element.tail)
+    text = flush()
+    if text:
+        yield root, text
+
+
+class ExtractionPool:
+    """
+    正文提取进程池
+
+    提取是 CPU 密集型且持有 GIL，放到独立进程中执行，
+    避免阻塞调度线程和抓取线程。workers 为 0 时在当前线程内执行。
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = settings.scraping.extract_workers if workers is None else workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, html: str, options: Optional[ExtractOptions] = None) -> Future:
+        """提交提取任务"""
+        if self.workers <= 0:
+            future: Future = Future()
+            try:
+                future.set_result(extract_text(html, options))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        executor = self._get_executor()
+        try:
+            return executor.submit(extract_text, html, options)
+        except BrokenProcessPool:
+            # 工作进程异常退出（如 OOM）后进程池不可再用，重建一次后重试
+            logger.warning("Extraction pool is broken, recreating it")
+            self._discard_executor(executor)
+            return self._get_executor().submit(extract_text, html, options)
+
+    def extract(self, html: str, options: Optional[ExtractOptions] = None) -> str:
+        """提取正文（阻塞等待结果）"""
+        return self.submit(html, options).result()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn：调度器进程中有多个线程，fork 可能继承被占用的锁
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """丢弃已损坏的进程池（其他线程可能已经重建过）"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def close(self):
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+# 全局进程池实例
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """获取全局提取进程池"""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = ExtractionPool()
+        return _extraction_pool
+
+
+def close_extraction_pool():
+    """关闭全局提取进程池"""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.close()
+            _extraction_pool = None
@@ -2,100 +2,534 @@
 抓取服务模块
 """
 
+import asyncio
+import codecs
 import hashlib
 import logging
 import re
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
-import requests
-from bs4 import BeautifulSoup
-from readability import Document
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+import lxml.html
+from lxml import etree
+from lxml.cssselect import CSSSelector
 from sqlalchemy.orm import Session
 
 from src.models.database import Snapshot, Source
 from src.config import settings
-from src.utils.storage import ensure_dir
+from src.services.browser_pool import HeadlessOptions, get_browser_pool
+from src.services.diff_engine import StructuralDiffEngine
+from src.services.extractor import ExtractOptions, get_extraction_pool, iter_blocks
+from src.services.fingerprint import exact_hash, fingerprint_fields
+from src.services.politeness import RobotsDisallowed, get_politeness_policy
+from src.services.resilience import (
+    CircuitOpenError, backoff_delay, get_circuit_breaker, is_retryable
+)
+from src.services.text_store import get_text_store
+from src.services.volatile_mask import get_volatile_masker
+from src.utils.blob_store import get_blob_store
+from src.utils.http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
 
+class ContentNotModified(Exception):
+    """页面自上次抓取后未变化（服务器返回 304 或响应体哈希一致）"""
+
+
+class ResponseTooLarge(Exception):
+    """响应体超过 scraping.max_body_bytes"""
+
+
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+
+def detect_charset(content_type: Optional[str], body: bytes) -> str:
+    """
+    确定响应编码：Content-Type 声明 > BOM > <meta> 声明 > UTF-8
+    
+    不使用 requests 的自动探测（无声明时对整个响应体做统计，较慢）。
+    """
+    candidates = []
+    if content_type:
+        match = _HEADER_CHARSET.search(content_type)
+        if match:
+            candidates.append(match.group(1))
+    if body.startswith(codecs.BOM_UTF8):
+        candidates.append("utf-8-sig")
+    match = _META_CHARSET.search(body[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii"))
+    
+    for charset in candidates:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
 class Fetcher:
     """网页抓取器"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": settings.scraping.user_agent
-        })
+        # 进程共享的连接池，多个 Fetcher 实例之间复用长连接
+        self.session = get_http_session()
+        self.politeness = get_politeness_policy()
+        self.circuit_breaker = get_circuit_breaker()
+        self.price_extractor = PriceExtractor()
+        self.structural_engine = StructuralDiffEngine()
+        self.volatile_masker = get_volatile_masker()
     
-    def fetch(self, url: str, render_js: bool = False) -> Tuple[str, str]:
+    def fetch(
+        self,
+        url: str,
+        render_js: bool = False,
+        validators: Optional[dict] = None,
+        headless_options: Optional[HeadlessOptions] = None,
+        extract_options: Optional[ExtractOptions] = None
+    ) -> Tuple[str, str]:
         """
         获取页面内容
         
+        Args:
+            url: 页面地址
+            render_js: 是否使用浏览器渲染
+            validators: 条件请求状态 {"etag", "last_modified", "body_hash"}，
+                请求时使用，响应后原地更新为新值
+            headless_options: 无头渲染选项（资源拦截、等待策略）
+            extract_options: 正文提取选项（引擎与选择器）
+        
         Returns:
             Tuple[html, text_content]
+        
+        Raises:
+            ContentNotModified: 页面未变化（304 或响应体哈希一致）
+            ResponseTooLarge: 响应体超过大小上限
         """
         try:
-            if render_js:
-                return self._fetch_with_browser(url)
-            else:
-                return self._fetch_simple(url)
+            html = self.download(url, render_js, validators, headless_options)
+            return html, self._extract_text(html, extract_options)
+        except ContentNotModified:
+            raise
         except Exception as e:
             logger.error(f"Failed to fetch {url}: {e}")
             raise
     
-    def _fetch_simple(self, url: str) -> Tuple[str, str]:
-        """简单 HTTP 请求"""
+    def download(
+        self,
+        url: str,
+        render_js: bool = False,
+        validators: Optional[dict] = None,
+        headless_options: Optional[HeadlessOptions] = None
+    ) -> str:
+        """
+        仅下载页面（不提取正文），参数同 fetch
+        
+        下载前检查 robots.txt 并按域名限速；可重试的失败按
+        scraping.retry_times 指数退避重试，并计入主机熔断状态。
+        
+        Returns:
+            str: html
+        
+        Raises:
+            RobotsDisallowed: robots.txt 禁止抓取
+            CircuitOpenError: 主机熔断中
+        """
+        attempt = 0
+        while True:
+            # 先检查熔断，熔断中的主机不占用限速令牌、也不等待
+            trial = self.circuit_breaker.check(url)
+            try:
+                self.politeness.wait(url)
+                html = self._download(url, render_js, validators, headless_options)
+            except ContentNotModified:
+                self.circuit_breaker.record_success(url)
+                raise
+            except Exception as e:
+                delay = self._retry_delay(url, e, attempt)
+                if delay is None:
+                    raise
+                logger.warning(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}): {e}")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            else:
+                self.circuit_breaker.record_success(url)
+                return html
+            finally:
+                # 试探请求未记录结果（如 robots.txt 禁止）时归还名额，避免主机一直被拦截
+                if trial:
+                    self.circuit_breaker.release_trial(url)
+    
+    def _retry_delay(self, url: str, error: Exception, attempt: int) -> Optional[float]:
+        """
+        处理一次下载失败
+        
+        Returns:
+            float: 重试前需等待的秒数；不应重试时返回 None
+        """
+        if isinstance(error, (RobotsDisallowed, CircuitOpenError)):
+            return None
+        if isinstance(error, ResponseTooLarge) or not is_retryable(error):
+            # 主机有响应（如 404），不计入熔断
+            self.circuit_breaker.record_success(url)
+            return None
+        
+        self.circuit_breaker.record_failure(url, error)
+        if attempt >= settings.scraping.retry_times:
+            return None
+        return backoff_delay(attempt)
+    
+    def _download(
+        self,
+        url: str,
+        render_js: bool = False,
+        validators: Optional[dict] = None,
+        headless_options: Optional[HeadlessOptions] = None
+    ) -> str:
+        """按抓取模式下载页面"""
+        if render_js:
+            return self._download_with_browser(url, headless_options)
+        return self._download_simple(url, validators)
+    
+    async def fetch_many(
+        self,
+        targets: List[tuple]
+    ) -> List[Union[Tuple[str, str], Exception]]:
+        """
+        并发抓取多个页面
+        
+        下载与正文提取是两个独立阶段：下载在线程池中并发执行，
+        全局并发受 scraping.max_concurrency 限制，同一主机的并发受
+        scraping.per_host_concurrency 限制；下载结果经有界队列
+        （scraping.extract_queue_size）交给提取进程池，提取跟不上时下载会等待。
+        
+        Args:
+            targets: [(url, render_js[, validators[, headless_options[, extract_options]]])] 列表
+        
+        Returns:
+            List: 与 targets 顺序一致，成功为 (html, text_content)，失败为异常对象
+        """
+        results: List[Union[Tuple[str, str], Exception, None]] = [None] * len(targets)
+        
+        def emit(index: int, result: Union[Tuple[str, str], Exception]):
+            results[index] = result
+        
+        await self._fetch_all(targets, emit)
+        return results
+    
+    async def _fetch_all(
+        self,
+        targets: List[tuple],
+        emit: Callable[[int, Union[Tuple[str, str], Exception]], None],
+        cancelled: Optional[threading.Event] = None
+    ):
+        """并发抓取，每个目标完成时以 (下标, 结果) 调用 emit；cancelled 置位后不再开始新的下载"""
+        max_concurrency = settings.scraping.max_concurrency
+        per_host = settings.scraping.per_host_concurrency
+        global_limit = asyncio.Semaphore(max_concurrency)
+        host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+        extract_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.scraping.extract_queue_size)
+        loop = asyncio.get_running_loop()
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            async def download_one(
+                index: int,
+                url: str,
+                render_js: bool,
+                validators: Optional[dict] = None,
+                headless_options: Optional[HeadlessOptions] = None,
+                extract_options: Optional[ExtractOptions] = None
+            ):
+                # 先占主机槽位、完成限速等待后再占全局槽位，
+                # 避免排队或限速中的同主机请求占用全局并发；
+                # 退避等待在事件循环中进行，同样不占用槽位
+                host = urlparse(url).netloc.lower()
+                attempt = 0
+                while True:
+                    if cancelled is not None and cancelled.is_set():
+                        return
+                    trial = False
+                    try:
+                        if self.circuit_breaker.is_open(url):
+                            raise CircuitOpenError(host)
+                        async with host_limits[host]:
+                            delay = await loop.run_in_executor(
+                                executor, self.politeness.reserve, url
+                            )
+                            await asyncio.sleep(delay)
+                            trial = self.circuit_breaker.check(url)
+                            async with global_limit:
+                                # 排队期间调用方可能已停止迭代
+                                if cancelled is not None and cancelled.is_set():
+                                    return
+                                html = await loop.run_in_executor(
+                                    executor, self._download, url, render_js,
+                                    validators, headless_options
+                                )
+                    except ContentNotModified as e:
+                        self.circuit_breaker.record_success(url)
+                        emit(index, e)
+                        return
+                    except Exception as e:
+                        delay = self._retry_delay(url, e, attempt)
+                        if delay is None:
+                            logger.error(f"Failed to fetch {url}: {e}")
+                            emit(index, e)
+                            return
+                        logger.warning(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}): {e}")
+                        await asyncio.sleep(delay)
+                        attempt += 1
+                        continue
+                    else:
+                        self.circuit_breaker.record_success(url)
+                        break
+                    finally:
+                        if trial:
+                            self.circuit_breaker.release_trial(url)
+                await extract_queue.put((index, html, extract_options))
+            
+            async def extract_worker():
+                while True:
+                    item = await extract_queue.get()
+                    if item is None:
+                        return
+                    index, html, extract_options = item
+                    try:
+                        text_content = await asyncio.wrap_future(
+                            self._submit_extraction(html, extract_options)
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to extract {targets[index][0]}: {e}")
+                        emit(index, e)
+                        continue
+                    emit(index, (html, text_content))
+            
+            extractors = [
+                asyncio.create_task(extract_worker())
+                for _ in range(max(1, settings.scraping.extract_workers))
+            ]
+            await asyncio.gather(*(
+                download_one(index, *target)
+                for index, target in enumerate(targets)
+            ))
+            for _ in extractors:
+                await extract_queue.put(None)
+            await asyncio.gather(*extractors)
+    
+    def fetch_batch(
+        self,
+        targets: List[tuple]
+    ) -> List[Union[Tuple[str, str], Exception]]:
+        """批量并发抓取（同步入口）"""
+        if not targets:
+            return []
+        return asyncio.run(self.fetch_many(targets))
+    
+    def iter_fetch_batch(
+        self,
+        targets: List[tuple]
+    ) -> Iterator[Tuple[int, Union[Tuple[str, str], Exception]]]:
+        """
+        批量并发抓取，按完成顺序逐个返回 (下标, 结果)
+        
+        抓取在后台线程的事件循环中进行，结果经有界队列（scraping.extract_queue_size）交给调用方：
+        调用方处理一个结果时其余抓取继续，处理跟不上时抓取会等待，内存中只保留少量页面。
+        提前停止迭代时不再开始新的下载。
+        """
+        if not targets:
+            return
+        
+        results: queue.Queue = queue.Queue(maxsize=max(1, settings.scraping.extract_queue_size))
+        stopped = threading.Event()
+        finished = object()
+        
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+        
+        def run():
+            try:
+                asyncio.run(self._fetch_all(targets, lambda index, result: put((index, result)), stopped))
+            except BaseException as e:
+                put(e)
+            put(finished)
+        
+        thread = threading.Thread(target=run, name="fetch-batch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            thread.join()
+    
+    def fetch_sources_batch(
+        self,
+        sources: Sequence[Source]
+    ) -> Iterator[Tuple[Source, Union[Tuple[str, str], Exception]]]:
+        """
+        批量并发抓取多个源，按完成顺序逐个返回 (源, 结果)
+        
+        结果为 (html, text_content)、ContentNotModified 或其他异常；
+        抓取成功或页面未变化时已将条件请求状态写回源（由调用方提交）。
+        """
+        validator_list = [source_validators(source) for source in sources]
+        results = self.iter_fetch_batch([
+            source_target(source, validators)
+            for source, validators in zip(sources, validator_list)
+        ])
+        for index, result in results:
+            if isinstance(result, ContentNotModified) or not isinstance(result, Exception):
+                apply_validators(sources[index], validator_list[index])
+            yield sources[index], result
+    
+    def _download_simple(self, url: str, validators: Optional[dict] = None) -> str:
+        """
+        简单 HTTP 请求（流式读取）
+        
+        边读边计算原始字节哈希，超过 scraping.max_body_bytes 立即中止；
+        哈希与 validators["body_hash"] 一致时视为未变化，跳过解码与提取。
+        """
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        
+        max_bytes = settings.scraping.max_body_bytes
         response = self.session.get(
             url,
-            timeout=settings.scraping.timeout
+            headers=headers,
+            timeout=settings.scraping.timeout,
+            stream=True
         )
-        response.raise_for_status()
+        try:
+            if response.status_code == 304:
+                raise ContentNotModified(url)
+            response.raise_for_status()
+            
+            content_length = response.headers.get("Content-Length")
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                raise ResponseTooLarge(f"{url}: {content_length} bytes")
+            
+            digest = hashlib.sha256()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ResponseTooLarge(f"{url}: more than {max_bytes} bytes")
+                digest.update(chunk)
+                chunks.append(chunk)
+        finally:
+            response.close()
         
-        html = response.text
-        text_content = self._extract_text(html)
+        body_hash = digest.hexdigest()
+        if validators is not None:
+            validators["etag"] = response.headers.get("ETag")
+            validators["last_modified"] = response.headers.get("Last-Modified")
+            previous_hash = validators.get("body_hash")
+            validators["body_hash"] = body_hash
+            if previous_hash == body_hash:
+                raise ContentNotModified(url)
         
-        return html, text_content
+        body = b"".join(chunks)
+        return body.decode(detect_charset(response.headers.get("Content-Type"), body), errors="replace")
     
-    def _fetch_with_browser(self, url: str) -> Tuple[str, str]:
+    def _download_with_browser(
+        self,
+        url: str,
+        options: Optional[HeadlessOptions] = None
+    ) -> str:
         """使用浏览器渲染（JS 页面）"""
         # 延迟导入以避免 Playwright 依赖
         try:
-            from playwright.sync_api import sync_playwright
+            import playwright.sync_api  # noqa: F401
         except ImportError:
             logger.warning("Playwright not installed, falling back to simple fetch")
-            return self._fetch_simple(url)
-        
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.goto(url, timeout=settings.scraping.headless_timeout * 1000)
-            # 等待网络空闲
-            page.wait_for_load_state("networkidle")
-            html = page.content()
-            browser.close()
-        
-        text_content = self._extract_text(html)
-        return html, text_content
-    
-    def _extract_text(self, html: str) -> str:
-        """使用 Readability 提取正文"""
-        try:
-            doc = Document(html)
-            return doc.summary()
-        except Exception as e:
-            logger.warning(f"Readability extraction failed: {e}")
-            # Fallback: 使用 BeautifulSoup
-            soup = BeautifulSoup(html, "html.parser")
-            # 移除脚本和样式
-            for tag in soup(["script", "style", "nav", "footer"]):
-                tag.decompose()
-            return soup.get_text(separator="\n", strip=True)
+            return self._download_simple(url)
+        
+        # 复用长驻浏览器池，避免每次抓取都启动浏览器
+        return get_browser_pool().render(url, options)
+    
+    def _submit_extraction(self, html: str, options: Optional[ExtractOptions] = None) -> Future:
+        """提交正文提取任务到进程池"""
+        return get_extraction_pool().submit(html, options)
+    
+    def _extract_text(self, html: str, options: Optional[ExtractOptions] = None) -> str:
+        """提取正文（在提取进程池中执行）"""
+        return self._submit_extraction(html, options).result()
     
     def compute_hash(self, content: str) -> str:
         """计算内容哈希"""
-        return hashlib.md5(content.encode()).hexdigest()
+        return exact_hash(content)
+    
+    def latest_fingerprints(self, db: Session, source_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """获取源最新快照的（精确哈希, 归一化哈希）"""
+        row = db.query(Snapshot.content_hash, Snapshot.normalized_hash)\
+            .filter(Snapshot.source_id == source_id)\
+            .order_by(Snapshot.fetched_at.desc())\
+            .first()
+        return tuple(row) if row else None
+    
+    def record_heartbeat(self, db: Session, source: Source):
+        """记录一次检查（不写快照）"""
+        source.last_checked_at = datetime.utcnow()
+        db.commit()
+    
+    def save_if_changed(
+        self,
+        db: Session,
+        source: Source,
+        html: str,
+        text_content: str
+    ) -> Optional[Snapshot]:
+        """
+        精确哈希或归一化哈希与最新快照不同时才保存快照（定价页同时保存结构化价格）
+        
+        哈希前先屏蔽易变区域，保存的正文也是屏蔽后的内容。
+        
+        Returns:
+            Snapshot: 新快照；内容未变化时只记录检查时间并返回 None
+        """
+        text_content = self.volatile_masker.apply(source, html, text_content)
+        fingerprints = fingerprint_fields(text_content)
+        latest = self.latest_fingerprints(db, source.id)
+        if latest is not None and (
+            fingerprints["content_hash"] == latest[0] or fingerprints["normalized_hash"] == latest[1]
+        ):
+            logger.info(f"Content unchanged for source {source.id}")
+            self.record_heartbeat(db, source)
+            return None
+        
+        source.last_checked_at = datetime.utcnow()
+        price_data = None
+        if source.source_type == "pricing":
+            price_data = self.price_extractor.extract(html)["prices"]
+        return self.save_snapshot(
+            db, source.id, html, text_content,
+            fingerprints=fingerprints, price_data=price_data
+        )
     
     def save_snapshot(
         self,
@@ -103,27 +537,25 @@ class Fetcher:
         source_id: str,
         html: str,
         text_content: str,
-        screenshots_dir: Optional[Path] = None
+        screenshots_dir: Optional[Path] = None,
+        fingerprints: Optional[dict] = None,
+        price_data: Optional[list] = None
     ) -> Snapshot:
         """保存快照"""
-        content_hash = self.compute_hash(text_content)
+        if fingerprints is None:
+            fingerprints = fingerprint_fields(text_content)
         
-        # 保存 HTML 文件
-        html_path = None
-        snapshots_dir = Path(settings.storage.base_path) / "snapshots"
-        ensure_dir(snapshots_dir)
-        
-        html_filename = f"{source_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.html"
-        html_path = snapshots_dir / html_filename
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(html)
+        # 保存 HTML（内容寻址，相同内容只存一份）
+        html_path = get_blob_store().put(db, html.encode("utf-8"))
         
         snapshot = Snapshot(
             source_id=source_id,
-            content_hash=content_hash,
-            text_content=text_content,
-            html_path=str(html_path),
-            fetched_at=datetime.utcnow()
+            html_path=html_path,
+            price_data=price_data,
+            structured_fields=self.structural_engine.extract_fields(text_content),
+            fetched_at=datetime.utcnow(),
+            **fingerprints,
+            **get_text_store().build_fields(db, source_id, text_content)
         )
         
         db.add(snapshot)
@@ -133,67 +565,223 @@ class Fetcher:
         return snapshot
 
 
+@dataclass
+class PriceRecord:
+    """价格记录"""
+    amount: float
+    currency: Optional[str]  # ISO 代码，如 USD/CNY
+    period: Optional[str]  # month/year，一次性或未标注为 None
+    plan: Optional[str]  # 套餐名（价格前的短文本或最近的标题）
+    text: str  # 所在文本块
+
+
 class PriceExtractor:
-    """价格结构化提取器"""
+    """
+    价格结构化提取器
+
+    只解析一次 HTML，跳过 script/style 与隐藏元素，逐个可见文本块
+    用预编译的正则识别价格、币种与计费周期。
+    """
+    
+    CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "¥": "CNY", "￥": "CNY"}
+    CURRENCY_CODES = {"usd": "USD", "eur": "EUR", "gbp": "GBP", "cny": "CNY",
+                      "rmb": "CNY", "人民币": "CNY", "元": "CNY"}
     
-    # 常见价格模式
-    PRICE_PATTERNS = [
-        r'\$([0-9]+(?:\.[0-9]{2})?)',  # $29.99
-        r'([0-9]+(?:\.[0-9]{2})?)\s*(?:USD|EUR|人民币|元)',  # 29.99 USD
-        r'(免费|Free|free)\s*$',  # 免费
-        r'(?:每月|monthly|per month)[:\s]*\$?([0-9]+)',  # 每月 $29
-        r'(?:每年|yearly|per year)[:\s]*\$?([0-9]+)',  # 每年 $290
-    ]
+    _AMOUNT = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+    PRICE_PATTERN = re.compile(
+        rf"(?P<symbol>[$€£¥￥])\s?(?P<amount>{_AMOUNT})"
+        rf"|(?P<code_amount>{_AMOUNT})\s*(?P<code>USD|EUR|GBP|CNY|RMB|人民币|元)",
+        re.I
+    )
+    # 价格后的周期：$29/month、$29 per user / mo、29元/月
+    PERIOD_AFTER = re.compile(
+        r"\s*(?:/|per|a|每)?\s*(?:(?:user|seat|用户)\s*(?:/|per|每)?\s*)?"
+        r"(?P<period>months?|mo|monthly|years?|yr|annum|annually|月|年)(?![a-z])",
+        re.I
+    )
+    # 价格前的周期：每月 $29、Monthly: $29
+    PERIOD_BEFORE = re.compile(
+        r"(?P<period>monthly|per month|每月|按月|yearly|annually|per year|每年|按年)\s*[:：]?\s*$",
+        re.I
+    )
+    FREE_PATTERN = re.compile(r"^(?:free|免费)$", re.I)
+    PLAN_SEPARATORS = " -–—:：|·"
+    HEADING_TAGS = frozenset(["h1", "h2", "h3", "h4", "h5", "h6"])
+    INVISIBLE = CSSSelector(
+        "script, style, noscript, template, head, [hidden], [aria-hidden='true'], "
+        "[style*='display:none'], [style*='display: none']"
+    )
     
     def extract(self, html: str) -> dict:
-        """提取价格信息"""
-        soup = BeautifulSoup(html, "html.parser")
-        
-        prices = []
+        """
+        提取价格信息
         
-        # 查找可能的价格元素
-        for pattern in self.PRICE_PATTERNS:
-            matches = re.findall(pattern, html, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    prices.append(match[0])
-                else:
-                    prices.append(match)
+        Returns:
+            dict: prices（PriceRecord 字典列表）、detected_prices（去重后的金额）、
+                price_elements（含价格的块元素）
+        """
+        records = self.extract_records(html)
+        elements = []
+        seen = set()
+        for record, element in records:
+            if id(element) in seen:
+                continue
+            seen.add(id(element))
+            elements.append({
+                "tag": element.tag,
+                "classes": (element.get("class") or "").split(),
+                "text_preview": record.text[:200]
+            })
         
+        prices = [asdict(record) for record, _ in records]
         return {
-            "detected_prices": list(set(prices)),
-            "price_elements": self._find_price_elements(soup)
+            "prices": prices,
+            "detected_prices": sorted({self._format_amount(p["amount"]) for p in prices}),
+            "price_elements": elements
         }
     
-    def _find_price_elements(self, soup: BeautifulSoup) -> list:
-        """查找价格相关 DOM 元素"""
-        elements = []
+    def extract_records(self, html: str) -> List[Tuple[PriceRecord, object]]:
+        """提取价格记录及其所在块元素"""
+        if not html or not html.strip():
+            return []
+        try:
+            root = lxml.html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            return []
+        for element in self.INVISIBLE(root):
+            if element.getparent() is not None:
+                element.drop_tree()
         
-        # 查找包含价格的表格或卡片
-        for card in soup.find_all(['div', 'section'], class_=re.compile(r'price|card|plan|tier', re.I)):
-            price_text = card.get_text(strip=True)[:200]
-            elements.append({
-                "tag": card.name,
-                "classes": card.get('class', []),
-                "text_preview": price_text
-            })
+        records = []
+        heading = None
+        for element, text in iter_blocks(root):
+            if element.tag in self.HEADING_TAGS:
+                heading = text[:80]
+            for record in self._scan_block(text, heading):
+                records.append((record, element))
+        return records
+    
+    def _scan_block(self, text: str, heading: Optional[str]) -> List[PriceRecord]:
+        if self.FREE_PATTERN.match(text):
+            return [PriceRecord(0.0, None, None, heading, text)]
         
-        return elements
+        records = []
+        for match in self.PRICE_PATTERN.finditer(text):
+            if match.group("symbol"):
+                amount = match.group("amount")
+                currency = self.CURRENCY_SYMBOLS[match.group("symbol")]
+            else:
+                amount = match.group("code_amount")
+                currency = self.CURRENCY_CODES[match.group("code").lower()]
+            
+            prefix = text[:match.start()]
+            period = self.PERIOD_AFTER.match(text, match.end())
+            if period is None:
+                period = self.PERIOD_BEFORE.search(prefix)
+            
+            records.append(PriceRecord(
+                amount=float(amount.replace(",", "")),
+                currency=currency,
+                period=self._normalize_period(period.group("period")) if period else None,
+                plan=self._plan_name(prefix) or heading,
+                text=text[:200]
+            ))
+        return records
+    
+    def _plan_name(self, prefix: str) -> Optional[str]:
+        """价格前的短文本视为套餐名，如 "Pro - $99/month" """
+        name = self.PERIOD_BEFORE.sub("", prefix).strip(self.PLAN_SEPARATORS)
+        if name and len(name) <= 40 and not self.PRICE_PATTERN.search(name):
+            return name
+        return None
+    
+    @staticmethod
+    def _normalize_period(period: str) -> str:
+        period = period.lower()
+        if period.startswith(("mo", "per mo", "每月", "按月")) or period == "月":
+            return "month"
+        return "year"
+    
+    @staticmethod
+    def _format_amount(amount: float) -> str:
+        return f"{amount:g}" if amount == int(amount) else f"{amount:.2f}"
+
+
+def source_validators(source: Source) -> dict:
+    """读取源的条件请求状态"""
+    return {
+        "etag": source.etag,
+        "last_modified": source.last_modified,
+        "body_hash": source.body_hash
+    }
+
+
+def source_target(source: Source, validators: dict) -> tuple:
+    """源的抓取参数（Fetcher.fetch 的位置参数，也是 fetch_batch 的一个目标）"""
+    return (
+        source.url,
+        source.fetch_mode == "headless",
+        validators,
+        HeadlessOptions.from_source(source),
+        ExtractOptions.from_source(source)
+    )
+
+
+def apply_validators(source: Source, validators: dict):
+    """将响应中的条件请求状态写回源（由调用方提交）"""
+    source.etag = validators.get("etag")
+    source.last_modified = validators.get("last_modified")
+    source.body_hash = validators.get("body_hash")
+
+
+def latest_snapshot(db: Session, source_id: str) -> Optional[Snapshot]:
+    """获取源的最新快照"""
+    return db.query(Snapshot)\
+        .filter(Snapshot.source_id == source_id)\
+        .order_by(Snapshot.fetched_at.desc())\
+        .first()
 
 
 def fetch_source(source_id: str, db: Session) -> Optional[Snapshot]:
-    """抓取单个源"""
+    """抓取单个源（页面未变化时返回最新快照）"""
     source = db.query(Source).filter(Source.id == source_id).first()
     if not source or not source.is_active:
         return None
     
     fetcher = Fetcher()
-    render_js = source.fetch_mode == "headless"
+    validators = source_validators(source)
     
     try:
-        html, text_content = fetcher.fetch(source.url, render_js)
-        snapshot = fetcher.save_snapshot(db, source_id, html, text_content)
-        return snapshot
+        html, text_content = fetcher.fetch(*source_target(source, validators))
+        apply_validators(source, validators)
+        snapshot = fetcher.save_if_changed(db, source, html, text_content)
+        return snapshot or latest_snapshot(db, source_id)
+    except ContentNotModified:
+        logger.info(f"Source {source_id} not modified")
+        apply_validators(source, validators)
+        fetcher.record_heartbeat(db, source)
+        return latest_snapshot(db, source_id)
     except Exception as e:
         logger.error(f"Failed to fetch source {source_id}: {e}")
         return None
+
+
+def fetch_sources(source_ids: List[str], db: Session) -> List[Optional[Snapshot]]:
+    """并发抓取多个源（页面未变化时返回最新快照）"""
+    sources = db.query(Source).filter(Source.id.in_(source_ids)).all()
+    sources_by_id = {str(s.id): s for s in sources if s.is_active}
+    
+    fetcher = Fetcher()
+    saved = {}
+    for source, result in fetcher.fetch_sources_batch(list(sources_by_id.values())):
+        if isinstance(result, ContentNotModified):
+            fetcher.record_heartbeat(db, source)
+            saved[str(source.id)] = latest_snapshot(db, source.id)
+        elif isinstance(result, Exception):
+            logger.error(f"Failed to fetch source {source.id}: {result}")
+        else:
+            html, text_content = result
+            snapshot = fetcher.save_if_changed(db, source, html, text_content)
+            saved[str(source.id)] = snapshot or latest_snapshot(db, source.id)
+    
+    return [saved.get(str(source_id)) for source_id in source_ids]
@@ -0,0 +1,142 @@
+"""
+快照指纹模块
+
+每个快照保存三级指纹，按从廉价到昂贵的顺序判断是否需要 diff：
+精确哈希相同 -> 跳过；归一化文本哈希相同 -> 跳过；
+simhash 距离不超过阈值 -> 近似重复，低优先级；其余做完整 diff。
+"""
+
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from src.models.database import Snapshot
+
+SIMHASH_BITS = 64
+# simhash 切分为 4 段 16 位：海明距离不超过 3 的两个指纹至少有一段完全相同
+SIMHASH_BANDS = 4
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+_ZERO_WIDTH = re.compile("[\u200b-\u200d\u2060\ufeff]")
+_TOKEN = re.compile(r"\w+")
+
+
+def exact_hash(text: str) -> str:
+    """精确哈希（128 位 blake2b）"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """归一化：NFKC、去零宽字符、折叠空白"""
+    text = _ZERO_WIDTH.sub("", unicodedata.normalize("NFKC", text))
+    return " ".join(text.split())
+
+
+def normalized_hash(text: str) -> str:
+    """归一化文本的哈希（空白、全半角等差异不计为变化）"""
+    return exact_hash(normalize_text(text))
+
+
+def simhash(text: str) -> int:
+    """64 位 simhash（特征为相邻两词，按出现次数加权），返回无符号整数"""
+    tokens = _TOKEN.findall(normalize_text(text).lower())
+    features = Counter(zip(tokens, tokens[1:])) if len(tokens) > 1 else Counter(tokens)
+    if not features:
+        return 0
+
+    weights = [0] * SIMHASH_BITS
+    for feature, count in features.items():
+        digest = int.from_bytes(
+            hashlib.blake2b(repr(feature).encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if digest >> bit & 1 else -count
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个 simhash 的海明距离（兼容有符号存储值）"""
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+
+def _to_signed(value: int) -> int:
+    """BIGINT 为有符号 64 位"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def simhash_bands(value: int) -> List[int]:
+    """切分为 SIMHASH_BANDS 段（低位在前）"""
+    value &= (1 << SIMHASH_BITS) - 1
+    return [(value >> (i * _BAND_BITS)) & _BAND_MASK for i in range(SIMHASH_BANDS)]
+
+
+def fingerprint_fields(text: str) -> dict:
+    """
+    生成快照的指纹字段
+
+    Returns:
+        dict: Snapshot 的 content_hash / normalized_hash / simhash / simhash_b0..b3
+    """
+    value = simhash(text)
+    fields = {
+        "content_hash": exact_hash(text),
+        "normalized_hash": normalized_hash(text),
+        "simhash": _to_signed(value),
+    }
+    for i, band in enumerate(simhash_bands(value)):
+        fields[f"simhash_b{i}"] = band
+    return fields
+
+
+def is_near_duplicate(old: Snapshot, new: Snapshot, threshold: int) -> bool:
+    """两个快照的 simhash 距离不超过 threshold（缺少指纹时返回 False）"""
+    if old.simhash is None or new.simhash is None:
+        return False
+    return hamming_distance(old.simhash, new.simhash) <= threshold
+
+
+def find_similar(
+    db: Session,
+    value: int,
+    max_distance: int = 3,
+    source_id: Optional[str] = None,
+    limit: int = 20
+) -> List[Snapshot]:
+    """
+    按 simhash 查找近似快照（先用分段索引取候选，再精确计算距离）
+
+    max_distance 不能超过 SIMHASH_BANDS - 1，否则候选可能遗漏。
+    """
+    if max_distance >= SIMHASH_BANDS:
+        raise ValueError(f"max_distance must be less than {SIMHASH_BANDS}")
+
+    bands = simhash_bands(value)
+    query = db.query(Snapshot).filter(or_(*(
+        getattr(Snapshot, f"simhash_b{i}") == band for i, band in enumerate(bands)
+    )))
+    if source_id is not None:
+        query = query.filter(Snapshot.source_id == source_id)
+
+    matches = []
+    for snapshot in query:
+        if snapshot.simhash is None:
+            continue
+        distance = hamming_distance(value, snapshot.simhash)
+        if distance <= max_distance:
+            matches.append((distance, snapshot))
+    # 按距离排序，距离相同时新快照在前（两次稳定排序）
+    matches.sort(key=lambda item: item[1].fetched_at or datetime.min, reverse=True)
+    matches.sort(key=lambda item: item[0])
+    return [snapshot for _, snapshot in matches[:limit]]
@@ -8,6 +8,7 @@ from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 
 from src.config import settings
+from src.utils.http_client import get_httpx_client
 
 logger = logging.getLogger(__name__)
 
@@ -112,6 +113,8 @@ class LLMAnalyzer:
 """
         # 添加变更片段
         for i, chunk in enumerate(chunks[:5]):  # 最多 5 个片段
+            if chunk.get("section"):
+                prompt += f"\n[{i+1}] 所在章节: {chunk['section']}\n"
             if chunk.get("new_text"):
                 prompt += f"\n[{i+1}] 新增内容:\n{chunk['new_text'][:500]}\n"
             if chunk.get("old_text"):
@@ -157,9 +160,14 @@ class LLMAnalyzer:
             return self._mock_response()
         
         import openai
+        client_kwargs = {}
+        http_client = get_httpx_client()
+        if http_client is not None:
+            client_kwargs["http_client"] = http_client
         client = openai.OpenAI(
             api_key=self.api_key,
-            base_url=getattr(settings.llm, "api_base_url", None)
+            base_url=getattr(settings.llm, "api_base_url", None),
+            **client_kwargs
         )
         
         # 为了更好的兼容性（特别是 Qwen），也可以在 prompt 中强调 JSON，而不强制依赖 response_format
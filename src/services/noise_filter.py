@@ -0,0 +1,153 @@
+"""
+噪声过滤模块
+
+按每个源的用户反馈（Feedback.is_useful）在线训练逻辑回归，
+对新的变更事件给出噪声概率，疑似噪声的事件不做 AI 分析与通知。
+"""
+
+import logging
+import math
+import re
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.models.database import ChangeEvent as ChangeEventModel, Source
+from src.services.diff_engine import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = [
+    "change_ratio",
+    "added_lines",  # log1p 缩放
+    "removed_lines",
+    "chunks",
+    "short_chunk_ratio",  # 变更文本少于 20 个字符的块占比
+    "digit_only_ratio",  # 只有数字不同的块占比（计数器、日期）
+    "digit_char_ratio",  # 变更文本中数字字符占比
+    "price_changed",  # 结构化字段中价格有变化
+]
+
+_DIGITS = re.compile(r"\d")
+
+
+def extract_features(event: ChangeEvent) -> List[float]:
+    """从变更事件提取特征（顺序见 FEATURE_NAMES）"""
+    chunks = event.chunks
+    short = digit_only = digit_chars = total_chars = 0
+    for chunk in chunks:
+        changed = chunk.old_text + chunk.new_text
+        total_chars += len(changed)
+        digit_chars += len(_DIGITS.findall(changed))
+        if len(changed) < 20:
+            short += 1
+        if chunk.old_text and chunk.new_text \
+                and _DIGITS.sub("0", chunk.old_text) == _DIGITS.sub("0", chunk.new_text):
+            digit_only += 1
+
+    n = max(len(chunks), 1)
+    return [
+        event.change_ratio,
+        math.log1p(event.added_lines) / 5,
+        math.log1p(event.removed_lines) / 5,
+        math.log1p(len(chunks)) / 5,
+        short / n,
+        digit_only / n,
+        digit_chars / total_chars if total_chars else 0.0,
+        float(any(c.get("field") == "price" for c in event.structural_changes)),
+    ]
+
+
+def _sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1 / (1 + math.exp(-z))
+
+
+class NoiseFilter:
+    """
+    噪声过滤器
+
+    模型保存在 Source.noise_model（{weights, bias, samples}），
+    每收到一条反馈做一步 SGD，无需全量重训。
+    """
+
+    def score(self, source: Source, event: ChangeEvent) -> List[float]:
+        """
+        为变更事件打分，写入 event.noise_score / event.is_suppressed
+
+        Returns:
+            list: 特征向量（随事件保存，收到反馈时用于训练）
+        """
+        features = extract_features(event)
+        model = source.noise_model
+        if not settings.noise.enabled or not model:
+            return features
+
+        event.noise_score = self.predict(model, features)
+        event.is_suppressed = model.get("samples", 0) >= settings.noise.min_samples \
+            and event.noise_score >= settings.noise.suppress_threshold
+        return features
+
+    def predict(self, model: dict, features: List[float]) -> float:
+        """噪声概率"""
+        weights = model.get("weights") or [0.0] * len(features)
+        z = model.get("bias", 0.0) + sum(w * x for w, x in zip(weights, features))
+        return _sigmoid(z)
+
+    def learn(self, db: Session, change_event: ChangeEventModel, is_useful: bool) -> bool:
+        """
+        用一条反馈更新源的模型（调用方负责提交事务）
+
+        Returns:
+            bool: 是否更新（事件缺少特征时跳过）
+        """
+        features = change_event.noise_features
+        source = change_event.source
+        if not features or source is None:
+            return False
+
+        model = dict(source.noise_model or {})
+        weights = list(model.get("weights") or [0.0] * len(features))
+        bias = model.get("bias", 0.0)
+
+        # 标签：无用即噪声
+        error = self.predict({"weights": weights, "bias": bias}, features) - (0.0 if is_useful else 1.0)
+        rate = settings.noise.learning_rate
+        weights = [
+            w - rate * (error * x + settings.noise.l2 * w)
+            for w, x in zip(weights, features)
+        ]
+        model.update(
+            weights=weights,
+            bias=bias - rate * error,
+            samples=model.get("samples", 0) + 1
+        )
+        source.noise_model = model
+        return True
+
+    def stats(self, source: Source) -> dict:
+        """模型状态"""
+        model = source.noise_model or {}
+        return {
+            "enabled": settings.noise.enabled,
+            "samples": model.get("samples", 0),
+            "active": model.get("samples", 0) >= settings.noise.min_samples,
+            "bias": model.get("bias", 0.0),
+            "weights": dict(zip(FEATURE_NAMES, model.get("weights") or []))
+        }
+
+
+# 全局实例
+_noise_filter = None
+
+
+def get_noise_filter() -> NoiseFilter:
+    """获取全局噪声过滤器"""
+    global _noise_filter
+    if _noise_filter is None:
+        _noise_filter = NoiseFilter()
+    return _noise_filter
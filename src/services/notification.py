@@ -7,10 +7,9 @@ import logging
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
-import requests
-
 from src.models.database import Subscription, ChangeEvent, Insight
 from src.config import settings
+from src.utils.http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -67,7 +66,7 @@ class NotificationService:
             return
         
         try:
-            response = requests.post(
+            response = get_http_session().post(
                 url,
                 json=payload,
                 headers={"Content-Type": "application/json"},
@@ -150,7 +149,8 @@ class WeeklyDigestGenerator:
         
         # 查询变更事件
         query = db.query(ChangeEvent).filter(
-            ChangeEvent.created_at >= week_ago
+            ChangeEvent.created_at >= week_ago,
+            ChangeEvent.is_suppressed.isnot(True)
         )
         
         if competitor_ids:
@@ -218,6 +218,10 @@ def send_change_notifications(
         logger.error(f"Change event {change_event_id} not found")
         return
     
+    if change_event.is_suppressed:
+        logger.info(f"Change event {change_event_id} suppressed as noise, not notifying")
+        return
+    
     # 获取关联洞察
     insights = db.query(Insight).filter(
         Insight.change_event_id == change_event_id
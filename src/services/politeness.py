@@ -0,0 +1,185 @@
+"""
+抓取礼貌策略模块（robots.txt 与按域名限速）
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from src.config import settings
+from src.utils.http_client import get_http_session
+
+logger = logging.getLogger(__name__)
+
+
+class RobotsDisallowed(Exception):
+    """robots.txt 禁止抓取该地址"""
+
+
+class TokenBucket:
+    """
+    令牌桶限速器
+
+    reserve() 不阻塞，只预占一个令牌并返回需要等待的秒数，
+    调用方可自行选择 time.sleep 或 asyncio.sleep。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_limits(self, rate: float, burst: int):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self.burst = burst
+            self.tokens = min(self.tokens, float(burst))
+
+    def reserve(self) -> float:
+        """预占一个令牌，返回需等待的秒数"""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RobotsCache:
+    """robots.txt 缓存（按站点缓存，带 TTL）"""
+
+    # robots.txt 返回 5xx 时暂时禁止抓取，较短时间后重新获取
+    ERROR_TTL = 300
+
+    def __init__(self, session: Optional[requests.Session] = None, ttl: Optional[int] = None):
+        self.session = session or get_http_session()
+        self.ttl = settings.scraping.robots_cache_ttl if ttl is None else ttl
+        self._entries: Dict[str, Tuple[float, RobotFileParser]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> RobotFileParser:
+        """获取 url 所在站点的 robots 规则"""
+        parsed = urlparse(url)
+        site = f"{parsed.scheme}://{parsed.netloc}"
+
+        with self._lock:
+            entry = self._entries.get(site)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        parser, ttl = self._load(site)
+        with self._lock:
+            self._entries[site] = (time.monotonic() + ttl, parser)
+        return parser
+
+    def _load(self, site: str) -> Tuple[RobotFileParser, float]:
+        """
+        获取并解析 robots.txt
+
+        Returns:
+            (规则, 缓存秒数)
+        """
+        parser = RobotFileParser(f"{site}/robots.txt")
+        try:
+            response = self.session.get(
+                f"{site}/robots.txt",
+                headers={"User-Agent": settings.scraping.user_agent},
+                timeout=settings.scraping.timeout
+            )
+        except Exception as e:
+            # 无法获取 robots.txt 时放行，下个 TTL 周期再试
+            logger.warning(f"Failed to fetch robots.txt for {site}: {e}")
+            parser.allow_all = True
+            return parser, self.ttl
+
+        # 与 RobotFileParser.read 一致：401/403 视为全部禁止，其余 4xx 视为全部允许；
+        # 5xx 时站点状态未知，暂时全部禁止，ERROR_TTL 后重试
+        if response.status_code in (401, 403):
+            parser.disallow_all = True
+        elif response.status_code >= 500:
+            logger.warning(f"robots.txt for {site} returned {response.status_code}, disallowing temporarily")
+            parser.disallow_all = True
+            return parser, min(self.ttl, self.ERROR_TTL)
+        elif response.status_code >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(response.text.splitlines())
+        return parser, self.ttl
+
+
+class PolitenessPolicy:
+    """按域名的礼貌策略：遵守 robots.txt（含 Crawl-delay）并对每个域名令牌桶限速"""
+
+    def __init__(self, robots: Optional[RobotsCache] = None):
+        self.robots = robots or RobotsCache()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url: str) -> float:
+        """
+        检查 robots.txt 并为该域名预占一次请求
+
+        Returns:
+            float: 发起请求前需要等待的秒数
+
+        Raises:
+            RobotsDisallowed: robots.txt 禁止抓取
+        """
+        rate = settings.scraping.domain_rate
+        burst = settings.scraping.domain_burst
+        if settings.scraping.respect_robots_txt:
+            parser = self.robots.get(url)
+            user_agent = settings.scraping.user_agent
+            if not parser.can_fetch(user_agent, url):
+                raise RobotsDisallowed(url)
+            crawl_delay = parser.crawl_delay(user_agent)
+            if crawl_delay:
+                # Crawl-delay 要求相邻请求间隔，不允许突发
+                rate = min(rate, 1.0 / float(crawl_delay))
+                burst = 1
+
+        return self._bucket(url, rate, burst).reserve()
+
+    def wait(self, url: str):
+        """阻塞等待直到可以请求该地址"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _bucket(self, url: str, rate: float, burst: int) -> TokenBucket:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(rate, burst)
+                self._buckets[host] = bucket
+        if bucket.rate != rate or bucket.burst != burst:
+            bucket.set_limits(rate, burst)
+        return bucket
+
+
+# 全局策略实例（限速状态需在所有抓取器之间共享）
+_politeness_policy = None
+_politeness_lock = threading.Lock()
+
+
+def get_politeness_policy() -> PolitenessPolicy:
+    """获取全局礼貌策略实例"""
+    global _politeness_policy
+    with _politeness_lock:
+        if _politeness_policy is None:
+            _politeness_policy = PolitenessPolicy()
+        return _politeness_policy
@@ -0,0 +1,156 @@
+"""
+抓取容错模块（重试退避与按主机熔断）
+"""
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from src.config import settings
+from src.services.browser_pool import NavigationError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """主机熔断中，跳过本次请求"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    判断错误是否值得重试
+
+    只有主机侧的失败可重试：连接失败、超时、5xx、429 及浏览器导航失败；
+    其他 4xx、非法 URL、wait_selector 等待超时、非法 wait_until 等
+    请求或配置本身的问题重试也不会成功，也不计入熔断。
+    """
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status >= 500 or status == 429
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return isinstance(error, NavigationError)
+
+
+def backoff_delay(attempt: int) -> float:
+    """第 attempt 次重试前的等待秒数（指数退避 + 抖动）"""
+    delay = min(settings.scraping.retry_max_delay, settings.scraping.retry_delay * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+@dataclass
+class HostState:
+    """单个主机的熔断状态"""
+    failures: int = 0
+    opened_until: float = 0.0
+    trial_in_flight: bool = False
+    last_error: Optional[str] = None
+    last_failure_at: Optional[datetime] = None
+
+
+class CircuitBreaker:
+    """
+    按主机熔断器
+
+    连续失败达到 circuit_failure_threshold 次后熔断 circuit_cooldown 秒；
+    冷却结束后放行一次试探请求，成功则恢复，失败则再次熔断；
+    试探请求未得出结果（如被 robots.txt 拦截）时调用方须 release_trial 归还名额。
+    """
+
+    def __init__(self):
+        self._hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def is_open(self, url: str) -> bool:
+        """主机是否处于熔断冷却期或试探中（不占用试探名额）"""
+        with self._lock:
+            state = self._hosts.get(self.host_of(url))
+            return bool(state and (state.opened_until > time.monotonic() or state.trial_in_flight))
+
+    def check(self, url: str) -> bool:
+        """
+        请求前检查
+
+        Returns:
+            bool: 是否占用了试探名额（为 True 时调用方须在请求结束后 release_trial）
+
+        Raises:
+            CircuitOpenError: 主机熔断中
+        """
+        host = self.host_of(url)
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.failures < settings.scraping.circuit_failure_threshold:
+                return False
+            if state.opened_until > time.monotonic() or state.trial_in_flight:
+                raise CircuitOpenError(host)
+            # 冷却结束，放行一次试探请求
+            state.trial_in_flight = True
+            return True
+
+    def release_trial(self, url: str):
+        """归还试探名额（已记录成功或失败时无影响）"""
+        with self._lock:
+            state = self._hosts.get(self.host_of(url))
+            if state is not None:
+                state.trial_in_flight = False
+
+    def record_success(self, url: str):
+        with self._lock:
+            self._hosts.pop(self.host_of(url), None)
+
+    def record_failure(self, url: str, error: Exception):
+        host = self.host_of(url)
+        with self._lock:
+            state = self._hosts.setdefault(host, HostState())
+            state.failures += 1
+            state.trial_in_flight = False
+            state.last_error = str(error)[:500]
+            state.last_failure_at = datetime.utcnow()
+            if state.failures >= settings.scraping.circuit_failure_threshold:
+                state.opened_until = time.monotonic() + settings.scraping.circuit_cooldown
+                logger.warning(
+                    f"Circuit opened for {host} after {state.failures} failures, "
+                    f"cooling down {settings.scraping.circuit_cooldown}s"
+                )
+
+    def status(self) -> List[dict]:
+        """各主机的失败状态"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "host": host,
+                    "failures": state.failures,
+                    "is_open": state.opened_until > now or state.trial_in_flight,
+                    "retry_in": max(0, round(state.opened_until - now)),
+                    "last_error": state.last_error,
+                    "last_failure_at": state.last_failure_at
+                }
+                for host, state in sorted(self._hosts.items())
+            ]
+
+
+# 全局熔断器实例
+_circuit_breaker = None
+_circuit_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """获取全局熔断器实例"""
+    global _circuit_breaker
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker()
+        return _circuit_breaker
@@ -0,0 +1,102 @@
+"""
+快照保留模块（删除快照并释放其 HTML blob 引用）
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.models.database import ChangeEvent, Snapshot
+from src.services.text_store import get_text_store
+from src.utils.blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+
+def delete_snapshots(db: Session, snapshots: List[Snapshot]) -> int:
+    """
+    删除快照（由调用方提交事务）
+
+    - 以被删快照为增量基准的保留快照先还原为关键帧
+    - 引用被删快照的变更事件保留，快照关联置空
+    - 释放 HTML blob 引用，文件由 BlobStore.collect_garbage 回收
+
+    Returns:
+        int: 删除的快照数量
+    """
+    if not snapshots:
+        return 0
+
+    ids = [snapshot.id for snapshot in snapshots]
+    id_set = set(ids)
+    text_store = get_text_store()
+    for dependent in db.query(Snapshot).filter(Snapshot.delta_base_id.in_(ids)).all():
+        if dependent.id in id_set:
+            continue
+        dependent.text_content = text_store.load_text(db, dependent)
+        dependent.text_delta = None
+        dependent.delta_base_id = None
+        dependent.delta_depth = 0
+
+    db.query(ChangeEvent).filter(ChangeEvent.from_snapshot_id.in_(ids))\
+        .update({ChangeEvent.from_snapshot_id: None}, synchronize_session=False)
+    db.query(ChangeEvent).filter(ChangeEvent.to_snapshot_id.in_(ids))\
+        .update({ChangeEvent.to_snapshot_id: None}, synchronize_session=False)
+
+    # 被删快照之间也可能互为增量基准，先解除关联再删除
+    for snapshot in snapshots:
+        snapshot.delta_base_id = None
+    db.flush()
+
+    blob_store = get_blob_store()
+    for snapshot in snapshots:
+        if snapshot.html_path:
+            blob_store.release(db, snapshot.html_path)
+        db.delete(snapshot)
+
+    return len(snapshots)
+
+
+def prune_snapshots(db: Session, retention_days: Optional[int] = None) -> int:
+    """
+    删除超过保留期的快照（每个源的最新快照始终保留）
+
+    Returns:
+        int: 删除的快照数量
+    """
+    days = settings.storage.snapshot_retention_days if retention_days is None else retention_days
+    if days <= 0:
+        return 0
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    count = 0
+    for (source_id,) in db.query(Snapshot.source_id).distinct().all():
+        latest = db.query(Snapshot.id)\
+            .filter(Snapshot.source_id == source_id)\
+            .order_by(Snapshot.fetched_at.desc())\
+            .first()
+        if latest is None:
+            continue
+
+        expired = db.query(Snapshot)\
+            .filter(Snapshot.source_id == source_id)\
+            .filter(Snapshot.fetched_at < cutoff)\
+            .filter(Snapshot.id != latest[0])\
+            .all()
+        if expired:
+            count += delete_snapshots(db, expired)
+            db.commit()
+
+    if count:
+        logger.info(f"Pruned {count} snapshots older than {days} days")
+    return count
+
+
+def run_maintenance(db: Session) -> dict:
+    """清理过期快照并回收无引用的 blob 文件"""
+    pruned = prune_snapshots(db)
+    removed = get_blob_store().collect_garbage(db)
+    return {"pruned_snapshots": pruned, "removed_blobs": removed}
@@ -2,28 +2,53 @@
 调度服务模块
 """
 
+import hashlib
 import logging
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Set
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy.orm import Session
 
 from src.models.database import Source, Snapshot
-from src.services.fetcher import Fetcher
-from src.services.diff_engine import DiffEngine
+from src.services.fetcher import (
+    Fetcher, ContentNotModified, source_validators, source_target, apply_validators
+)
+from src.services.browser_pool import close_browser_pool
+from src.config import settings
+from src.services.block_diff import split_blocks
+from src.services.diff_cache import get_diff_cache
+from src.services.diff_engine import DiffEngine, StructuralDiffEngine
+from src.services.extractor import close_extraction_pool
+from src.services.fingerprint import is_near_duplicate
 from src.services.llm_analyzer import analyze_change_event
+from src.services.noise_filter import get_noise_filter
+from src.services.resilience import get_circuit_breaker
+from src.services.retention import run_maintenance
+from src.services.text_store import load_snapshot_text
+from src.services.volatile_mask import get_volatile_masker
+from src.utils.blob_store import get_blob_store
 
 logger = logging.getLogger(__name__)
 
 
 class MonitorScheduler:
-    """监控调度器"""
+    """
+    监控调度器
+    
+    cron 表达式相同的源合并为一个批量任务，同一时刻触发的源并发抓取，
+    共享连接池与按主机的并发限制。
+    """
     
     def __init__(self):
         self.scheduler = BackgroundScheduler()
+        # cron 表达式 -> 源 ID 集合
+        self._groups: Dict[str, Set[str]] = {}
+        self._groups_lock = threading.Lock()
         self.fetcher = Fetcher()
         self.diff_engine = DiffEngine()
+        self.structural_engine = StructuralDiffEngine()
     
     def start(self):
         """启动调度器"""
@@ -36,6 +61,8 @@ class MonitorScheduler:
         if self.scheduler.running:
             self.scheduler.shutdown()
             logger.info("Scheduler stopped")
+        close_browser_pool()
+        close_extraction_pool()
     
     def add_source(self, db: Session, source_id: str):
         """添加监控源"""
@@ -46,28 +73,106 @@ class MonitorScheduler:
         
         # 解析 cron 表达式
         try:
-            trigger = CronTrigger.from_crontab(source.schedule)
-            
-            self.scheduler.add_job(
-                func=self._run_fetch,
-                trigger=trigger,
-                args=[source_id],
-                id=f"fetch_{source_id}",
-                replace_existing=True,
-                name=f"Fetch {source.url}"
-            )
-            
-            logger.info(f"Added scheduled task for source {source_id}")
+            CronTrigger.from_crontab(source.schedule)
         except Exception as e:
             logger.error(f"Failed to parse cron expression: {source.schedule}: {e}")
+            return
+        
+        source_id = str(source_id)
+        with self._groups_lock:
+            # 源的 cron 表达式可能已修改，先从原分组移除
+            for schedule in self._unschedule(source_id):
+                self._schedule_group(schedule)
+            self._groups.setdefault(source.schedule, set()).add(source_id)
+            self._schedule_group(source.schedule)
+        
+        logger.info(f"Added scheduled task for source {source_id}")
     
     def remove_source(self, source_id: str):
         """移除监控源"""
-        self.scheduler.remove_job(f"fetch_{source_id}")
+        with self._groups_lock:
+            for schedule in self._unschedule(str(source_id)):
+                self._schedule_group(schedule)
         logger.info(f"Removed scheduled task for source {source_id}")
     
+    def _unschedule(self, source_id: str) -> List[str]:
+        """从所在分组中移除源，返回受影响的 cron 表达式"""
+        affected = []
+        for schedule, source_ids in self._groups.items():
+            if source_id in source_ids:
+                source_ids.discard(source_id)
+                affected.append(schedule)
+        return affected
+    
+    def _schedule_group(self, schedule: str):
+        """按分组当前的源更新批量任务（分组为空时删除任务）"""
+        job_id = "fetch_group_" + hashlib.blake2b(schedule.encode("utf-8"), digest_size=8).hexdigest()
+        source_ids = sorted(self._groups.get(schedule, ()))
+        if not source_ids:
+            self._groups.pop(schedule, None)
+            if self.scheduler.get_job(job_id):
+                self.scheduler.remove_job(job_id)
+            return
+        
+        name = f"Fetch {len(source_ids)} sources ({schedule})"
+        # 调度器启动前添加的任务处于待定状态，replace_existing 不生效，已有任务只更新参数
+        if self.scheduler.get_job(job_id):
+            self.scheduler.modify_job(job_id, args=[source_ids], name=name)
+            return
+        self.scheduler.add_job(
+            func=self._run_fetch_batch,
+            trigger=CronTrigger.from_crontab(schedule),
+            args=[source_ids],
+            id=job_id,
+            name=name
+        )
+    
     def _run_fetch(self, source_id: str):
         """执行抓取任务（内部调用）"""
+        db = self._create_session()
+        try:
+            self.process_source(db, source_id)
+        finally:
+            db.close()
+    
+    def _run_fetch_batch(self, source_ids: List[str]):
+        """执行批量抓取任务（内部调用）"""
+        db = self._create_session()
+        try:
+            self.process_sources(db, source_ids)
+        finally:
+            db.close()
+    
+    def add_maintenance_job(self):
+        """添加过期快照清理与 blob 回收任务"""
+        try:
+            trigger = CronTrigger.from_crontab(settings.storage.maintenance_schedule)
+        except Exception as e:
+            logger.error(f"Failed to parse cron expression: {settings.storage.maintenance_schedule}: {e}")
+            return
+        
+        self.scheduler.add_job(
+            func=self._run_maintenance,
+            trigger=trigger,
+            id="storage_maintenance",
+            replace_existing=True,
+            name="Storage maintenance"
+        )
+    
+    def _run_maintenance(self):
+        """执行存储维护任务（内部调用）"""
+        db = self._create_session()
+        try:
+            result = run_maintenance(db)
+            logger.info(f"Storage maintenance finished: {result}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Storage maintenance failed: {e}")
+        finally:
+            db.close()
+    
+    def _create_session(self) -> Session:
+        """创建新的数据库会话"""
         # 这里需要创建一个新的数据库会话
         from sqlalchemy.orm import sessionmaker
         from ..config import settings
@@ -75,12 +180,7 @@ class MonitorScheduler:
         
         engine = create_engine(settings.database.url)
         SessionLocal = sessionmaker(bind=engine)
-        db = SessionLocal()
-        
-        try:
-            self.process_source(db, source_id)
-        finally:
-            db.close()
+        return SessionLocal()
     
     def process_source(self, db: Session, source_id: str):
         """处理单个源的抓取和变更检测"""
@@ -88,24 +188,71 @@ class MonitorScheduler:
         if not source or not source.is_active:
             return
         
+        # 主机熔断中，不占用工作线程
+        if get_circuit_breaker().is_open(source.url):
+            logger.info(f"Skipping source {source_id}: circuit open for {source.url}")
+            return
+        
         logger.info(f"Processing source: {source.url}")
         
         # 抓取新快照
+        validators = source_validators(source)
         try:
-            snapshot = self.fetcher.fetch(source.url, source.fetch_mode == "headless")
-            if snapshot:
-                new_snapshot = self.fetcher.save_snapshot(
-                    db,
-                    source_id,
-                    snapshot["html"],
-                    snapshot["text"]
-                )
-                
-                # 检测变更
-                self._detect_changes(db, source, new_snapshot)
+            html, text_content = self.fetcher.fetch(*source_target(source, validators))
+            apply_validators(source, validators)
+            self._handle_fetched(db, source, html, text_content)
+        except ContentNotModified:
+            apply_validators(source, validators)
+            self._handle_not_modified(db, source)
         except Exception as e:
             logger.error(f"Failed to fetch source {source_id}: {e}")
     
+    def process_sources(self, db: Session, source_ids: List[str]):
+        """批量并发抓取多个源，每个源抓取完成即保存快照并检测变更"""
+        sources = db.query(Source)\
+            .filter(Source.id.in_(source_ids))\
+            .filter(Source.is_active == True)\
+            .all()
+        
+        # 跳过熔断中的主机
+        breaker = get_circuit_breaker()
+        sources = [source for source in sources if not breaker.is_open(source.url)]
+        if not sources:
+            return
+        
+        logger.info(f"Processing {len(sources)} sources in batch")
+        
+        for source, result in self.fetcher.fetch_sources_batch(sources):
+            if isinstance(result, ContentNotModified):
+                self._handle_not_modified(db, source)
+                continue
+            if isinstance(result, Exception):
+                logger.error(f"Failed to fetch source {source.id}: {result}")
+                continue
+            
+            try:
+                html, text_content = result
+                self._handle_fetched(db, source, html, text_content)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to process source {source.id}: {e}")
+    
+    def _handle_fetched(self, db: Session, source: Source, html: str, text_content: str):
+        """保存快照并检测变更"""
+        new_snapshot = self.fetcher.save_if_changed(db, source, html, text_content)
+        if new_snapshot is None:
+            # 内容哈希与上一快照一致，无需写快照与 diff
+            return
+        
+        # 检测变更
+        self._detect_changes(db, source, new_snapshot)
+    
+    def _handle_not_modified(self, db: Session, source: Source):
+        """页面未变化（304 或响应体哈希一致）：跳过提取、快照与 diff"""
+        logger.info(f"Source {source.id} not modified, skipping")
+        get_volatile_masker().record_unchanged(source)
+        self.fetcher.record_heartbeat(db, source)
+    
     def _detect_changes(
         self,
         db: Session,
@@ -125,16 +272,31 @@ class MonitorScheduler:
             return
         
         # 计算差异
-        event = self.diff_engine.compute_diff(
-            old_snapshot.text_content,
-            new_snapshot.text_content,
-            sensitivity=source.sensitivity
-        )
+        event = self._compute_diff(db, source, old_snapshot, new_snapshot)
         
         if not event:
             logger.info(f"No significant changes detected for source {source.id}")
             return
         
+        # 结构化字段变化：比较两个快照保存时已提取的字段
+        if old_snapshot.structured_fields is not None and new_snapshot.structured_fields is not None:
+            event.structural_changes = self.structural_engine.compare_fields(
+                old_snapshot.structured_fields, new_snapshot.structured_fields
+            )
+        
+        # simhash 近似重复的快照对产生的事件为低优先级
+        near_duplicate = is_near_duplicate(old_snapshot, new_snapshot, settings.diff.simhash_threshold)
+        
+        # 按反馈训练的模型给出噪声概率（疑似噪声的事件照常保存，但不分析、不通知）
+        noise_features = get_noise_filter().score(source, event)
+        
+        # block 模式的偏移基于当前的易变路径与排除选择器，随差异块记录其摘要
+        chunks = self.diff_engine.to_json(event)["chunks"]
+        mask_fingerprint = get_volatile_masker().fingerprint(source)
+        for chunk in chunks:
+            if chunk.get("css_path") is not None:
+                chunk["mask_fingerprint"] = mask_fingerprint
+        
         # 保存变更事件
         from src.models.database import ChangeEvent
         
@@ -143,26 +305,83 @@ class MonitorScheduler:
             from_snapshot_id=old_snapshot.id,
             to_snapshot_id=new_snapshot.id,
             diff_summary=event.summary,
-            diff_chunks=self.diff_engine.to_json(event)["chunks"],
+            diff_chunks=chunks,
+            structural_changes=event.structural_changes,
+            noise_features=noise_features,
+            noise_score=event.noise_score,
+            is_suppressed=event.is_suppressed,
+            priority="low" if near_duplicate else "normal",
             created_at=datetime.utcnow()
         )
         
         db.add(change_event)
         db.commit()
         
+        if event.is_suppressed:
+            logger.info(f"Change event suppressed as noise ({event.noise_score:.2f}): {event.summary}")
+            return
+        
         logger.info(f"Change event created: {event.summary}")
         
         # 可选：触发 AI 分析
         # self._trigger_analysis(db, change_event, source)
     
+    def _compute_diff(
+        self,
+        db: Session,
+        source: Source,
+        old_snapshot: Snapshot,
+        new_snapshot: Snapshot
+    ):
+        """
+        按源的 diff 模式计算差异：block 模式比较 DOM 区块，缺少 HTML 时退回正文 diff
+        
+        结果按新旧内容哈希与敏感度缓存（block 模式以内容寻址的 HTML 路径为哈希）。
+        正文在保存时已屏蔽易变区域；block 模式在此移除易变路径的区块。
+        """
+        sensitivity = source.sensitivity or "medium"
+        cache = get_diff_cache()
+        
+        if (source.diff_mode or settings.diff.mode) == "block" \
+                and old_snapshot.html_path and new_snapshot.html_path:
+            masker = get_volatile_masker()
+            key = (
+                old_snapshot.html_path, new_snapshot.html_path, sensitivity,
+                "block:" + masker.fingerprint(source)
+            )
+            store = get_blob_store()
+            
+            def blocks(snapshot):
+                return masker.filter_blocks(
+                    split_blocks(store.read_text(snapshot.html_path), source.exclude_selectors),
+                    source.volatile_masks
+                )
+            
+            try:
+                return cache.get_or_compute(db, key, lambda: self.diff_engine.compute_block_diff(
+                    blocks(old_snapshot), blocks(new_snapshot), sensitivity=sensitivity
+                ))
+            except OSError as e:
+                logger.warning(f"Block diff unavailable for source {source.id}, falling back to text: {e}")
+        
+        key = (
+            old_snapshot.content_hash or str(old_snapshot.id),
+            new_snapshot.content_hash or str(new_snapshot.id),
+            sensitivity, "text"
+        )
+        return cache.get_or_compute(db, key, lambda: self.diff_engine.compute_diff(
+            load_snapshot_text(db, old_snapshot),
+            load_snapshot_text(db, new_snapshot),
+            sensitivity=sensitivity
+        ))
+    
     def _trigger_analysis(self, db: Session, change_event, source: Source):
         """触发 AI 分析"""
         try:
             result = analyze_change_event(
                 change_event={"text_diff": self.diff_engine.to_json(
-                    self.diff_engine.compute_diff(
-                        change_event.from_snapshot.text_content,
-                        change_event.to_snapshot.text_content
+                    self._compute_diff(
+                        db, source, change_event.from_snapshot, change_event.to_snapshot
                     )
                 )},
                 source_url=source.url,
@@ -196,6 +415,14 @@ class MonitorScheduler:
             id=f"immediate_{source_id}",
             name=f"Immediate fetch {source_id}"
         )
+    
+    def run_batch_now(self, source_ids: List[str]):
+        """立即并发抓取多个源（手动触发）"""
+        self.scheduler.add_job(
+            func=self._run_fetch_batch,
+            args=[list(source_ids)],
+            name=f"Immediate batch fetch ({len(source_ids)} sources)"
+        )
 
 
 # 全局调度器实例
@@ -217,5 +444,6 @@ def init_scheduler(db: Session):
     sources = db.query(Source).filter(Source.is_active == True).all()
     for source in sources:
         scheduler.add_source(db, source.id)
+    scheduler.add_maintenance_job()
     
     scheduler.start()
@@ -0,0 +1,154 @@
+"""
+快照正文存储模块（关键帧 + 增量）
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.models.database import Snapshot
+
+logger = logging.getLogger(__name__)
+
+# 增量格式：[start, end] 表示复制基准文本的第 start~end 行，字符串表示新增行
+Delta = List[Union[List[int], str]]
+
+
+def encode_delta(base: str, target: str) -> Delta:
+    """计算从 base 到 target 的行级增量"""
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+
+    delta: Delta = []
+    for opcode, a0, a1, b0, b1 in matcher.get_opcodes():
+        if opcode == "equal":
+            delta.append([a0, a1])
+        elif opcode in ("insert", "replace"):
+            delta.extend(target_lines[b0:b1])
+    return delta
+
+
+def apply_delta(base: str, delta: Delta) -> str:
+    """在 base 上应用增量还原文本"""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in delta:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return "".join(parts)
+
+
+class SnapshotTextStore:
+    """
+    快照正文读写
+
+    每 text_keyframe_interval 个版本存一次完整正文（关键帧），
+    其余版本只存相对上一版本的增量；读取时从最近的关键帧向后还原。
+    """
+
+    def __init__(self, cache_size: int = 128):
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build_fields(self, db: Session, source_id: str, text_content: str) -> dict:
+        """
+        生成新快照的正文字段
+
+        Returns:
+            dict: Snapshot 的 text_content / text_delta / delta_base_id / delta_depth
+        """
+        keyframe = {"text_content": text_content, "delta_depth": 0}
+        if settings.storage.text_storage != "delta":
+            return keyframe
+
+        base = db.query(Snapshot)\
+            .filter(Snapshot.source_id == source_id)\
+            .order_by(Snapshot.fetched_at.desc())\
+            .first()
+        if base is None:
+            return keyframe
+
+        depth = (base.delta_depth or 0) + 1
+        if depth >= settings.storage.text_keyframe_interval:
+            return keyframe
+
+        delta = encode_delta(self.load_text(db, base), text_content)
+        # 增量不比全文小时（如整页改版）直接存关键帧
+        if len(json.dumps(delta, ensure_ascii=False)) >= len(text_content):
+            return keyframe
+
+        return {
+            "text_content": None,
+            "text_delta": delta,
+            "delta_base_id": base.id,
+            "delta_depth": depth
+        }
+
+    def load_text(self, db: Session, snapshot: Snapshot) -> str:
+        """读取快照正文（增量快照自动还原）"""
+        if snapshot.text_content is not None:
+            return snapshot.text_content
+
+        cached = self._get_cached(snapshot.id)
+        if cached is not None:
+            return cached
+
+        # 沿增量链回溯到关键帧或已缓存的版本
+        chain = [snapshot]
+        current = snapshot
+        while True:
+            base = db.query(Snapshot).filter(Snapshot.id == current.delta_base_id).first()
+            if base is None:
+                raise ValueError(f"Broken delta chain at snapshot {current.id}")
+            text = base.text_content if base.text_content is not None else self._get_cached(base.id)
+            if text is not None:
+                break
+            chain.append(base)
+            current = base
+
+        for item in reversed(chain):
+            text = apply_delta(text, item.text_delta)
+            self._put_cached(item.id, text)
+
+        return text
+
+    def _get_cached(self, snapshot_id) -> Optional[str]:
+        with self._lock:
+            text = self._cache.get(snapshot_id)
+            if text is not None:
+                self._cache.move_to_end(snapshot_id)
+            return text
+
+    def _put_cached(self, snapshot_id, text: str):
+        with self._lock:
+            self._cache[snapshot_id] = text
+            self._cache.move_to_end(snapshot_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+# 全局实例
+_text_store = None
+
+
+def get_text_store() -> SnapshotTextStore:
+    """获取全局正文存储实例"""
+    global _text_store
+    if _text_store is None:
+        _text_store = SnapshotTextStore()
+    return _text_store
+
+
+def load_snapshot_text(db: Session, snapshot: Snapshot) -> str:
+    """便捷函数：读取快照正文"""
+    return get_text_store().load_text(db, snapshot)
@@ -0,0 +1,189 @@
+"""
+易变区域屏蔽模块
+
+每次抓取都会变化的内容（CSRF token、"3 分钟前"、轮播评价、带哈希的资源名等）
+在计算内容哈希与 diff 前屏蔽，避免产生无意义的变更事件。
+"""
+
+import hashlib
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.config import settings
+from src.models.database import Source
+from src.services.block_diff import Block, remove_blocks, split_blocks
+from src.services.diff_engine import line_hash
+from src.services.extractor import ExtractOptions, extract_text
+
+logger = logging.getLogger(__name__)
+
+MASK = "[masked]"
+
+# 按模式屏蔽的易变 token
+VOLATILE_PATTERNS = [
+    # 相对时间
+    re.compile(
+        r'\b(?:\d+|an?|a few)\s+(?:seconds?|secs?|minutes?|mins?|hours?|hrs?|days?|weeks?)\s+ago\b'
+        r'|\bjust now\b',
+        re.IGNORECASE
+    ),
+    re.compile(r'\d+\s*(?:秒|分钟|小时|天|周)前|刚刚'),
+    # 哈希 / 缓存版本号（16 位以上十六进制）
+    re.compile(r'\b[0-9a-fA-F]{16,}\b'),
+    # nonce / CSRF 等长随机 token（同时含字母与数字）
+    re.compile(r'\b(?=[A-Za-z0-9_-]*\d)(?=[A-Za-z0-9_-]*[A-Za-z])[A-Za-z0-9_-]{32,}\b'),
+]
+
+
+def mask_patterns(text: str) -> Tuple[str, int]:
+    """
+    按模式屏蔽易变 token
+
+    Returns:
+        (屏蔽后的文本, 命中次数)
+    """
+    hits = 0
+    for pattern in VOLATILE_PATTERNS:
+        text, count = pattern.subn(MASK, text)
+        hits += count
+    return text, hits
+
+
+class VolatileMasker:
+    """
+    易变区域学习与屏蔽
+
+    每个源在 Source.volatile_masks 中记录各 DOM 路径（见 block_diff.split_blocks）
+    最近一次的区块哈希、变化次数和开始跟踪时的检查序号；
+    开始跟踪后至少经过 min_observations 次检查、且变化比例不低于 volatile_ratio 的路径
+    判定为易变，在哈希与 diff 前从 DOM 中移除后重新提取正文
+    （readability 的输出为单行 HTML，无法按行匹配区块文本）。
+    """
+
+    def apply(self, source: Source, html: str, text_content: str) -> str:
+        """
+        记录一次检查并屏蔽正文中的易变区域（调用方负责提交事务）
+
+        Returns:
+            str: 屏蔽后的正文
+        """
+        if not settings.masking.enabled:
+            return text_content
+
+        state = dict(source.volatile_masks or {})
+        current: Dict[str, List[str]] = {}
+        for block in split_blocks(html, source.exclude_selectors):
+            current.setdefault(block.css_path, []).append(block.text)
+
+        self._observe(state, {
+            path: line_hash(mask_patterns("\n".join(texts))[0]) for path, texts in current.items()
+        })
+        volatile = self._volatile_paths(state) & current.keys()
+        masked_blocks = 0
+        if volatile:
+            text_content = extract_text(
+                remove_blocks(html, volatile, source.exclude_selectors),
+                ExtractOptions.from_source(source)
+            )
+            masked_blocks = sum(len(current[path]) for path in volatile)
+
+        lines = []
+        pattern_hits = 0
+        for line in text_content.split("\n"):
+            line, hits = mask_patterns(line)
+            pattern_hits += hits
+            lines.append(line)
+
+        if masked_blocks or pattern_hits:
+            state["masked_fetches"] = state.get("masked_fetches", 0) + 1
+            state["masked_blocks"] = state.get("masked_blocks", 0) + masked_blocks
+            state["pattern_hits"] = state.get("pattern_hits", 0) + pattern_hits
+        source.volatile_masks = state
+        return "\n".join(lines)
+
+    def record_unchanged(self, source: Source):
+        """页面未变化（304 或响应体一致）也计为一次检查，各区块均未变化"""
+        if not settings.masking.enabled or not source.volatile_masks:
+            return
+        state = dict(source.volatile_masks)
+        state["checks"] = state.get("checks", 0) + 1
+        source.volatile_masks = state
+
+    def filter_blocks(self, blocks: Iterable[Block], volatile_masks: Optional[dict]) -> List[Block]:
+        """
+        区块 diff 前移除易变路径的区块，并按模式屏蔽其余区块的文本
+
+        Args:
+            volatile_masks: 源的 Source.volatile_masks
+        """
+        if not settings.masking.enabled:
+            return list(blocks)
+
+        volatile = self._volatile_paths(volatile_masks or {})
+        result = []
+        for block in blocks:
+            if block.css_path in volatile:
+                continue
+            text = mask_patterns(block.text)[0]
+            result.append(block if text == block.text else Block(block.css_path, block.section, text, line_hash(text)))
+        return result
+
+    def fingerprint(self, source: Source) -> str:
+        """
+        区块 diff 输入的摘要：当前易变路径集合与排除选择器
+
+        用于缓存键，并随 block 模式的差异块保存，二者任一变化后旧偏移不再适用。
+        """
+        volatile = sorted(self._volatile_paths(source.volatile_masks or {}))
+        key = "\n".join(volatile) + "\0" + "\n".join(source.exclude_selectors or ())
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+    def stats(self, source: Source) -> dict:
+        """屏蔽统计"""
+        state = source.volatile_masks or {}
+        return {
+            "enabled": settings.masking.enabled,
+            "checks": state.get("checks", 0),
+            "tracked_paths": len(state.get("paths", {})),
+            "volatile_paths": sorted(self._volatile_paths(state)),
+            "masked_fetches": state.get("masked_fetches", 0),
+            "masked_blocks": state.get("masked_blocks", 0),
+            "pattern_hits": state.get("pattern_hits", 0)
+        }
+
+    def _observe(self, state: dict, current: Dict[str, str]):
+        """记录一次检查：路径 -> [最近哈希, 变化次数, 开始跟踪时的检查序号]"""
+        checks = state.get("checks", 0) + 1
+        paths = dict(state.get("paths", {}))
+        for path, digest in current.items():
+            entry = paths.get(path)
+            if entry is None:
+                if len(paths) < settings.masking.max_paths:
+                    paths[path] = [digest, 0, checks]
+            elif entry[0] != digest:
+                paths[path] = [digest, entry[1] + 1, entry[2]]
+        state["checks"] = checks
+        state["paths"] = paths
+
+    def _volatile_paths(self, state: dict) -> Set[str]:
+        checks = state.get("checks", 0)
+        volatile = set()
+        for path, (_, changes, since) in state.get("paths", {}).items():
+            observations = checks - since
+            if observations >= settings.masking.min_observations \
+                    and changes >= settings.masking.volatile_ratio * observations:
+                volatile.add(path)
+        return volatile
+
+
+# 全局实例
+_volatile_masker = None
+
+
+def get_volatile_masker() -> VolatileMasker:
+    """获取全局易变区域屏蔽实例"""
+    global _volatile_masker
+    if _volatile_masker is None:
+        _volatile_masker = VolatileMasker()
+    return _volatile_masker
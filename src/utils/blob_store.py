@@ -0,0 +1,196 @@
+"""
+内容寻址快照存储模块
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.models.database import Blob
+from src.utils.storage import ensure_dir
+
+logger = logging.getLogger(__name__)
+
+# zstd 为可选依赖，未安装时回退到 gzip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class BlobStore:
+    """
+    内容寻址、压缩存储
+
+    文件以原始字节的 SHA-256 命名，按前两级哈希前缀分目录存放，
+    相同内容只存一份，由 blobs 表记录引用计数。
+    """
+
+    def __init__(self, root: Optional[Path] = None, compression: Optional[str] = None):
+        self.root = Path(root or settings.storage.blobs_path)
+        compression = compression or settings.storage.blob_compression
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard not installed, falling back to gzip")
+            compression = "gzip"
+        self.compression = compression
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        """计算内容哈希"""
+        return hashlib.sha256(data).hexdigest()
+
+    def path_for(self, digest: str) -> Path:
+        """内容哈希对应的分片路径"""
+        suffix = ".zst" if self.compression == "zstd" else ".gz"
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{suffix}"
+
+    def write_blob(self, data: bytes) -> Tuple[str, Path]:
+        """
+        写入文件（已存在则跳过）
+
+        Returns:
+            Tuple[digest, path]
+        """
+        digest = self.digest(data)
+        path = self.path_for(digest)
+        if path.exists():
+            return digest, path
+
+        ensure_dir(path.parent)
+        if self.compression == "zstd":
+            payload = zstandard.ZstdCompressor().compress(data)
+        else:
+            payload = gzip.compress(data, mtime=0)
+
+        # 先写临时文件再原子替换，避免并发写入产生半截文件
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return digest, path
+
+    def put(self, db: Session, data: bytes) -> str:
+        """
+        存入内容并增加引用计数（由调用方提交事务）
+
+        Returns:
+            str: 存储路径
+        """
+        digest, path = self.write_blob(data)
+
+        blob = db.query(Blob).filter(Blob.digest == digest).with_for_update().first()
+        if blob:
+            blob.ref_count += 1
+            return blob.path
+
+        try:
+            with db.begin_nested():
+                db.add(Blob(
+                    digest=digest,
+                    path=str(path),
+                    size=len(data),
+                    stored_size=path.stat().st_size,
+                    ref_count=1
+                ))
+        except IntegrityError:
+            # 并发写入了同一内容
+            blob = db.query(Blob).filter(Blob.digest == digest).with_for_update().one()
+            blob.ref_count += 1
+
+        return str(path)
+
+    def read(self, path: str) -> bytes:
+        """读取内容（兼容旧版未压缩的 .html 文件）"""
+        path = Path(path)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if path.suffix == ".gz":
+            return gzip.decompress(data)
+        if path.suffix == ".zst":
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read .zst blobs")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def read_text(self, path: str) -> str:
+        """读取 HTML 文本"""
+        return self.read(path).decode("utf-8", errors="replace")
+
+    def release(self, db: Session, path: str):
+        """减少引用计数（快照删除时调用，由调用方提交事务）"""
+        blob = db.query(Blob).filter(Blob.path == path).with_for_update().first()
+        if blob and blob.ref_count > 0:
+            blob.ref_count -= 1
+
+    def collect_garbage(self, db: Session, min_age: int = 3600) -> int:
+        """
+        删除无引用的文件
+
+        引用计数归零的 blob 连同记录一起删除；存储目录中没有 blob 记录的文件
+        （如写入后事务回滚）在超过 min_age 秒后删除，避免误删尚未提交的新文件。
+
+        Returns:
+            int: 删除的文件数量
+        """
+        count = 0
+        for blob in db.query(Blob).filter(Blob.ref_count <= 0).all():
+            try:
+                Path(blob.path).unlink()
+            except FileNotFoundError:
+                pass
+            db.delete(blob)
+            count += 1
+
+        db.commit()
+        return count + self._remove_orphans(db, min_age)
+
+    def _remove_orphans(self, db: Session, min_age: int) -> int:
+        """删除存储目录中没有 blob 记录的文件（含写入中断残留的临时文件）"""
+        if not self.root.exists():
+            return 0
+
+        known = {Path(path).resolve() for (path,) in db.query(Blob.path)}
+        cutoff = time.time() - min_age
+        count = 0
+        for path in self.root.glob("*/*/*"):
+            if not path.is_file() or path.resolve() in known:
+                continue
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            count += 1
+
+        if count:
+            logger.info(f"Removed {count} orphaned blob files")
+        return count
+
+
+# 全局存储实例
+_blob_store = None
+
+
+def get_blob_store() -> BlobStore:
+    """获取全局存储实例"""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore()
+    return _blob_store
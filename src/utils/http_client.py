@@ -0,0 +1,240 @@
+"""
+共享 HTTP 客户端模块
+"""
+
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DNSCache:
+    """
+    DNS 解析缓存（仅供共享会话的连接层使用）
+
+    getaddrinfo 不返回记录 TTL，这里统一按 ttl 秒过期，应配置为不大于
+    目标站点记录 TTL 的值；连接某主机的全部地址失败时会立即丢弃该条目。
+    条目数超过 max_entries 时按最近最少使用淘汰。
+    """
+
+    def __init__(self, ttl: int, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> List[str]:
+        """解析主机，返回去重后的地址列表（保持系统返回顺序）"""
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (now + self.ttl, addresses)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return addresses
+
+    def invalidate(self, host: str, port: int):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+class _CachedDNSMixin:
+    """建立连接时通过 DNSCache 解析主机，依次尝试各地址"""
+
+    def _new_conn(self):
+        cache = _dns_cache
+        host = self._dns_host
+        if cache is None or _is_ip(host):
+            return super()._new_conn()
+
+        try:
+            addresses = cache.resolve(host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+
+        last_error = None
+        for address in addresses:
+            # 仅在建立 TCP 连接期间替换，TLS 的 SNI 与证书校验仍使用原主机名
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except NewConnectionError as e:
+                last_error = e
+            finally:
+                self._dns_host = host
+
+        # 缓存的地址全部不可用，可能记录已变更，下次重新解析
+        cache.invalidate(host, self.port)
+        raise last_error
+
+
+class CachedDNSHTTPConnection(_CachedDNSMixin, HTTPConnection):
+    pass
+
+
+class CachedDNSHTTPSConnection(_CachedDNSMixin, HTTPSConnection):
+    pass
+
+
+class CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CachedDNSHTTPConnection
+
+
+class CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDNSHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """连接池使用带 DNS 缓存的连接类"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CachedDNSHTTPConnectionPool,
+            "https": CachedDNSHTTPSConnectionPool
+        }
+
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_httpx_client = None
+_http2_enabled = False
+_dns_cache: Optional[DNSCache] = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    获取进程共享的 requests 会话
+
+    抓取、robots.txt 与 Webhook 共用同一组连接池，保持长连接，
+    避免重复的 TLS 握手与 DNS 查询。
+    """
+    global _session, _dns_cache
+    with _lock:
+        if _session is None:
+            if settings.http.dns_cache_ttl > 0:
+                _dns_cache = DNSCache(settings.http.dns_cache_ttl, settings.http.dns_cache_size)
+            session = requests.Session()
+            session.headers.update({
+                "User-Agent": settings.scraping.user_agent
+            })
+            adapter = PooledHTTPAdapter(
+                pool_connections=settings.http.pool_connections,
+                pool_maxsize=settings.http.pool_maxsize
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def get_httpx_client():
+    """
+    获取进程共享的 httpx 客户端（供 OpenAI SDK 使用）
+
+    http.http2 开启且安装了 h2 时使用 HTTP/2；未安装 httpx 时返回 None，
+    调用方使用 SDK 默认客户端。
+    """
+    global _httpx_client, _http2_enabled
+    with _lock:
+        if _httpx_client is None:
+            try:
+                import httpx
+            except ImportError:
+                return None
+
+            http2 = settings.http.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("h2 not installed, falling back to HTTP/1.1")
+                    http2 = False
+
+            _httpx_client = httpx.Client(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.http.pool_maxsize,
+                    max_keepalive_connections=settings.http.pool_maxsize,
+                    keepalive_expiry=settings.http.keepalive_expiry
+                ),
+                timeout=settings.scraping.timeout
+            )
+            _http2_enabled = http2
+        return _httpx_client
+
+
+def connection_stats() -> dict:
+    """
+    连接复用统计
+
+    requests 部分统计当前仍在池中的各主机连接池（被淘汰的主机池不计入）。
+    """
+    hosts = []
+    if _session is not None:
+        # http/https 挂载的是同一个适配器，按对象去重
+        adapters = {id(a): a for a in _session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                try:
+                    pool = pools[key]
+                except KeyError:
+                    continue
+                hosts.append({
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    "connections": pool.num_connections,
+                    "requests": pool.num_requests
+                })
+
+    connections = sum(h["connections"] for h in hosts)
+    requests_count = sum(h["requests"] for h in hosts)
+    return {
+        "connections": connections,
+        "requests": requests_count,
+        "reuse_ratio": 1 - connections / requests_count if requests_count else 0.0,
+        "hosts": hosts,
+        "dns_cache": {
+            "entries": len(_dns_cache),
+            "hits": _dns_cache.hits,
+            "misses": _dns_cache.misses
+        } if _dns_cache else None,
+        "http2": _http2_enabled
+    }
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+测试共用的替身对象与 fixture
+"""
+
+import pytest
+from src.services.fetcher import Fetcher
+from src.services.resilience import CircuitBreaker
+
+
+class MockQuery:
+    """只支持 filter(Model.id == value).first() 的查询替身"""
+
+    def __init__(self, rows, key=None):
+        self.rows = rows
+        self.key = key
+
+    def filter(self, criterion):
+        return MockQuery(self.rows, criterion.right.value)
+
+    def first(self):
+        return self.rows.get(self.key)
+
+
+class MockDB:
+    """按 id 查找记录的会话替身，记录查询次数"""
+
+    def __init__(self, *rows):
+        self.rows = {row.id: row for row in rows}
+        self.queries = 0
+
+    def query(self, model):
+        self.queries += 1
+        return MockQuery(self.rows)
+
+
+class NoopPoliteness:
+    """跳过 robots.txt 与限速"""
+
+    def reserve(self, url):
+        return 0.0
+
+    def wait(self, url):
+        pass
+
+
+@pytest.fixture
+def mock_db():
+    """MockDB(*rows) 工厂"""
+    return MockDB
+
+
+@pytest.fixture
+def fetcher():
+    """跳过 robots.txt 与限速、熔断状态独立的抓取器"""
+    fetcher = Fetcher()
+    fetcher.politeness = NoopPoliteness()
+    fetcher.circuit_breaker = CircuitBreaker()
+    return fetcher
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+批量 diff 测试
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from src.services import batch_diff
+from src.services.batch_diff import BatchDiffer
+
+
+def make_snapshot(index, text, fields=None):
+    return SimpleNamespace(
+        id=f"snap-{index}", source_id="source-1", text=text,
+        html_path=None, structured_fields=fields
+    )
+
+
+class TestBatchDiffer:
+    """批量 diff 测试"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_db):
+        self.source = SimpleNamespace(
+            id="source-1", sensitivity="high", diff_mode=None, exclude_selectors=None
+        )
+        self.db = mock_db(self.source)
+        texts = ["Plan A\nPlan B", "Plan A\nPlan C", "Plan A\nPlan C", "Plan A\nPlan D\nPlan E"]
+        self.snapshots = [make_snapshot(i, text) for i, text in enumerate(texts)]
+        self.pairs = list(zip(self.snapshots, self.snapshots[1:]))
+
+    @pytest.fixture(autouse=True)
+    def _texts(self, monkeypatch):
+        monkeypatch.setattr(batch_diff, "load_snapshot_text", lambda db, snapshot: snapshot.text)
+
+    def test_results_in_order(self):
+        """结果按输入顺序返回，无变化的对 text_diff 为空"""
+        results = list(BatchDiffer(workers=0, window=2).run(self.db, iter(self.pairs)))
+
+        assert [r["to_snapshot_id"] for r in results] == ["snap-1", "snap-2", "snap-3"]
+        assert results[1]["text_diff"] is None
+        assert results[2]["text_diff"]["added_lines"] == 2
+        # 同一源只查询一次
+        assert self.db.queries == 1
+
+    def test_window_bounds_in_flight(self, monkeypatch):
+        """同时在途的快照对不超过 window 个"""
+        differ = BatchDiffer(workers=0, window=2)
+        submitted = []
+        original = differ._submit
+        monkeypatch.setattr(differ, "_submit", lambda *args: submitted.append(args[2]) or original(*args))
+
+        results = differ.run(self.db, iter(self.pairs))
+        next(results)
+        assert len(submitted) == 2
+
+    def test_structural_changes(self):
+        """结构化字段变化由快照保存的字段比较得出"""
+        self.snapshots[0].structured_fields = {"price": ["20"]}
+        self.snapshots[1].structured_fields = {"price": ["25"]}
+        result = next(BatchDiffer(workers=0).run(self.db, iter(self.pairs[:1])))
+        assert result["text_diff"]["structural_changes"][0]["added"] == ["25"]
+
+    def test_process_pool(self):
+        """进程池执行与线程内执行结果一致"""
+        differ = BatchDiffer(workers=1, window=2)
+        try:
+            pooled = list(differ.run(self.db, iter(self.pairs)))
+        finally:
+            differ.close()
+        assert pooled == list(BatchDiffer(workers=0).run(self.db, iter(self.pairs)))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
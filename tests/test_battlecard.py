@@ -41,6 +41,20 @@ class TestBattlecardGenerator:
         result = self.generator.price_extractor.extract(html)
         assert "detected_prices" in result
         assert "price_elements" in result
+        assert result["detected_prices"] == ["29", "99"]
+        assert [(p["plan"], p["period"]) for p in result["prices"]] == [("Basic", "month"), ("Pro", "month")]
+    
+    def test_price_extractor_skips_scripts(self):
+        """不扫描脚本与隐藏元素中的文本"""
+        html = """
+        <script>var price = "$5";</script>
+        <div hidden>$7</div>
+        <p>Team: 199 USD per year</p>
+        """
+        prices = self.generator.price_extractor.extract(html)["prices"]
+        assert [(p["amount"], p["currency"], p["period"], p["plan"]) for p in prices] == [
+            (199.0, "USD", "year", "Team")
+        ]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+内容寻址存储测试
+"""
+
+import os
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Blob
+from src.utils.blob_store import BlobStore
+
+
+class TestBlobStore:
+    """BlobStore 文件层测试"""
+
+    def setup_method(self):
+        self.html = "<html><body>定价 $29/month</body></html>".encode("utf-8")
+
+    def test_roundtrip_gzip(self, tmp_path):
+        """压缩写入后可还原"""
+        store = BlobStore(root=tmp_path, compression="gzip")
+        digest, path = store.write_blob(self.html)
+
+        assert path.suffix == ".gz"
+        assert store.read(str(path)) == self.html
+
+    def test_sharded_and_deduplicated(self, tmp_path):
+        """按哈希前缀分目录，相同内容只写一次"""
+        store = BlobStore(root=tmp_path, compression="gzip")
+        digest, path = store.write_blob(self.html)
+        mtime = path.stat().st_mtime_ns
+
+        digest2, path2 = store.write_blob(self.html)
+
+        assert digest == digest2 and path == path2
+        assert path.parent == tmp_path / digest[:2] / digest[2:4]
+        assert path.stat().st_mtime_ns == mtime
+        assert len(list(tmp_path.rglob("*.gz"))) == 1
+
+    def test_read_legacy_html(self, tmp_path):
+        """兼容旧版未压缩快照文件"""
+        legacy = tmp_path / "source_20240101_000000.html"
+        legacy.write_bytes(self.html)
+
+        assert BlobStore(root=tmp_path).read_text(str(legacy)) == self.html.decode("utf-8")
+
+
+class TestBlobGarbage:
+    """引用计数与垃圾回收测试"""
+
+    def setup_method(self):
+        engine = create_engine("sqlite://")
+        Blob.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+
+    def teardown_method(self):
+        self.db.close()
+
+    def test_release_then_collect(self, tmp_path):
+        """引用全部释放后文件与记录一起删除"""
+        store = BlobStore(root=tmp_path, compression="gzip")
+        path = store.put(self.db, b"<p>a</p>")
+        store.put(self.db, b"<p>a</p>")
+        self.db.commit()
+
+        store.release(self.db, path)
+        assert store.collect_garbage(self.db) == 0
+        store.release(self.db, path)
+        assert store.collect_garbage(self.db) == 1
+
+        assert not os.path.exists(path)
+        assert self.db.query(Blob).count() == 0
+
+    def test_collect_orphans(self, tmp_path):
+        """没有记录的旧文件被回收，新文件保留"""
+        store = BlobStore(root=tmp_path, compression="gzip")
+        kept = store.put(self.db, b"<p>kept</p>")
+        self.db.commit()
+        _, orphan = store.write_blob(b"<p>rolled back</p>")
+        _, recent = store.write_blob(b"<p>in flight</p>")
+        old = time.time() - 7200
+        for path in (kept, orphan):
+            os.utime(path, (old, old))
+
+        assert store.collect_garbage(self.db, min_age=3600) == 1
+
+        assert os.path.exists(kept) and recent.exists()
+        assert not orphan.exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
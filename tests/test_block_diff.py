@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+区块 diff 测试
+"""
+
+import pytest
+from src.services.block_diff import remove_blocks, split_blocks
+from src.services.diff_engine import DiffEngine
+
+
+PAGE = """
+<html><body>
+<nav>Home | Pricing</nav>
+<div id="main">
+  Intro text
+  <h2>Pricing</h2>
+  <table>
+    <tr><th>Plan</th><th>Price</th></tr>
+    <tr><td>Pro</td><td>{price}</td></tr>
+  </table>
+  <h2>Features</h2>
+  <ul class="features"><li>SSO</li><li>API <b>access</b></li></ul>
+</div>
+</body></html>
+"""
+
+
+class TestSplitBlocks:
+    """区块切分测试"""
+
+    def test_blocks_and_sections(self):
+        """标题、表格行、列表项各成一块，并记录所在章节"""
+        blocks = split_blocks(PAGE.format(price="$20"))
+
+        assert [b.text for b in blocks] == [
+            "Intro text", "Pricing", "Plan | Price", "Pro | $20",
+            "Features", "SSO", "API access"
+        ]
+        assert blocks[3].section == "Pricing"
+        assert blocks[3].css_path == "body > div#main > table:nth-of-type(1) > tr:nth-of-type(2)"
+        assert blocks[6].css_path == "body > div#main > ul.features:nth-of-type(1) > li:nth-of-type(2)"
+
+    def test_exclude_selectors(self):
+        """排除选择器命中的区块被移除"""
+        blocks = split_blocks(PAGE.format(price="$20"), exclude_selectors=["table"])
+        assert "Pro | $20" not in [b.text for b in blocks]
+
+    def test_remove_blocks(self):
+        """按路径移除区块（含零散文本），其余区块与路径不变"""
+        html = PAGE.format(price="$20")
+        paths = ["body > div#main", "body > div#main > table:nth-of-type(1) > tr:nth-of-type(2)"]
+
+        blocks = split_blocks(remove_blocks(html, paths))
+
+        assert [b.text for b in blocks] == [
+            "Pricing", "Plan | Price", "Features", "SSO", "API access"
+        ]
+        assert blocks[4].css_path == split_blocks(html)[6].css_path
+
+
+class TestBlockDiff:
+    """区块 diff 测试"""
+
+    def setup_method(self):
+        self.engine = DiffEngine(sensitivity="high")
+
+    def test_chunk_has_path_and_section(self):
+        """差异块附带 CSS 路径与章节标题"""
+        old = split_blocks(PAGE.format(price="$20"))
+        new = split_blocks(PAGE.format(price="$249 per seat"))
+        event = self.engine.compute_block_diff(old, new)
+
+        assert len(event.chunks) == 1
+        chunk = event.chunks[0]
+        assert (chunk.old_text, chunk.new_text) == ("Pro | $20", "Pro | $249 per seat")
+        assert chunk.section == "Pricing"
+        assert chunk.css_path == new[3].css_path
+        assert self.engine.to_json(event)["chunks"][0]["section"] == "Pricing"
+
+    def test_identical_blocks(self):
+        """区块哈希一致时无变化"""
+        blocks = split_blocks(PAGE.format(price="$20"))
+        assert self.engine.compute_block_diff(blocks, list(blocks)) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+浏览器池测试
+"""
+
+import sys
+import types
+
+import pytest
+from src.services.browser_pool import BrowserPool, HeadlessOptions, NavigationError
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        self.url = None
+        self.handler = None
+
+    def route(self, pattern, handler):
+        self.handler = handler
+
+    def goto(self, url, wait_until=None, timeout=None):
+        if "crash" in url:
+            self.browser.connected = False
+            raise RuntimeError("browser crashed")
+        self.url = url
+
+    def wait_for_selector(self, selector, timeout=None):
+        if selector == "#missing":
+            raise TimeoutError(f"waiting for selector {selector}")
+
+    def content(self):
+        return f"<html>{self.url}</html>"
+
+    def close(self):
+        pass
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    def new_page(self):
+        return FakePage(self.browser)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, stats):
+        self.stats = stats
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **kwargs):
+        self.stats["contexts"] += 1
+        return FakeContext(self)
+
+    def close(self):
+        pass
+
+
+class FakePlaywright:
+    def __init__(self, stats):
+        self.stats = stats
+        self.chromium = self
+
+    def launch(self, headless=True):
+        self.stats["launches"] += 1
+        return FakeBrowser(self.stats)
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    """注入假的 playwright 模块并统计浏览器/上下文创建次数"""
+    stats = {"launches": 0, "contexts": 0}
+    module = types.ModuleType("playwright.sync_api")
+
+    class _Starter:
+        def start(self):
+            return FakePlaywright(stats)
+
+    module.sync_playwright = lambda: _Starter()
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", module)
+    return stats
+
+
+class TestBrowserPool:
+    """浏览器池测试"""
+
+    def test_reuses_browser(self, stats):
+        """多次渲染只启动一次浏览器"""
+        pool = BrowserPool(size=1, max_pages_per_context=100)
+        try:
+            for i in range(5):
+                assert pool.render(f"https://a.com/{i}") == f"<html>https://a.com/{i}</html>"
+        finally:
+            pool.close()
+
+        assert stats["launches"] == 1
+        assert stats["contexts"] == 1
+
+    def test_recycles_context(self, stats):
+        """达到页面上限后回收上下文"""
+        pool = BrowserPool(size=1, max_pages_per_context=2)
+        try:
+            for i in range(5):
+                pool.render(f"https://a.com/{i}")
+        finally:
+            pool.close()
+
+        assert stats["launches"] == 1
+        assert stats["contexts"] == 3
+
+    def test_restarts_crashed_browser(self, stats):
+        """浏览器崩溃后自动重启"""
+        pool = BrowserPool(size=1, max_pages_per_context=100)
+        try:
+            with pytest.raises(NavigationError):
+                pool.render("https://a.com/crash")
+            assert pool.render("https://a.com/ok") == "<html>https://a.com/ok</html>"
+        finally:
+            pool.close()
+
+        assert stats["launches"] == 2
+
+    def test_page_errors_not_navigation(self, stats):
+        """选择器等待超时与非法 wait_until 不归为导航失败"""
+        pool = BrowserPool(size=1, max_pages_per_context=100)
+        try:
+            with pytest.raises(TimeoutError):
+                pool.render("https://a.com/", HeadlessOptions(wait_selector="#missing"))
+            with pytest.raises(ValueError):
+                pool.render("https://a.com/", HeadlessOptions(wait_until="idle"))
+        finally:
+            pool.close()
+
+
+class TestHeadlessOptions:
+    """无头渲染选项测试"""
+
+    def test_should_block(self):
+        """按资源类型和域名（含子域名）拦截"""
+        options = HeadlessOptions(
+            blocked_resource_types=["image"],
+            blocked_domains=["tracker.com"]
+        )
+        assert options.should_block("image", "https://a.com/logo.png")
+        assert options.should_block("script", "https://cdn.tracker.com/t.js")
+        assert not options.should_block("script", "https://nottracker.com/t.js")
+        assert not options.should_block("document", "https://a.com/")
+
+    def test_source_overrides(self):
+        """源字段覆盖全局配置，空值沿用全局配置"""
+        class MockSource:
+            block_resource_types = []
+            block_domains = None
+            wait_until = "networkidle"
+            wait_selector = "#pricing"
+
+        options = HeadlessOptions.from_source(MockSource())
+        assert options.blocked_resource_types == []
+        assert options.blocked_domains == HeadlessOptions.from_source().blocked_domains
+        assert options.wait_until == "networkidle"
+        assert options.wait_selector == "#pricing"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+数据库升级测试
+"""
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Index, Integer, MetaData, String, Table, create_engine, inspect
+
+from src.db.connection import upgrade_schema
+
+
+class TestUpgradeSchema:
+    """为已有表补齐新增列与索引"""
+
+    def setup_method(self):
+        self.engine = create_engine("sqlite://")
+        old = MetaData()
+        Table("parents", old, Column("id", Integer, primary_key=True))
+        Table("items", old, Column("id", Integer, primary_key=True), Column("name", String(50)))
+        old.create_all(self.engine)
+
+        self.new = MetaData()
+        Table("parents", self.new, Column("id", Integer, primary_key=True))
+        Table(
+            "items", self.new,
+            Column("id", Integer, primary_key=True),
+            Column("name", String(50)),
+            Column("etag", String(500)),
+            Column("parent_id", Integer, ForeignKey("parents.id")),
+            Index("ix_items_etag", "etag")
+        )
+
+    def test_adds_columns_and_indexes(self):
+        upgrade_schema(self.engine, self.new)
+
+        inspector = inspect(self.engine)
+        columns = {c["name"] for c in inspector.get_columns("items")}
+        assert {"etag", "parent_id"} <= columns
+        assert "ix_items_etag" in {i["name"] for i in inspector.get_indexes("items")}
+
+    def test_idempotent(self):
+        upgrade_schema(self.engine, self.new)
+        upgrade_schema(self.engine, self.new)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+diff 结果缓存测试
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import DiffResult
+from src.services.diff_cache import DiffCache
+from src.services.diff_engine import DiffEngine
+
+
+class TestDiffCache:
+    """diff 缓存测试"""
+
+    def setup_method(self):
+        self.engine = DiffEngine(sensitivity="high")
+        self.calls = 0
+
+    def compute(self, old="Plan A\nPlan B", new="Plan A\nPlan C"):
+        def run():
+            self.calls += 1
+            return self.engine.compute_diff(old, new)
+        return run
+
+    def test_hit_and_miss(self):
+        """相同键只计算一次，返回的是副本"""
+        cache = DiffCache(max_size=8)
+        key = ("h1", "h2", "high", "text")
+        first = cache.get_or_compute(None, key, self.compute())
+        first.structural_changes = [{"field": "price"}]
+        second = cache.get_or_compute(None, key, self.compute())
+
+        assert self.calls == 1
+        assert second.summary == first.summary
+        assert second.structural_changes == []
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_caches_no_change(self):
+        """无显著变化的结果同样缓存"""
+        cache = DiffCache(max_size=8)
+        key = ("h1", "h1", "high", "text")
+        assert cache.get_or_compute(None, key, self.compute("a", "a")) is None
+        assert cache.get_or_compute(None, key, self.compute("a", "a")) is None
+        assert self.calls == 1
+
+    def test_lru_eviction(self):
+        """超过容量时淘汰最久未用的结果"""
+        cache = DiffCache(max_size=2)
+        for name in ("a", "b", "a", "c"):
+            cache.get_or_compute(None, (name, name, "high", "text"), self.compute())
+        cache.get_or_compute(None, ("b", "b", "high", "text"), self.compute())
+        assert self.calls == 4
+
+    def test_persistent(self):
+        """持久化结果在新的缓存实例中可命中"""
+        engine = create_engine("sqlite://")
+        DiffResult.__table__.create(engine)
+        db = sessionmaker(bind=engine)()
+        key = ("h1", "h2", "high", "text")
+
+        event = DiffCache(max_size=8, persistent=True).get_or_compute(db, key, self.compute())
+        restored = DiffCache(max_size=8, persistent=True).get_or_compute(db, key, self.compute())
+
+        assert self.calls == 1
+        assert restored.chunks == event.chunks
+        assert restored.added_line_hashes == event.added_line_hashes
+        db.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
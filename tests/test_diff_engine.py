@@ -4,7 +4,12 @@
 """
 
 import pytest
-from src.services.diff_engine import DiffEngine, detect_changes
+from src.config import settings
+from src.services import diff_engine
+from src.services.diff_engine import (
+    DiffBudget, DiffEngine, LineChanges, StructuralDiffEngine, detect_changes, line_hash,
+    patience_opcodes
+)
 
 
 class TestDiffEngine:
@@ -68,6 +73,168 @@ class TestDiffEngine:
         assert result is not None or result is None  # 取决于是否超过阈值
 
 
+class TestLineDiff:
+    """行级 diff 测试"""
+    
+    def test_opcodes_rebuild_target(self):
+        """操作序列可从旧文本还原出新文本"""
+        old = ["a\n", "b\n", "c\n", "b\n", "d\n"]
+        new = ["a\n", "c\n", "b\n", "x\n", "d\n", "e\n"]
+        rebuilt = []
+        for tag, a0, a1, b0, b1 in patience_opcodes(old, new):
+            if tag == "equal":
+                assert old[a0:a1] == new[b0:b1]
+            rebuilt.extend(new[b0:b1])
+        assert rebuilt == new
+    
+    def test_chunks_are_lines(self, monkeypatch):
+        """差异块按行输出，position 为新旧文本中的字符偏移"""
+        monkeypatch.setattr(settings.diff, "char_diff_max_chars", 0)
+        engine = DiffEngine(sensitivity="high")
+        old = "\n".join(f"Feature {i}" for i in range(20))
+        new = old.replace("Feature 5\n", "Feature 5 (beta)\n") + "\nFeature 20"
+        event = engine.compute_diff(old, new)
+        
+        assert [c.type for c in event.chunks] == ["replace", "add"]
+        assert event.chunks[0].old_text == "Feature 5"
+        assert event.chunks[0].new_text == "Feature 5 (beta)"
+        assert event.chunks[0].position == old.index("Feature 5")
+        assert event.chunks[1].new_text == "Feature 20"
+    
+    def test_ratio_refined_within_line(self, monkeypatch):
+        """单行内的小改动按字符计算变更率"""
+        monkeypatch.setattr(settings.diff, "char_diff_max_chars", 0)
+        engine = DiffEngine(sensitivity="high")
+        event = engine.compute_diff("Price: $10 per month", "Price: $15 per month")
+        assert event is not None
+        assert event.change_ratio < 0.1
+
+
+class TestDiffStrategy:
+    """分级 diff 策略测试"""
+    
+    def test_low_sensitivity_skips_diff(self, monkeypatch):
+        """前后缀下界已低于阈值时不做 diff"""
+        monkeypatch.setattr(diff_engine, "patience_opcodes", lambda *a, **kw: pytest.fail("diffed"))
+        old = "\n".join(f"Changelog entry {i}: fixed a bug" for i in range(200))
+        new = old.replace("entry 100:", "entry 100 (updated):")
+        
+        assert DiffEngine(sensitivity="low").compute_diff(old, new) is None
+    
+    def test_budget_exhausted(self, monkeypatch):
+        """预算用尽时未对齐区间整段视为替换，结果仍可还原"""
+        old = ["x\n"] * 50 + ["a\n"]
+        new = ["y\n"] * 50 + ["a\n"]
+        budget = DiffBudget(max_operations=10, timeout=10)
+        opcodes = patience_opcodes(old, new, budget)
+        
+        assert budget.exhausted
+        assert opcodes == [("replace", 0, 50, 0, 50), ("equal", 50, 51, 50, 51)]
+    
+    def test_long_single_line(self):
+        """超长单行（如 readability 输出）按词细化：小改动不算整页重写，摘录指向改动处"""
+        words = [f"word{i % 97}x{i}" for i in range(600)]
+        old = " ".join(words)
+        edited = list(words)
+        edited[100] = "renamed"
+        edited[500] = "updated"
+        assert DiffEngine(sensitivity="high").compute_diff(old, " ".join(edited)) is None
+        
+        edited[300:320] = ["NEW"] * 20
+        new = " ".join(edited)
+        event = DiffEngine(sensitivity="high").compute_diff(old, new)
+        assert 0.02 < event.change_ratio < 0.1
+        chunk = event.chunks[0]
+        assert chunk.old_text.startswith("word3x100")
+        start, end = chunk.new_range
+        assert new[start:end][:len(chunk.new_text)] == chunk.new_text
+        assert new[start:].startswith("renamed")
+    
+    def test_small_text_char_diff(self, monkeypatch):
+        """短文本按字符 diff"""
+        monkeypatch.setattr(settings.diff, "char_diff_max_chars", 1000)
+        event = DiffEngine(sensitivity="high").compute_diff("Plan: Pro", "Plan: Team")
+        assert [(c.old_text, c.new_text) for c in event.chunks] == [("Pro", "Team")]
+
+
+class TestLineChanges:
+    """行变化计数测试"""
+    
+    def test_duplicate_lines(self):
+        """重复行按出现次数计算"""
+        changes = LineChanges.between(["a", "a", "b"], ["a", "b", "b", "c"])
+        assert changes.added_count == 2
+        assert changes.removed_count == 1
+        assert sorted(changes.added_hashes()) == sorted([line_hash("b"), line_hash("c")])
+    
+    def test_line_gate_before_diff(self, monkeypatch):
+        """行变化不足时不做 diff"""
+        monkeypatch.setattr(diff_engine, "patience_opcodes", lambda *a, **kw: pytest.fail("diffed"))
+        monkeypatch.setattr(settings.diff, "char_diff_max_chars", 0)
+        engine = DiffEngine(sensitivity="medium")
+        assert engine.compute_diff("a\nb\nc", "a\nx\nc") is None
+    
+    def test_event_hashes(self):
+        """事件携带新增 / 删除行的哈希"""
+        event = DiffEngine(sensitivity="high").compute_diff("Plan A\nPlan B", "Plan A\nPlan C")
+        assert event.added_line_hashes == [line_hash("Plan C")]
+        assert event.removed_line_hashes == [line_hash("Plan B")]
+
+
+class TestBoundedChunks:
+    """差异块摘录与数量上限测试"""
+    
+    def setup_method(self):
+        self.engine = DiffEngine(sensitivity="high")
+    
+    def test_excerpt_and_ranges(self, monkeypatch):
+        """差异块只保留摘录，按区间可从原文取回完整内容"""
+        monkeypatch.setattr(settings.diff, "excerpt_chars", 20)
+        monkeypatch.setattr(settings.diff, "char_diff_max_chars", 0)
+        old = "\n".join(f"Section {i}" for i in range(10))
+        added = "\n".join(f"New paragraph {i} with details" for i in range(5))
+        new = old.replace("Section 4\n", f"Section 4\n{added}\n")
+        event = self.engine.compute_diff(old, new)
+        
+        chunk = event.chunks[0]
+        assert chunk.type == "add"
+        assert chunk.new_text == added[:20]
+        start, end = chunk.new_range
+        assert new[start:end] == added
+    
+    def test_max_chunks(self, monkeypatch):
+        """超过上限的差异块只计数"""
+        monkeypatch.setattr(settings.diff, "max_chunks", 3)
+        monkeypatch.setattr(settings.diff, "char_diff_max_chars", 0)
+        old = "\n".join(f"Item {i}" for i in range(40))
+        new = "\n".join(f"Item {i}" if i % 4 else f"Item {i} (changed)" for i in range(40))
+        event = self.engine.compute_diff(old, new)
+        
+        assert len(event.chunks) == 3
+        assert event.omitted_chunks == 7
+        assert self.engine.to_json(event)["omitted_chunks"] == 7
+
+
+class TestStructuralDiff:
+    """结构化字段测试"""
+    
+    def setup_method(self):
+        self.engine = StructuralDiffEngine()
+    
+    def test_extract_fields(self):
+        """字段去重排序，未出现的字段不保存"""
+        fields = self.engine.extract_fields("Pro $20, Team $20, Enterprise $99.00 (v2.1)")
+        assert fields == {"price": ["20", "99.00"], "version": ["2.1"]}
+    
+    def test_compare_fields(self):
+        """按集合比较已提取的字段"""
+        changes = self.engine.compare_fields(
+            {"price": ["20"], "date": ["2024-01-01"]},
+            {"price": ["25"], "date": ["2024-01-01"]}
+        )
+        assert changes == [{"field": "price", "added": ["25"], "removed": ["20"], "type": "pricing"}]
+
+
 class TestDetectChanges:
     """综合变更检测测试"""
     
@@ -78,8 +245,15 @@ class TestDetectChanges:
         
         result = detect_changes(old_text, new_text, sensitivity="medium")
         
-        assert "has_changes" in result
-        assert "text_diff" in result
+        # 行变化不足时没有文本变更事件，结构化变化仍然给出
+        assert result["has_changes"] is False
+        assert result["text_diff"] is None
+        assert {c["field"] for c in result["structural_changes"]} == {"version", "price"}
+
+        # 超过阈值时文本变更事件携带同一组结构化变化
+        result = detect_changes(old_text, new_text, sensitivity="high")
+        assert result["has_changes"] is True
+        assert result["text_diff"]["structural_changes"] == result["structural_changes"]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+差异块全文读取测试
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from src.api import routes
+from src.api.routes import get_event_chunk
+
+
+class TestEventChunk:
+    """按偏移读取差异块测试"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_db):
+        self.source = SimpleNamespace(exclude_selectors=None, volatile_masks=None)
+        self.chunk = {
+            "type": "replace", "old_text": "Pro", "new_text": "Team", "position": 6,
+            "old_range": [6, 9], "new_range": [6, 10], "css_path": None
+        }
+        self.event = SimpleNamespace(
+            id="event-1", source=self.source, diff_chunks=[self.chunk],
+            from_snapshot=SimpleNamespace(text="Plan: Pro"),
+            to_snapshot=SimpleNamespace(text="Plan: Team")
+        )
+        self.db = mock_db(self.event)
+
+    @pytest.fixture(autouse=True)
+    def _texts(self, monkeypatch):
+        monkeypatch.setattr(routes, "load_snapshot_text", lambda db, snapshot: snapshot.text)
+
+    def test_full_text(self):
+        """按区间取回完整新旧文本"""
+        chunk = get_event_chunk("event-1", 0, self.db)
+        assert (chunk["old_text"], chunk["new_text"]) == ("Pro", "Team")
+
+    def test_deleted_snapshot(self):
+        """快照已被保留策略删除时返回 410"""
+        self.event.from_snapshot = None
+        with pytest.raises(HTTPException) as error:
+            get_event_chunk("event-1", 0, self.db)
+        assert error.value.status_code == 410
+
+    def test_masks_changed(self):
+        """block 模式下易变路径已变化时拒绝按旧偏移读取"""
+        self.chunk.update(css_path="body > p:nth-of-type(1)", mask_fingerprint="stale")
+        with pytest.raises(HTTPException) as error:
+            get_event_chunk("event-1", 0, self.db)
+        assert error.value.status_code == 409
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
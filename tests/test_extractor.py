@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+正文提取测试
+"""
+
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from src.services.extractor import ExtractOptions, ExtractionPool, extract_text, extract_text_lxml
+
+
+HTML = """
+<html><body>
+<nav>Home | Pricing</nav>
+<article><h1>Changelog</h1>
+<p>Version 2.0 adds team workspaces and a new billing dashboard for admins.</p>
+<p>Version 1.9 improves search relevance across all connected workspaces.</p>
+</article>
+<footer>© 2024</footer>
+</body></html>
+"""
+
+
+class TestExtractionPool:
+    """提取进程池测试"""
+
+    def test_inline_mode(self):
+        """workers=0 时在当前线程提取"""
+        pool = ExtractionPool(workers=0)
+        assert pool.extract(HTML) == extract_text(HTML)
+
+    def test_process_pool(self):
+        """子进程提取结果与本地一致"""
+        pool = ExtractionPool(workers=1)
+        try:
+            assert pool.extract(HTML) == extract_text(HTML)
+        finally:
+            pool.close()
+
+    def test_recreates_broken_pool(self):
+        """进程池损坏时重建一次并重试"""
+        class BrokenExecutor:
+            shutdown_called = False
+
+            def submit(self, *args):
+                raise BrokenProcessPool("worker died")
+
+            def shutdown(self, wait=True):
+                self.shutdown_called = True
+
+        pool = ExtractionPool(workers=1)
+        broken = BrokenExecutor()
+        pool._executor = broken
+        try:
+            assert pool.extract(HTML) == extract_text(HTML)
+            assert broken.shutdown_called
+            assert pool._executor is not broken
+        finally:
+            pool.close()
+
+
+class TestLxmlExtraction:
+    """lxml 提取引擎测试"""
+
+    def test_block_text(self):
+        """每个块一行，忽略区域被移除"""
+        text = extract_text_lxml(HTML)
+        assert text.splitlines() == [
+            "Changelog",
+            "Version 2.0 adds team workspaces and a new billing dashboard for admins.",
+            "Version 1.9 improves search relevance across all connected workspaces.",
+        ]
+
+    def test_inline_whitespace_collapsed(self):
+        """行内标签不断行，空白折叠，节点尾部文本保留"""
+        html = "<div><p>Pro <b>plan</b>\n   $20 <span class='timestamp'>now</span>/mo</p></div>"
+        assert extract_text_lxml(html) == "Pro plan $20 /mo"
+
+    def test_include_exclude(self):
+        """只保留 include 区域，并移除 exclude 命中的节点"""
+        html = """
+        <div id="a"><p>Keep</p><p class="promo">Drop</p><div id="a2"><p>Nested</p></div></div>
+        <div id="b"><p>Outside</p></div>
+        """
+        text = extract_text_lxml(html, ["#a", "#a2"], [".promo"])
+        assert text.splitlines() == ["Keep", "Nested"]
+
+    def test_deterministic_and_empty(self):
+        assert extract_text_lxml(HTML) == extract_text_lxml(HTML)
+        assert extract_text_lxml("") == ""
+
+    def test_options_dispatch(self):
+        """源级选项选择引擎"""
+        class MockSource:
+            extract_engine = "lxml"
+            include_selectors = ["article"]
+            exclude_selectors = None
+
+        options = ExtractOptions.from_source(MockSource())
+        assert options.exclude_selectors == []
+        assert extract_text(HTML, options) == extract_text_lxml(HTML, ["article"])
+        assert ExtractionPool(workers=0).extract(HTML, options).startswith("Changelog")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
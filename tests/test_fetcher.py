@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+抓取器测试
+"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+from src.config import settings
+from src.services.fetcher import Fetcher, ContentNotModified, ResponseTooLarge, detect_charset
+from src.services.fingerprint import normalized_hash
+
+
+class TestFetchBatch:
+    """并发抓取测试"""
+
+    @pytest.fixture(autouse=True)
+    def no_retry(self, monkeypatch):
+        monkeypatch.setattr(settings.scraping, "retry_times", 0)
+
+    @pytest.fixture(autouse=True)
+    def setup(self, fetcher):
+        self.fetcher = fetcher
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+
+    def _fake_download(self, url, render_js=False, validators=None, headless_options=None):
+        host = url.split("/")[2]
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.active["*"] = self.active.get("*", 0) + 1
+            for key in (host, "*"):
+                self.peak[key] = max(self.peak.get(key, 0), self.active[key])
+        time.sleep(0.02)
+        with self.lock:
+            self.active[host] -= 1
+            self.active["*"] -= 1
+        if "fail" in url:
+            raise RuntimeError("boom")
+        return f"<p>{url}</p>"
+
+    def _fake_extract(self, html, options=None):
+        future = Future()
+        future.set_result(html[3:-4])
+        return future
+
+    def test_results_keep_order(self, monkeypatch):
+        """结果顺序与输入一致，失败以异常返回"""
+        monkeypatch.setattr(self.fetcher, "_download", self._fake_download)
+        monkeypatch.setattr(self.fetcher, "_submit_extraction", self._fake_extract)
+        targets = [
+            ("https://a.com/1", False),
+            ("https://b.com/fail", False),
+            ("https://c.com/3", False),
+        ]
+        results = self.fetcher.fetch_batch(targets)
+
+        assert results[0] == ("<p>https://a.com/1</p>", "https://a.com/1")
+        assert isinstance(results[1], RuntimeError)
+        assert results[2][1] == "https://c.com/3"
+
+    def test_concurrency_limits(self, monkeypatch):
+        """全局并发与单主机并发均受限"""
+        monkeypatch.setattr(self.fetcher, "_download", self._fake_download)
+        monkeypatch.setattr(self.fetcher, "_submit_extraction", self._fake_extract)
+        monkeypatch.setattr(settings.scraping, "max_concurrency", 4)
+        monkeypatch.setattr(settings.scraping, "per_host_concurrency", 1)
+        targets = [(f"https://host{i % 3}.com/{i}", False) for i in range(12)]
+
+        results = self.fetcher.fetch_batch(targets)
+
+        assert len(results) == 12
+        assert self.peak["*"] <= 4
+        assert all(self.peak[f"host{i}.com"] == 1 for i in range(3))
+
+    def test_bounded_extraction_queue(self, monkeypatch):
+        """提取队列容量为 1 时仍能完成全部抓取"""
+        monkeypatch.setattr(self.fetcher, "_download", self._fake_download)
+        monkeypatch.setattr(self.fetcher, "_submit_extraction", self._fake_extract)
+        monkeypatch.setattr(settings.scraping, "extract_queue_size", 1)
+        targets = [(f"https://a{i}.com/", False) for i in range(10)]
+
+        results = self.fetcher.fetch_batch(targets)
+
+        assert [text for _, text in results] == [url for url, _ in targets]
+
+    def test_empty_batch(self):
+        """空批次"""
+        assert self.fetcher.fetch_batch([]) == []
+
+    def test_sources_batch_applies_validators(self, monkeypatch):
+        """按源批量抓取：成功与未变化时写回条件请求状态，失败时保留原状态"""
+        def fake_batch(targets):
+            for index, (_, _, validators, *_) in enumerate(targets):
+                validators["etag"] = f"new-{index}"
+            results = [("<p>a</p>", "a"), ContentNotModified(), RuntimeError("boom")]
+            # 按完成顺序返回
+            for index in (2, 0, 1):
+                yield index, results[index]
+        monkeypatch.setattr(self.fetcher, "iter_fetch_batch", fake_batch)
+        sources = [
+            SimpleNamespace(id=i, url=f"https://s{i}.com/", fetch_mode="static",
+                            etag="old", last_modified=None, body_hash=None)
+            for i in range(3)
+        ]
+
+        results = list(self.fetcher.fetch_sources_batch(sources))
+
+        assert [source.id for source, _ in results] == [2, 0, 1]
+        assert [source.etag for source in sources] == ["new-0", "new-1", "old"]
+        assert isinstance(results[0][1], RuntimeError)
+
+    def test_iter_yields_as_completed(self, monkeypatch):
+        """逐个返回先完成的结果，不等待最慢的主机"""
+        def download(url, *args):
+            if "slow" in url:
+                time.sleep(0.5)
+            return f"<p>{url}</p>"
+        monkeypatch.setattr(self.fetcher, "_download", download)
+        monkeypatch.setattr(self.fetcher, "_submit_extraction", self._fake_extract)
+        targets = [("https://slow.com/", False)] + [(f"https://a{i}.com/", False) for i in range(3)]
+
+        started = time.monotonic()
+        results = self.fetcher.iter_fetch_batch(targets)
+        index, result = next(results)
+        assert index != 0 and time.monotonic() - started < 0.4
+        rest = dict(results)
+        assert sorted([index, *rest]) == [0, 1, 2, 3]
+        assert rest.get(0, result)[1] == "https://slow.com/"
+
+    def test_iter_stops_early(self, monkeypatch):
+        """提前停止迭代时不再开始新的下载"""
+        monkeypatch.setattr(settings.scraping, "max_concurrency", 1)
+        monkeypatch.setattr(settings.scraping, "extract_queue_size", 1)
+        monkeypatch.setattr(self.fetcher, "_download", self._fake_download)
+        monkeypatch.setattr(self.fetcher, "_submit_extraction", self._fake_extract)
+        targets = [(f"https://a{i}.com/", False) for i in range(50)]
+
+        for _ in self.fetcher.iter_fetch_batch(targets):
+            break
+
+        assert len(self.peak) < 20
+
+
+class FakeResponse:
+    """模拟 requests 流式响应"""
+
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.read_bytes = 0
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            chunk = self.content[i:i + chunk_size]
+            self.read_bytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        pass
+
+
+class TestConditionalGet:
+    """条件请求测试"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, fetcher):
+        self.fetcher = fetcher
+        self.sent_headers = []
+
+    def _patch_get(self, monkeypatch, response):
+        def fake_get(url, headers=None, **kwargs):
+            self.sent_headers.append(headers or {})
+            return response
+        monkeypatch.setattr(self.fetcher.session, "get", fake_get)
+
+    def test_sends_and_updates_validators(self, monkeypatch):
+        """发送校验器并更新为响应中的新值"""
+        self._patch_get(monkeypatch, FakeResponse(
+            content=b"<p>hi</p>",
+            headers={"ETag": '"v2"', "Last-Modified": "Tue, 01 Oct 2024 00:00:00 GMT"}
+        ))
+        validators = {"etag": '"v1"', "last_modified": None}
+
+        self.fetcher.fetch("https://a.com/", validators=validators)
+
+        assert self.sent_headers[0] == {"If-None-Match": '"v1"'}
+        assert validators["etag"] == '"v2"'
+        assert validators["last_modified"] == "Tue, 01 Oct 2024 00:00:00 GMT"
+
+    def test_not_modified(self, monkeypatch):
+        """304 时抛出 ContentNotModified 且不做提取"""
+        self._patch_get(monkeypatch, FakeResponse(status_code=304))
+        monkeypatch.setattr(self.fetcher, "_extract_text", lambda html, options=None: pytest.fail("extracted"))
+
+        with pytest.raises(ContentNotModified):
+            self.fetcher.fetch("https://a.com/", validators={"etag": '"v1"'})
+
+    def test_body_hash_unchanged(self, monkeypatch):
+        """响应体哈希与上次一致时跳过提取"""
+        body = b"<p>same</p>"
+        self._patch_get(monkeypatch, FakeResponse(content=body))
+        monkeypatch.setattr(self.fetcher, "_extract_text", lambda html, options=None: pytest.fail("extracted"))
+
+        with pytest.raises(ContentNotModified):
+            self.fetcher.fetch("https://a.com/", validators={"body_hash": hashlib.sha256(body).hexdigest()})
+
+
+class TestStreamingDownload:
+    """流式下载测试"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, fetcher):
+        self.fetcher = fetcher
+
+    def test_size_cap(self, monkeypatch):
+        """超过大小上限时中止读取"""
+        response = FakeResponse(content=b"x" * 1_000_000)
+        monkeypatch.setattr(self.fetcher.session, "get", lambda url, **kw: response)
+        monkeypatch.setattr(settings.scraping, "max_body_bytes", 100_000)
+
+        with pytest.raises(ResponseTooLarge):
+            self.fetcher.download("https://a.com/")
+        assert response.read_bytes < 200_000
+
+    def test_records_body_hash(self, monkeypatch):
+        """读取时计算响应体哈希"""
+        body = b"<p>hello</p>"
+        monkeypatch.setattr(self.fetcher.session, "get", lambda url, **kw: FakeResponse(content=body))
+        validators = {}
+
+        self.fetcher.download("https://a.com/", validators=validators)
+
+        assert validators["body_hash"] == hashlib.sha256(body).hexdigest()
+
+
+class TestDetectCharset:
+    """编码识别测试"""
+
+    def test_header_charset(self):
+        assert detect_charset("text/html; charset=GBK", b"") == "gbk"
+
+    def test_meta_charset(self):
+        body = '<html><head><meta charset="gb2312"></head><body>价格</body></html>'.encode("gb2312")
+        charset = detect_charset("text/html", body)
+        assert "价格" in body.decode(charset)
+
+    def test_default_utf8(self):
+        assert detect_charset("text/html", b"<p>hi</p>") == "utf-8"
+        assert detect_charset("text/html; charset=bogus", b"") == "utf-8"
+
+
+class TestSaveIfChanged:
+    """内容哈希短路测试"""
+
+    class MockDB:
+        commits = 0
+
+        def commit(self):
+            self.commits += 1
+
+    class MockSource:
+        id = "source-1"
+        source_type = "homepage"
+        last_checked_at = None
+        exclude_selectors = None
+        volatile_masks = None
+
+    def setup_method(self):
+        self.fetcher = Fetcher()
+        self.db = self.MockDB()
+        self.source = self.MockSource()
+        self.saved = []
+        self.kwargs = {}
+        self.fetcher.save_snapshot = lambda db, source_id, html, text, **kw: \
+            self.saved.append(text) or self.kwargs.update(kw) or "snapshot"
+
+    def test_unchanged_records_heartbeat(self):
+        """哈希一致时只更新检查时间"""
+        self.fetcher.latest_fingerprints = lambda db, source_id: (self.fetcher.compute_hash("same"), None)
+
+        assert self.fetcher.save_if_changed(self.db, self.source, "<p>same</p>", "same") is None
+        assert self.saved == []
+        assert self.source.last_checked_at is not None
+        assert self.db.commits == 1
+
+    def test_normalized_unchanged(self):
+        """只有空白差异时按归一化哈希跳过"""
+        self.fetcher.latest_fingerprints = lambda db, source_id: ("other", normalized_hash("Plan  Pro\n"))
+
+        assert self.fetcher.save_if_changed(self.db, self.source, "<p>Plan Pro</p>", "Plan Pro") is None
+        assert self.saved == []
+
+    def test_changed_saves_snapshot(self):
+        """哈希不同时保存快照"""
+        self.fetcher.latest_fingerprints = lambda db, source_id: (self.fetcher.compute_hash("old"), None)
+
+        assert self.fetcher.save_if_changed(self.db, self.source, "<p>new</p>", "new") == "snapshot"
+        assert self.saved == ["new"]
+        assert self.kwargs["price_data"] is None
+
+    def test_pricing_page_saves_prices(self):
+        """定价页随快照保存结构化价格"""
+        self.fetcher.latest_fingerprints = lambda db, source_id: None
+        self.source.source_type = "pricing"
+
+        self.fetcher.save_if_changed(self.db, self.source, "<p>Pro - $99/month</p>", "Pro - $99/month")
+
+        assert self.kwargs["price_data"] == [{
+            "amount": 99.0, "currency": "USD", "period": "month",
+            "plan": "Pro", "text": "Pro - $99/month"
+        }]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+快照指纹测试
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Snapshot
+from src.services.fingerprint import (
+    fingerprint_fields, find_similar, hamming_distance, normalized_hash, simhash
+)
+
+
+DOC = " ".join(f"Feature {i} supports workflow automation for team {i % 7}." for i in range(60))
+
+
+class TestFingerprint:
+    """指纹计算测试"""
+
+    def test_normalized_hash(self):
+        """空白与全角差异不影响归一化哈希"""
+        assert normalized_hash("Pro  plan\n$20") == normalized_hash("Pro plan $20")
+        assert normalized_hash("ＰＲＯ") == normalized_hash("PRO")
+        assert normalized_hash("Pro plan") != normalized_hash("Team plan")
+
+    def test_simhash_distance(self):
+        """小改动的 simhash 距离远小于不相关文本"""
+        edited = DOC.replace("Feature 30 supports", "Feature 30 now supports")
+        other = " ".join(f"Pricing tier {i} costs {i * 10} dollars per seat." for i in range(60))
+        assert hamming_distance(simhash(DOC), simhash(edited)) <= 6
+        assert hamming_distance(simhash(DOC), simhash(other)) > 12
+
+    def test_signed_storage(self):
+        """有符号存储值与无符号值的距离计算一致"""
+        fields = fingerprint_fields(DOC)
+        assert -(1 << 63) <= fields["simhash"] < (1 << 63)
+        assert hamming_distance(fields["simhash"], simhash(DOC)) == 0
+
+
+class TestFindSimilar:
+    """按 simhash 查找测试"""
+
+    def setup_method(self):
+        engine = create_engine("sqlite://")
+        Snapshot.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.source_id = uuid.uuid4()
+
+    def teardown_method(self):
+        self.db.close()
+
+    def add(self, text):
+        snapshot = Snapshot(id=uuid.uuid4(), source_id=self.source_id, **fingerprint_fields(text))
+        self.db.add(snapshot)
+        self.db.commit()
+        return snapshot
+
+    def test_band_lookup(self):
+        """分段索引取候选后按距离过滤"""
+        original = self.add(DOC)
+        self.add(" ".join(f"Pricing tier {i} costs {i * 10} dollars." for i in range(60)))
+
+        value = simhash(DOC) ^ 0b101  # 距离 2
+        assert find_similar(self.db, value, max_distance=3) == [original]
+        assert find_similar(self.db, value, max_distance=1) == []
+
+    def test_max_distance_limit(self):
+        """距离超出分段能保证的范围时报错"""
+        with pytest.raises(ValueError):
+            find_similar(self.db, 0, max_distance=4)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
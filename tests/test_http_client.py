@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+共享 HTTP 客户端测试
+"""
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from src.utils.http_client import DNSCache, connection_stats, get_http_session
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_port
+    # 先关闭共享会话中的长连接，否则处理线程一直阻塞在读请求上
+    get_http_session().close()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestSharedSession:
+    """共享会话测试"""
+
+    def test_singleton(self):
+        assert get_http_session() is get_http_session()
+
+    def test_connection_reuse_stats(self, server):
+        """同一主机的多次请求复用长连接（经 DNS 缓存解析主机名）"""
+        session = get_http_session()
+        for _ in range(3):
+            assert session.get(f"http://localhost:{server}/", timeout=5).text == "ok"
+
+        host = next(h for h in connection_stats()["hosts"] if h["host"] == f"http://localhost:{server}")
+        assert host["requests"] == 3
+        assert host["connections"] == 1
+
+
+class TestDNSCache:
+    """DNS 缓存测试"""
+
+    def setup_method(self):
+        self.calls = []
+
+    def _fake_getaddrinfo(self, host, port, *args):
+        self.calls.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port))] * 2
+
+    def test_cache_hits(self, monkeypatch):
+        """命中缓存时不再解析，地址去重"""
+        monkeypatch.setattr(socket, "getaddrinfo", self._fake_getaddrinfo)
+        cache = DNSCache(ttl=60)
+
+        assert cache.resolve("a.com", 443) == ["10.0.0.1"]
+        assert cache.resolve("a.com", 443) == ["10.0.0.1"]
+        assert self.calls == ["a.com"]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_bounded_and_invalidate(self, monkeypatch):
+        """超过容量时淘汰最久未用的条目，失效后重新解析"""
+        monkeypatch.setattr(socket, "getaddrinfo", self._fake_getaddrinfo)
+        cache = DNSCache(ttl=60, max_entries=2)
+
+        for host in ("a.com", "b.com", "c.com"):
+            cache.resolve(host, 443)
+        assert len(cache) == 2
+
+        cache.invalidate("c.com", 443)
+        cache.resolve("c.com", 443)
+        assert self.calls == ["a.com", "b.com", "c.com", "c.com"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
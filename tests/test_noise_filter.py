@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+噪声过滤测试
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from src.config import settings
+from src.services.diff_engine import ChangeEvent, DiffChunk
+from src.services.noise_filter import FEATURE_NAMES, NoiseFilter, extract_features
+
+
+def counter_event():
+    """只有数字变化的小改动（典型噪声）"""
+    return ChangeEvent(
+        summary="counter", change_ratio=0.02, added_lines=1, removed_lines=1,
+        chunks=[DiffChunk("replace", "12,345 users", "12,398 users", 0)]
+    )
+
+
+def feature_event():
+    """新增功能段落（典型有用变更）"""
+    return ChangeEvent(
+        summary="feature", change_ratio=0.35, added_lines=8, removed_lines=0,
+        chunks=[DiffChunk("add", "", "Introducing workflow automation for enterprise teams", 0)]
+    )
+
+
+class TestNoiseFilter:
+    """噪声过滤测试"""
+
+    def setup_method(self):
+        self.filter = NoiseFilter()
+        self.source = SimpleNamespace(noise_model=None)
+
+    def feedback(self, event, is_useful):
+        change_event = SimpleNamespace(
+            noise_features=extract_features(event), source=self.source
+        )
+        assert self.filter.learn(None, change_event, is_useful)
+
+    def test_features(self):
+        """特征与 FEATURE_NAMES 一一对应"""
+        features = extract_features(counter_event())
+        assert len(features) == len(FEATURE_NAMES)
+        assert features[FEATURE_NAMES.index("digit_only_ratio")] == 1.0
+
+    def test_untrained_not_suppressed(self):
+        """没有模型时只提取特征"""
+        event = counter_event()
+        self.filter.score(self.source, event)
+        assert event.noise_score is None
+        assert not event.is_suppressed
+
+    def test_learns_from_feedback(self, monkeypatch):
+        """反馈足够后屏蔽噪声，有用的变更不受影响"""
+        monkeypatch.setattr(settings.noise, "min_samples", 10)
+        monkeypatch.setattr(settings.noise, "suppress_threshold", 0.8)
+        monkeypatch.setattr(settings.noise, "learning_rate", 0.5)
+        for _ in range(40):
+            self.feedback(counter_event(), is_useful=False)
+            self.feedback(feature_event(), is_useful=True)
+
+        noise, useful = counter_event(), feature_event()
+        self.filter.score(self.source, noise)
+        self.filter.score(self.source, useful)
+
+        assert self.source.noise_model["samples"] == 80
+        assert noise.is_suppressed
+        assert not useful.is_suppressed
+        assert useful.noise_score < 0.5
+
+    def test_min_samples(self, monkeypatch):
+        """反馈不足时只打分不屏蔽"""
+        monkeypatch.setattr(settings.noise, "learning_rate", 0.5)
+        for _ in range(5):
+            self.feedback(counter_event(), is_useful=False)
+
+        event = counter_event()
+        self.filter.score(self.source, event)
+        assert event.noise_score > 0.5
+        assert not event.is_suppressed
+
+    def test_skips_event_without_features(self):
+        """旧事件没有特征时不训练"""
+        change_event = SimpleNamespace(noise_features=None, source=self.source)
+        assert not self.filter.learn(None, change_event, False)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
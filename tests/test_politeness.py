@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+抓取礼貌策略测试
+"""
+
+import time
+
+import pytest
+from src.config import settings
+from src.services.politeness import PolitenessPolicy, RobotsCache, RobotsDisallowed, TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        return self.response
+
+
+ROBOTS = """
+User-agent: *
+Disallow: /admin
+Crawl-delay: 10
+"""
+
+
+class TestTokenBucket:
+    """令牌桶测试"""
+
+    def test_burst_then_wait(self):
+        """突发额度用完后返回等待时间"""
+        bucket = TokenBucket(rate=1.0, burst=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+        assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+class TestPolitenessPolicy:
+    """robots.txt 与限速测试"""
+
+    def setup_method(self):
+        self.session = FakeSession(FakeResponse(text=ROBOTS))
+        self.policy = PolitenessPolicy(RobotsCache(self.session, ttl=60))
+
+    def test_disallowed(self):
+        """robots.txt 禁止的路径抛出 RobotsDisallowed"""
+        with pytest.raises(RobotsDisallowed):
+            self.policy.reserve("https://a.com/admin/users")
+
+    def test_robots_cached(self):
+        """同一站点的 robots.txt 只请求一次"""
+        self.policy.reserve("https://a.com/pricing")
+        self.policy.reserve("https://a.com/docs")
+        assert self.session.calls == 1
+
+    def test_crawl_delay(self, monkeypatch):
+        """Crawl-delay 比全局速率更严格时生效，且不允许突发"""
+        monkeypatch.setattr(settings.scraping, "domain_burst", 3)
+        assert self.policy.reserve("https://a.com/pricing") == 0
+        assert self.policy.reserve("https://a.com/docs") == pytest.approx(10.0, abs=0.1)
+
+    def test_ignore_robots(self, monkeypatch):
+        """关闭 respect_robots_txt 时不检查 robots.txt"""
+        monkeypatch.setattr(settings.scraping, "respect_robots_txt", False)
+        assert self.policy.reserve("https://a.com/admin") == 0
+        assert self.session.calls == 0
+
+    def test_unavailable_robots_allows(self):
+        """robots.txt 不存在时放行"""
+        policy = PolitenessPolicy(RobotsCache(FakeSession(FakeResponse(status_code=404)), ttl=60))
+        assert policy.reserve("https://b.com/admin") == 0
+
+    def test_server_error_disallows_temporarily(self):
+        """robots.txt 返回 5xx 时暂时禁止，并在较短时间后重新获取"""
+        session = FakeSession(FakeResponse(status_code=503))
+        robots = RobotsCache(session, ttl=3600)
+        policy = PolitenessPolicy(robots)
+        with pytest.raises(RobotsDisallowed):
+            policy.reserve("https://c.com/pricing")
+
+        expires, _ = robots._entries["https://c.com"]
+        assert expires - time.monotonic() <= RobotsCache.ERROR_TTL
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+重试与熔断测试
+"""
+
+import time
+
+import pytest
+import requests
+from src.config import settings
+from src.services.browser_pool import NavigationError
+from src.services.politeness import RobotsDisallowed
+from src.services.resilience import CircuitBreaker, CircuitOpenError, is_retryable
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch):
+    monkeypatch.setattr(settings.scraping, "retry_times", 2)
+    monkeypatch.setattr(settings.scraping, "retry_delay", 0)
+    monkeypatch.setattr(settings.scraping, "circuit_failure_threshold", 3)
+    monkeypatch.setattr(settings.scraping, "circuit_cooldown", 60)
+
+
+class TestIsRetryable:
+    """可重试错误判定"""
+
+    def test_classification(self):
+        assert is_retryable(requests.ConnectionError())
+        assert is_retryable(requests.Timeout())
+        assert is_retryable(http_error(503))
+        assert is_retryable(http_error(429))
+        assert not is_retryable(http_error(404))
+        assert not is_retryable(requests.exceptions.MissingSchema())
+
+    def test_browser_errors(self):
+        """导航失败可重试；等待选择器超时、非法参数等不可重试"""
+        assert is_retryable(NavigationError("net::ERR_CONNECTION_RESET"))
+        assert not is_retryable(TimeoutError("waiting for selector .price"))
+        assert not is_retryable(ValueError("Invalid wait_until: idle"))
+        assert not is_retryable(CircuitOpenError("a.com"))
+
+
+class TestCircuitBreaker:
+    """熔断器测试"""
+
+    def test_opens_after_threshold(self):
+        """连续失败达到阈值后熔断"""
+        breaker = CircuitBreaker()
+        for _ in range(3):
+            breaker.check("https://down.com/a")
+            breaker.record_failure("https://down.com/a", RuntimeError("timeout"))
+
+        assert breaker.is_open("https://down.com/b")
+        with pytest.raises(CircuitOpenError):
+            breaker.check("https://down.com/b")
+        assert not breaker.is_open("https://up.com/")
+        assert breaker.status()[0]["host"] == "down.com"
+
+    def test_half_open_trial(self, monkeypatch):
+        """冷却结束后只放行一次试探请求，成功即恢复"""
+        breaker = CircuitBreaker()
+        for _ in range(3):
+            breaker.record_failure("https://down.com/", RuntimeError("timeout"))
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+
+        assert breaker.check("https://down.com/") is True
+        assert breaker.is_open("https://down.com/")
+        with pytest.raises(CircuitOpenError):
+            breaker.check("https://down.com/")
+        breaker.record_success("https://down.com/")
+        assert breaker.check("https://down.com/") is False
+
+
+class TestFetcherRetry:
+    """抓取重试测试"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, fetcher):
+        self.fetcher = fetcher
+        self.calls = 0
+
+    def test_retries_then_succeeds(self, monkeypatch):
+        """可重试错误重试后成功"""
+        def flaky(url, *args):
+            self.calls += 1
+            if self.calls < 3:
+                raise requests.ConnectionError("reset")
+            return "<p>ok</p>"
+        monkeypatch.setattr(self.fetcher, "_download", flaky)
+
+        assert self.fetcher.download("https://a.com/") == "<p>ok</p>"
+        assert self.calls == 3
+        assert self.fetcher.circuit_breaker.status() == []
+
+    def test_no_retry_on_client_error(self, monkeypatch):
+        """4xx 不重试"""
+        def missing(url, *args):
+            self.calls += 1
+            raise http_error(404)
+        monkeypatch.setattr(self.fetcher, "_download", missing)
+
+        with pytest.raises(requests.HTTPError):
+            self.fetcher.download("https://a.com/")
+        assert self.calls == 1
+
+    def test_no_retry_on_selector_timeout(self, monkeypatch):
+        """页面配置错误不重试，也不计入熔断"""
+        def bad_selector(url, *args):
+            self.calls += 1
+            raise TimeoutError("waiting for selector .missing")
+        monkeypatch.setattr(self.fetcher, "_download", bad_selector)
+
+        for _ in range(5):
+            with pytest.raises(TimeoutError):
+                self.fetcher.download("https://a.com/")
+        assert self.calls == 5
+        assert not self.fetcher.circuit_breaker.is_open("https://a.com/")
+
+    def test_open_circuit_skips_politeness_wait(self, monkeypatch):
+        """熔断中的主机不进入限速等待"""
+        waited = []
+        monkeypatch.setattr(self.fetcher.politeness, "wait", waited.append)
+        for _ in range(3):
+            self.fetcher.circuit_breaker.record_failure("https://down.com/", requests.ConnectionError())
+
+        with pytest.raises(CircuitOpenError):
+            self.fetcher.download("https://down.com/")
+        assert waited == []
+
+    def test_trial_released_when_robots_disallow(self, monkeypatch):
+        """冷却结束后的试探请求被 robots.txt 拦截时归还名额，主机不会被永久拦截"""
+        monkeypatch.setattr(settings.scraping, "circuit_cooldown", 0)
+        monkeypatch.setattr(settings.scraping, "retry_times", 0)
+        for _ in range(3):
+            self.fetcher.circuit_breaker.record_failure("https://down.com/", requests.ConnectionError())
+
+        def robots_down(url):
+            raise RobotsDisallowed(url)
+        monkeypatch.setattr(self.fetcher.politeness, "wait", robots_down)
+        with pytest.raises(RobotsDisallowed):
+            self.fetcher.download("https://down.com/")
+        assert not self.fetcher.circuit_breaker.is_open("https://down.com/")
+
+        def unavailable(url, *args):
+            self.calls += 1
+            raise http_error(503)
+        monkeypatch.setattr(self.fetcher.politeness, "wait", lambda url: None)
+        monkeypatch.setattr(self.fetcher, "_download", unavailable)
+        with pytest.raises(requests.HTTPError):
+            self.fetcher.download("https://down.com/")
+        assert self.calls == 1
+
+    def test_batch_skips_open_host(self, monkeypatch):
+        """熔断后批量抓取不再请求该主机"""
+        def down(url, *args):
+            self.calls += 1
+            raise requests.ConnectionError("refused")
+        monkeypatch.setattr(self.fetcher, "_download", down)
+        monkeypatch.setattr(settings.scraping, "retry_times", 0)
+        monkeypatch.setattr(settings.scraping, "per_host_concurrency", 1)
+
+        targets = [("https://down.com/", False)] * 5
+        results = self.fetcher.fetch_batch(targets)
+
+        assert self.calls == 3
+        assert isinstance(results[-1], CircuitOpenError)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
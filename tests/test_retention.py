@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+快照保留测试
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Blob, ChangeEvent, Snapshot
+from src.services import retention
+from src.services.retention import delete_snapshots, prune_snapshots
+from src.services.text_store import SnapshotTextStore, encode_delta
+from src.utils.blob_store import BlobStore
+
+
+class TestRetention:
+    """快照删除与过期清理测试"""
+
+    @pytest.fixture(autouse=True)
+    def _stores(self, monkeypatch, tmp_path):
+        self.blob_store = BlobStore(root=tmp_path, compression="gzip")
+        monkeypatch.setattr(retention, "get_blob_store", lambda: self.blob_store)
+        monkeypatch.setattr(retention, "get_text_store", lambda: SnapshotTextStore())
+
+    def setup_method(self):
+        engine = create_engine("sqlite://")
+        for model in (Snapshot, ChangeEvent, Blob):
+            model.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.source_id = uuid.uuid4()
+
+    def teardown_method(self):
+        self.db.close()
+
+    def _snapshot(self, days_ago, text, base=None, html=None):
+        snapshot = Snapshot(
+            id=uuid.uuid4(),
+            source_id=self.source_id,
+            fetched_at=datetime.utcnow() - timedelta(days=days_ago),
+            html_path=self.blob_store.put(self.db, html.encode("utf-8")) if html else None
+        )
+        if base is None:
+            snapshot.text_content = text
+        else:
+            snapshot.text_delta = encode_delta(base.text_content, text)
+            snapshot.delta_base_id = base.id
+            snapshot.delta_depth = 1
+        self.db.add(snapshot)
+        self.db.commit()
+        return snapshot
+
+    def test_delete_releases_blob_and_rebases(self):
+        """删除快照释放 blob 引用，依赖它的增量快照转为关键帧，事件保留"""
+        old = self._snapshot(10, "Plan A\nPlan B", html="<p>A</p>")
+        new = self._snapshot(1, "Plan A\nPlan C", base=old, html="<p>C</p>")
+        event = ChangeEvent(id=uuid.uuid4(), source_id=self.source_id,
+                            from_snapshot_id=old.id, to_snapshot_id=new.id)
+        self.db.add(event)
+        self.db.commit()
+
+        assert delete_snapshots(self.db, [old]) == 1
+        self.db.commit()
+
+        assert new.text_content == "Plan A\nPlan C" and new.delta_base_id is None
+        self.db.refresh(event)
+        assert event.from_snapshot_id is None and event.to_snapshot_id == new.id
+        refs = {blob.path: blob.ref_count for blob in self.db.query(Blob)}
+        assert refs == {old.html_path: 0, new.html_path: 1}
+
+    def test_prune_keeps_latest(self):
+        """超过保留期的快照被删除，源的最新快照即使过期也保留"""
+        for days_ago in (40, 35, 31):
+            self._snapshot(days_ago, f"v{days_ago}")
+
+        assert prune_snapshots(self.db, retention_days=30) == 2
+        assert [s.text_content for s in self.db.query(Snapshot)] == ["v31"]
+
+    def test_retention_disabled(self):
+        """保留天数为 0 时不删除"""
+        self._snapshot(400, "v")
+        assert prune_snapshots(self.db, retention_days=0) == 0
+        assert self.db.query(Snapshot).count() == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
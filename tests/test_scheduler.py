@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+调度器测试
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from src.services.scheduler import MonitorScheduler
+
+
+class TestScheduleGroups:
+    """按 cron 表达式合并批量任务测试"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_db):
+        self.sources = [
+            SimpleNamespace(id="a", url="https://a.com/", schedule="0 * * * *"),
+            SimpleNamespace(id="b", url="https://b.com/", schedule="0 * * * *"),
+            SimpleNamespace(id="c", url="https://c.com/", schedule="0 9 * * *"),
+        ]
+        self.db = mock_db(*self.sources)
+        self.scheduler = MonitorScheduler()
+
+    def _jobs(self):
+        return sorted(job.args[0] for job in self.scheduler.scheduler.get_jobs())
+
+    def test_same_schedule_shares_batch_job(self):
+        """相同 cron 的源由同一个批量任务抓取"""
+        for source in self.sources:
+            self.scheduler.add_source(self.db, source.id)
+
+        assert self._jobs() == [["a", "b"], ["c"]]
+        assert all(
+            job.func == self.scheduler._run_fetch_batch
+            for job in self.scheduler.scheduler.get_jobs()
+        )
+
+    def test_reschedule_and_remove(self):
+        """修改 cron 后移到新分组，移除最后一个源时删除任务"""
+        for source in self.sources:
+            self.scheduler.add_source(self.db, source.id)
+
+        self.sources[1].schedule = "0 9 * * *"
+        self.scheduler.add_source(self.db, "b")
+        assert self._jobs() == [["a"], ["b", "c"]]
+
+        self.scheduler.remove_source("a")
+        assert self._jobs() == [["b", "c"]]
+
+    def test_invalid_cron_not_scheduled(self):
+        """cron 表达式非法时不添加任务"""
+        self.sources[0].schedule = "every hour"
+        self.scheduler.add_source(self.db, "a")
+        assert self._jobs() == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+快照正文增量存储测试
+"""
+
+import pytest
+from src.services.text_store import SnapshotTextStore, apply_delta, encode_delta
+
+
+class TestDelta:
+    """增量编解码测试"""
+
+    def test_roundtrip(self):
+        """增量可精确还原（含行尾与空行）"""
+        base = "Pricing\nBasic $29\n\nPro $99\r\nEnterprise"
+        target = "Pricing\nBasic $39\n\nPro $99\r\nTeam $59\nEnterprise\n"
+
+        assert apply_delta(base, encode_delta(base, target)) == target
+
+    def test_delta_is_compact(self):
+        """相同内容只记录复制区间"""
+        text = "\n".join(f"line {i}" for i in range(100))
+        assert encode_delta(text, text) == [[0, 100]]
+
+
+class MockSnapshot:
+    def __init__(self, id, text_content=None, text_delta=None, delta_base_id=None):
+        self.id = id
+        self.text_content = text_content
+        self.text_delta = text_delta
+        self.delta_base_id = delta_base_id
+
+
+class TestSnapshotTextStore:
+    """增量链还原测试"""
+
+    def test_reconstruct_chain(self, mock_db):
+        """从关键帧沿增量链还原，并缓存中间版本"""
+        v1, v2, v3 = "a\nb\nc\n", "a\nB\nc\n", "a\nB\nc\nd\n"
+        keyframe = MockSnapshot(1, text_content=v1)
+        s2 = MockSnapshot(2, text_delta=encode_delta(v1, v2), delta_base_id=1)
+        s3 = MockSnapshot(3, text_delta=encode_delta(v2, v3), delta_base_id=2)
+        db = mock_db(keyframe, s2, s3)
+        store = SnapshotTextStore()
+
+        assert store.load_text(db, s3) == v3
+        queries = db.queries
+        assert store.load_text(db, s2) == v2
+        assert db.queries == queries
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+易变区域屏蔽测试
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from src.config import settings
+from src.services.block_diff import split_blocks
+from src.services.extractor import ExtractOptions, extract_text
+from src.services.volatile_mask import MASK, VolatileMasker, mask_patterns
+
+
+PAGE = """
+<html><body><div id="main">
+<h2>Pricing</h2>
+<p>Pro plan costs $20 per month.</p>
+<blockquote class="testimonial">{quote}</blockquote>
+</div></body></html>
+"""
+
+
+def page(quote):
+    html = PAGE.format(quote=quote)
+    text = "\n".join(block.text for block in split_blocks(html))
+    return html, text
+
+
+class TestMaskPatterns:
+    """模式屏蔽测试"""
+
+    def test_relative_time_and_tokens(self):
+        """相对时间、哈希与长 token 被屏蔽"""
+        text, hits = mask_patterns(
+            "Updated 3 minutes ago, 5 分钟前 app.3f9a1c0b7d2e4f61.js token=a8Kz93LmQp0Xw7Rt5Yv2Bn4Cd6Ef8Gh1"
+        )
+        assert hits == 4
+        assert text == f"Updated {MASK}, {MASK} app.{MASK}.js token={MASK}"
+
+    def test_plain_text_untouched(self):
+        """普通内容不受影响"""
+        assert mask_patterns("Pro plan costs $20 per month, version 2.1") == \
+            ("Pro plan costs $20 per month, version 2.1", 0)
+
+
+class TestVolatileMasker:
+    """易变区域学习测试"""
+
+    def setup_method(self):
+        self.masker = VolatileMasker()
+        self.source = SimpleNamespace(exclude_selectors=None, volatile_masks=None, extract_engine="lxml")
+
+    def test_learns_rotating_block(self, monkeypatch):
+        """每次检查都变化的区块在足够观察后被屏蔽"""
+        monkeypatch.setattr(settings.masking, "min_observations", 3)
+        results = []
+        for i in range(5):
+            html, text = page(f"Customer quote number {i}")
+            results.append(self.masker.apply(self.source, html, text))
+
+        assert "Customer quote number 0" in results[0]
+        assert results[-1] == "Pricing\nPro plan costs $20 per month."
+        stats = self.masker.stats(self.source)
+        assert stats["checks"] == 5
+        assert stats["volatile_paths"] == ["body > div#main > blockquote.testimonial:nth-of-type(1)"]
+        assert stats["masked_blocks"] == 2
+
+    def test_readability_engine(self, monkeypatch):
+        """readability 输出单行 HTML 时易变区域同样被移除，正文哈希保持不变"""
+        monkeypatch.setattr(settings.masking, "min_observations", 3)
+        self.source.extract_engine = "readability"
+        results = []
+        for i in range(9):
+            html = PAGE.format(quote=f"Customer quote number {i}")
+            text = extract_text(html, ExtractOptions.from_source(self.source))
+            results.append(self.masker.apply(self.source, html, text))
+
+        assert "Customer quote number 0" in results[0]
+        assert all("Customer quote" not in text for text in results[4:])
+        assert len(set(results[4:])) == 1
+        assert "Pro plan costs $20 per month." in results[-1]
+
+    def test_unchanged_checks_dilute(self, monkeypatch):
+        """未变化的检查同样计数，偶尔更新的区块不会被屏蔽"""
+        monkeypatch.setattr(settings.masking, "min_observations", 3)
+        for i in range(4):
+            self.masker.apply(self.source, *page(f"Customer quote number {i}"))
+            self.masker.record_unchanged(self.source)
+            self.masker.record_unchanged(self.source)
+
+        assert self.masker.stats(self.source)["volatile_paths"] == []
+
+    def test_filter_blocks(self, monkeypatch):
+        """区块 diff 前移除易变路径的区块"""
+        monkeypatch.setattr(settings.masking, "min_observations", 2)
+        for i in range(3):
+            self.masker.apply(self.source, *page(f"Customer quote number {i}"))
+
+        blocks = self.masker.filter_blocks(
+            split_blocks(page("Another quote")[0]), self.source.volatile_masks
+        )
+        assert [b.text for b in blocks] == ["Pricing", "Pro plan costs $20 per month."]
+
+    def test_fingerprint(self, monkeypatch):
+        """易变路径或排除选择器变化时摘要随之变化"""
+        monkeypatch.setattr(settings.masking, "min_observations", 2)
+        initial = self.masker.fingerprint(self.source)
+        for i in range(3):
+            self.masker.apply(self.source, *page(f"Customer quote number {i}"))
+        learned = self.masker.fingerprint(self.source)
+        self.source.exclude_selectors = [".testimonial"]
+
+        assert len({initial, learned, self.masker.fingerprint(self.source)}) == 3
+
+    def test_disabled(self, monkeypatch):
+        """关闭时原样返回"""
+        monkeypatch.setattr(settings.masking, "enabled", False)
+        html, text = page("Updated 3 minutes ago")
+        assert self.masker.apply(self.source, html, text) == text
+        assert self.source.volatile_masks is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])